@@ -0,0 +1,70 @@
+"""
+Compares sequential and parallel loading of a large result set
+
+    PYTHONPATH=. python benchmarks/parallel_hydration.py --objects 20000 --workers 2 4 8
+"""
+import argparse
+import time
+from tempfile import TemporaryDirectory
+from typing import List, Optional
+from pyoxigraph import Store
+
+from cellini.odm import *
+
+
+class Person(RdfBaseModel):
+    name:str
+    age:Optional[int] = None
+    tags:List[str] = []
+
+
+class Organization(RdfBaseModel):
+    name:str
+    owner:Person
+
+
+def populate(objects:int):
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.add(Bag)
+    registry.add(Person)
+    registry.add(Organization)
+    Organization.objects.bulk_create(
+        Organization(
+            name=f"Organization {i}", 
+            owner=Person(name=f"Person {i}", age=i % 90, tags=["a", "b"])
+        ) 
+        for i in range(objects))
+
+
+def measure(load, repeat:int)->float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in load())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=5000)
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4, 8])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    populate(args.objects)
+    queryset = Organization.objects.all()
+
+    count, baseline = measure(lambda: queryset.iterator(chunk_size=args.chunk_size), args.repeat)
+    print(f"sequential      {count:>8} objects {baseline:8.3f}s")
+
+    for workers in args.workers:
+        count, elapsed = measure(
+            lambda: queryset.iter_parallel(workers=workers, chunk_size=args.chunk_size), args.repeat)
+        print(f"{workers:>2} workers      {count:>8} objects {elapsed:8.3f}s  x{baseline / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Compares per-object latency of simple lookups answered by SPARQL queries
+(before) and by quad pattern matching (after)
+
+    PYTHONPATH=. python benchmarks/pattern_lookups.py --objects 5000 --lookups 2000
+"""
+import argparse
+import random
+import time
+from tempfile import TemporaryDirectory
+from typing import List, Optional
+from pyoxigraph import Store
+
+from cellini.odm import *
+from cellini.odm import store
+from cellini.odm.utils import DCTERMS, literal_python_to_rdf
+
+
+class Person(RdfBaseModel):
+    name:str
+    age:Optional[int] = None
+    tags:List[str] = []
+
+
+def populate(objects:int)->List[Person]:
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.add(Bag)
+    registry.add(Person)
+    people = [ Person(name=f"Person {i}", age=i % 90, tags=["a", "b"]) for i in range(objects) ]
+    Person.objects.bulk_create(people)
+    return people
+
+
+def latency(call, objects:List[Person])->float:
+    start = time.perf_counter()
+    for obj in objects:
+        call(obj)
+    return (time.perf_counter() - start) / len(objects) * 1e6
+
+
+def sparql_exists(obj:Person)->bool:
+    # the ASK query used before pattern lookups
+    return registry.query(f"ASK {{ ?s { DCTERMS.identifier } { literal_python_to_rdf(obj.identifier) } }}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=5000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    people = populate(args.objects)
+    sample = random.Random(0).sample(people, min(args.lookups, len(people)))
+    half = len(sample) // 2
+    pattern_lookup_max_subjects = store.PATTERN_LOOKUP_MAX_SUBJECTS
+
+    def measure(mode:str, exists, deleted:List[Person]):
+        store.PATTERN_LOOKUP_MAX_SUBJECTS = 0 if mode == 'before' else pattern_lookup_max_subjects
+        try:
+            return (
+                latency(exists, sample),
+                latency(lambda obj: Person.objects.get(obj.identifier), sample),
+                latency(lambda obj: obj.delete(), deleted),
+            )
+        finally:
+            store.PATTERN_LOOKUP_MAX_SUBJECTS = pattern_lookup_max_subjects
+
+    # deletes of each run go last and remove different objects
+    results = dict()
+    results['before'] = measure('before', sparql_exists, sample[:half])
+    sample = sample[half:]
+    results['after'] = measure('after', Person.objects.exists, sample)
+
+    print(f"{'':8}{'exists':>12}{'get':>12}{'delete':>12}   (us per object)")
+    for name, timings in results.items():
+        print(f"{name:8}" + ''.join(f"{timing:12.1f}" for timing in timings))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""
+Measures throughput and latency percentiles of the main code paths on
+synthetic datasets (see `synthetic.py`), runs offline on in memory stores
+
+    PYTHONPATH=. python benchmarks/suite.py --scale 1 --output results.json
+    PYTHONPATH=. python benchmarks/suite.py --baseline results.json --threshold 0.2
+
+With `--baseline`, median latencies are compared to a previous run and the
+exit code is 1 when any benchmark got slower than `--threshold`.
+"""
+import argparse
+import fnmatch
+import json
+import platform
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+from pyoxigraph import Store
+
+from cellini.odm import *
+
+import synthetic
+
+
+# Dataset sizes (objects) at scale 1
+SIZES = {
+    'flat': 2000,
+    'deep': 1000,
+    'wide': 2200,
+    'models': 200,
+    'lookups': 200,
+}
+
+# Calls timed together by benchmarks of very short operations
+BATCH = 100
+
+
+def percentile(ordered:List[float], q:float)->float:
+    """
+    Returns the q-th percentile (0-100) of sorted samples, interpolating
+    between the closest ranks.
+    """
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples:List[float], operations:int, elapsed:float)->Dict[str, float]:
+    """
+    Returns throughput and latency percentiles (in microseconds) of given
+    samples (in seconds).
+    """
+    ordered = sorted(samples)
+    return {
+        'samples': len(ordered),
+        'operations': operations,
+        'ops_per_second': operations / elapsed if elapsed else 0.0,
+        'mean_us': sum(ordered) / len(ordered) * 1e6 if ordered else 0.0,
+        'p50_us': percentile(ordered, 50) * 1e6,
+        'p90_us': percentile(ordered, 90) * 1e6,
+        'p99_us': percentile(ordered, 99) * 1e6,
+        'max_us': ordered[-1] * 1e6 if ordered else 0.0,
+    }
+
+
+class Suite(object):
+    """Suite
+
+    Runs benchmarks matching `only` and collects their results by name.
+    """
+
+    def __init__(self, repeat:int, only:Optional[List[str]]=None):
+        self.repeat = repeat
+        self.only = only
+        self.results:Dict[str, Dict[str, float]] = dict()
+
+    def selected(self, name:str)->bool:
+        return not self.only or any(fnmatch.fnmatch(name, pattern) for pattern in self.only)
+
+    def measure(self,
+                name:str,
+                calls:Iterable[Callable[[], object]],
+                setup:Optional[Callable[[], None]]=None,
+                per_call:int=1):
+        """
+        Times every call separately, `repeat` times. A call may run
+        `per_call` operations, latencies are then reported per operation.
+        """
+        if not self.selected(name):
+            return
+        calls = list(calls)
+        samples = []
+        elapsed = 0.0
+        for _ in range(self.repeat):
+            if setup is not None:
+                setup()
+            for call in calls:
+                start = time.perf_counter()
+                call()
+                duration = time.perf_counter() - start
+                elapsed += duration
+                samples.append(duration / per_call)
+        self.results[name] = summarize(samples, len(samples) * per_call, elapsed)
+        print(format_result(name, self.results[name]), flush=True)
+
+
+def format_result(name:str, result:Dict[str, float])->str:
+    return f"{name:<32} {result['ops_per_second']:>12.0f} ops/s" \
+           f"  p50 {result['p50_us']:>10.1f}us  p90 {result['p90_us']:>10.1f}us  p99 {result['p99_us']:>10.1f}us"
+
+
+def forget(objects:List[RdfBaseModel]):
+    """
+    Drops what objects know about the stored data, so they are saved as
+    new objects again.
+    """
+    for obj in objects:
+        for related in [ obj ] + obj._related_models():
+            if isinstance(related, RdfBaseModel):
+                related._rdf_snapshot = None
+
+
+def fresh_store():
+    registry.set_triple_store(Store())
+
+
+def bench_dataset(suite:Suite, dataset:synthetic.Dataset, lookups:int):
+    name = dataset.name
+    objects = dataset.objects
+
+    suite.measure(f"{name}.to_triples", [ (lambda obj=obj: list(obj.to_triples())) for obj in objects ])
+
+    def save_setup():
+        fresh_store()
+        forget(objects)
+    suite.measure(f"{name}.save", [ obj.save for obj in objects ], setup=save_setup)
+
+    # queries run on a store holding the whole dataset
+    fresh_store()
+    forget(objects)
+    for obj in objects:
+        obj.save()
+
+    step = max(len(objects) // lookups, 1)
+    identifiers = [ obj.identifier for obj in objects[::step][:lookups] ]
+    suite.measure(f"{name}.get", [ (lambda identifier=identifier: dataset.model.objects.get(identifier)) for identifier in identifiers ])
+    suite.measure(f"{name}.filter", [ (lambda kwargs=kwargs: list(dataset.model.objects.filter(**kwargs))) for kwargs in dataset.filters ])
+    suite.measure(f"{name}.all", [ lambda: list(dataset.model.objects.all()) ], per_call=dataset.model.objects.count())
+
+
+def bench_registry(suite:Suite, models:List[type], lookups:int):
+    uris = [ model(name="lookup").__rdf_uri__ for model in models ]
+    uris = (uris * (lookups // len(uris) + 1))[:lookups]
+    batches = [ uris[start:start + BATCH] for start in range(0, len(uris), BATCH) ]
+
+    def lookup(batch):
+        for uri in batch:
+            registry.uri_to_basemodel(uri)
+    suite.measure("registry.uri_to_basemodel", [ (lambda batch=batch: lookup(batch)) for batch in batches ], per_call=BATCH)
+
+
+def compare(results:Dict[str, Dict[str, float]], baseline:Dict[str, Dict[str, float]], threshold:float)->List[str]:
+    """
+    Prints median latency changes against the baseline and returns names
+    of benchmarks slower than `threshold` (a fraction).
+    """
+    regressions = []
+    print()
+    print(f"{'benchmark':<32} {'baseline p50':>14} {'p50':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:<32} {'-':>14} {result['p50_us']:>10.1f}us {'new':>8}")
+            continue
+        before = baseline[name]['p50_us']
+        change = result['p50_us'] / before - 1 if before else 0.0
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  slower'
+        print(f"{name:<32} {before:>12.1f}us {result['p50_us']:>10.1f}us {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help="multiplies dataset sizes")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='+', help="benchmark name patterns, e.g. 'flat.*' '*.get'")
+    parser.add_argument('--output', help="json file the results are written to, - for stdout")
+    parser.add_argument('--baseline', help="json file of a previous run to compare with")
+    parser.add_argument('--threshold', type=float, default=0.1, help="slowdown reported as regression (0.1 = 10%%)")
+    args = parser.parse_args()
+
+    sizes = { key: max(int(size * args.scale), 1) for key, size in SIZES.items() }
+    suite = Suite(args.repeat, args.only)
+
+    for dataset in (
+                synthetic.flat(sizes['flat'], seed=args.seed),
+                synthetic.deep(sizes['deep'], seed=args.seed),
+                synthetic.wide(sizes['wide'], seed=args.seed)):
+        bench_dataset(suite, dataset, sizes['lookups'])
+    bench_registry(suite, synthetic.generated_models(sizes['models']), sizes['lookups'] * BATCH)
+
+    report = {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': args.scale,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'sizes': sizes,
+        },
+        'results': suite.results,
+    }
+    if args.output == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline['meta'].get('scale') != args.scale:
+            print(f"! baseline was measured at scale {baseline['meta'].get('scale')}, results may not be comparable")
+        regressions = compare(suite.results, baseline['results'], args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks slower than the baseline: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""
+Synthetic datasets of the benchmark suite (see `suite.py`)
+
+Every dataset is generated from a seed, so runs with the same scale store
+the same data.
+"""
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from pydantic import create_model
+
+from cellini.odm import *
+
+
+class Flat(RdfBaseModel):
+    name:str
+    number:int
+    ratio:float
+    flag:bool
+    created:datetime
+
+
+class Node(RdfBaseModel):
+    name:str
+    depth:int
+    child:Optional['Node'] = None
+
+
+class Wide(RdfBaseModel):
+    name:str
+    values:List[str] = []
+    members:List[Flat] = []
+
+
+class Dataset(object):
+    """Dataset
+
+    Objects of a benchmark dataset, the model they are queried by and the
+    values filters are run with.
+    """
+
+    def __init__(self, name:str, model:type, objects:List[RdfBaseModel], filters:List[Dict]):
+        self.name = name
+        self.model = model
+        self.objects = objects
+        self.filters = filters
+
+    def __len__(self)->int:
+        return len(self.objects)
+
+
+def flat(size:int, seed:int=0)->Dataset:
+    """
+    Objects with literal fields only.
+    """
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    objects = [
+        Flat(
+            name=f"flat-{i}",
+            number=i % 100,
+            ratio=rng.random(),
+            flag=i % 2 == 0,
+            created=start + timedelta(seconds=rng.randrange(10 ** 7)))
+        for i in range(size)
+    ]
+    filters = [ { 'number': rng.randrange(100) } for _ in range(50) ]
+    return Dataset('flat', Flat, objects, filters)
+
+
+def deep(size:int, depth:int=10, seed:int=0)->Dataset:
+    """
+    Chains of `depth` nested objects, `size` objects in total.
+    """
+    objects = []
+    for chain in range(max(size // depth, 1)):
+        node = None
+        for level in range(depth - 1, -1, -1):
+            node = Node(name=f"node-{chain}-{level}", depth=level, child=node)
+        objects.append(node)
+    filters = [ { 'depth': 0 } ]
+    return Dataset('deep', Node, objects, filters)
+
+
+def wide(size:int, width:int=500, members:int=50, seed:int=0)->Dataset:
+    """
+    Objects holding a list of `width` literals and a list of `members`
+    related objects.
+    """
+    objects = [
+        Wide(
+            name=f"wide-{i}",
+            values=[ f"value-{i}-{j}" for j in range(width) ],
+            members=flat(members, seed=seed + i).objects)
+        for i in range(max(size // (width + members), 1))
+    ]
+    filters = [ { 'name': f"wide-{i}" } for i in range(len(objects)) ]
+    return Dataset('wide', Wide, objects, filters)
+
+
+def generated_models(count:int)->List[type]:
+    """
+    Creates and registers `count` models, for registry lookups among many
+    classes.
+    """
+    models = [
+        create_model(f"Generated{i}", __base__=RdfBaseModel, name=(str, ...))
+        for i in range(count)
+    ]
+    for model in models:
+        registry.add(model)
+    return models
@@ -0,0 +1,92 @@
+"""
+Compares loading objects from stored data without validation (default)
+and with pydantic validation, for the whole load and for building objects
+from already fetched triples
+
+    PYTHONPATH=. python benchmarks/trusted_hydration.py --objects 100000
+"""
+import argparse
+import time
+from datetime import datetime
+from tempfile import TemporaryDirectory
+from typing import List, Optional
+from pyoxigraph import Store
+
+from cellini.odm import *
+from cellini.odm.hydration import Hydrator
+
+
+class Person(RdfBaseModel):
+    name:str
+    age:Optional[int] = None
+    born:datetime
+    tags:List[str] = []
+
+
+class Organization(RdfBaseModel):
+    name:str
+    owner:Person
+
+
+def populate(objects:int):
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.add(Bag)
+    registry.add(Person)
+    registry.add(Organization)
+    Organization.objects.bulk_create(
+        Organization(
+            name=f"Organization {i}",
+            owner=Person(name=f"Person {i}", age=i % 90, born=datetime(1990, 1, 1 + i % 28), tags=["a", "b"])
+        )
+        for i in range(objects // 2))
+
+
+def measure(load, repeat:int)->float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = sum(1 for _ in load())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count, best
+
+
+def measure_build(uris, validate:bool, repeat:int)->float:
+    best = None
+    for _ in range(repeat):
+        hydrator = Hydrator(validate=validate)
+        hydrator.fetch(uris)
+        start = time.perf_counter()
+        for uri in uris:
+            hydrator.resolve(uri)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--objects', type=int, default=100000, help="organizations and their owners")
+    parser.add_argument('--chunk-size', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    populate(args.objects)
+
+    count, baseline = measure(
+        lambda: Organization.objects.all(validate=True).iterator(chunk_size=args.chunk_size), args.repeat)
+    print(f"validated  {count * 2:>8} objects {baseline:8.3f}s")
+
+    count, elapsed = measure(
+        lambda: Organization.objects.all().iterator(chunk_size=args.chunk_size), args.repeat)
+    print(f"trusted    {count * 2:>8} objects {elapsed:8.3f}s  x{baseline / elapsed:.2f}")
+
+    uris = list(Organization.objects.all().uris())
+    baseline = measure_build(uris, True, args.repeat)
+    print(f"build validated          {baseline:8.3f}s")
+    elapsed = measure_build(uris, False, args.repeat)
+    print(f"build trusted            {elapsed:8.3f}s  x{baseline / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
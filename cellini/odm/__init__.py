@@ -1,9 +1,18 @@
 __all__ = [
     'AbstractNamedNode',
     'registry',
+    'literal_codecs',
     'RdfBaseModel',
     'Bag',
+    'Session',
+    'StoreAdapter',
+    'OxigraphStore',
+    'MemoryStore',
+    'ShardedStore',
 ]
 from cellini.odm.base  import AbstractNamedNode, registry
+from cellini.odm.utils import literal_codecs
 from cellini.odm.types import Bag
-from cellini.odm.model import RdfBaseModel
\ No newline at end of file
+from cellini.odm.model import RdfBaseModel
+from cellini.odm.session import Session
+from cellini.odm.store import StoreAdapter, OxigraphStore, MemoryStore, ShardedStore
@@ -0,0 +1,88 @@
+"""
+Running blocking store work from asyncio code
+"""
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from threading import Lock
+from typing import Any, AsyncGenerator, Callable, List, Optional, TypeVar
+
+
+# Default number of threads running store work for asyncio callers
+DEFAULT_MAX_WORKERS = 4
+
+T = TypeVar('T')
+
+_lock = Lock()
+_executor:Optional[Executor] = None
+# whether `_executor` was created here, executors given to `configure` are
+# owned (and shut down) by the caller
+_owned:bool = False
+_max_workers:int = DEFAULT_MAX_WORKERS
+
+
+def configure(max_workers:Optional[int]=None, executor:Optional[Executor]=None):
+    """
+    Sets how many store operations started from asyncio code run at the
+    same time, or the executor running them.
+
+    Operations already submitted to the previous executor are finished.
+    The previous executor is shut down only if it was created here.
+    """
+    global _executor, _owned, _max_workers
+    if max_workers is not None and max_workers < 1:
+        raise ValueError(f"max_workers should be a positive integer, but {max_workers} given")
+    if max_workers is not None and executor is not None:
+        raise ValueError("configure accepts either `max_workers` or `executor`, not both")
+
+    with _lock:
+        previous = _executor if _owned else None
+        if max_workers is not None:
+            _max_workers = max_workers
+        _executor = executor
+        _owned = False
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+def get_executor()->Executor:
+    """
+    Returns the executor running store work of asyncio callers, created
+    with `DEFAULT_MAX_WORKERS` threads on first use.
+    """
+    global _executor, _owned
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix='cellini')
+            _owned = True
+        return _executor
+
+
+async def run_sync(func:Callable[..., T], *args, **kwargs)->T:
+    """
+    Runs given blocking function on the executor and waits for it without
+    blocking the event loop.
+
+    The function runs in a copy of the caller's context, so an active
+    `Session` or registry transaction is used by it as well. Cancelling the
+    caller cancels the function if it didnt start yet, a running function
+    finishes in the background and its result is dropped.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+async def iterate_chunks(chunks:List[Any], load:Callable[[Any], List[T]])->AsyncGenerator[T, None]:
+    """
+    Yields objects returned by `load` for every chunk, loading one chunk
+    at a time on the executor.
+
+    Loading stops as soon as the consumer stops iterating, so cancelling
+    or breaking out of an `async for` never loads further chunks.
+    """
+    for chunk in chunks:
+        for obj in await run_sync(load, chunk):
+            yield obj
@@ -1,7 +1,13 @@
+import time
 from abc import ABC, abstractmethod
-from pyoxigraph import NamedNode, Triple, Store, Literal
-from typing import Generator, Union
-from cellini.odm.utils import UnsupportedType
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pyoxigraph import NamedNode, Triple, Quad, Store, Literal, parse, serialize
+from typing import Any, Callable, Dict, FrozenSet, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+from cellini.odm.utils import UnsupportedType, DCTERMS, RDF, QUAD_FORMATS, rdf_mime_type
+from cellini.odm.store import StoreAdapter, OxigraphStore, as_quad
 
 class AbstractNamedNode(ABC):
     """
@@ -29,6 +35,17 @@ class AbstractNamedNode(ABC):
             raise NotImplementedError(f"AbstractNamedNode subclass should provide `identifier` property. {self.__class__} is missing `identifier`")
         return NamedNode(f"{ self.__rdf_title__() }:{ self.identifier }")
 
+    @classmethod
+    def __rdf_graph__(cls)->Optional[NamedNode]:
+        """__rdf_graph__
+        returns the named graph holding triples of the class instances, 
+        or None for the default graph. 
+
+        Defaults to the registry setting (see `RdfRegistry.graph_for`),
+        override it to partition data differently, e.g. per tenant.
+        """
+        return registry.graph_for(cls)
+
 
     @abstractmethod
     def to_triples(self, recursive=True)->Generator[Triple, None, None]:
@@ -37,6 +54,15 @@ class AbstractNamedNode(ABC):
         """
 
 
+    def to_quads(self, recursive=True)->Generator[Quad, None, None]:
+        """to_quads
+        serializes class instance to quads of the graph given by 
+        `__rdf_graph__`.
+        """
+        graph = self.__rdf_graph__()
+        for s, p, o in self.to_triples(recursive=recursive):
+            yield Quad(s, p, o, graph)
+
     @classmethod
     @abstractmethod
     def resolve_named_node(cls, node:NamedNode):
@@ -51,6 +77,182 @@ class AbstractNamedNode(ABC):
         "de-serialize" and get back the actual object.
         """
 
+    @classmethod
+    def from_triples(cls, node:NamedNode, triples:list, hydrator):
+        """from_triples
+        builds the class instance from (predicate, object) pairs already
+        loaded by a `Hydrator`. Nested named nodes should be resolved
+        through `hydrator.resolve` so they are not requested again.
+
+        Default implementation ignores the given triples and falls back
+        to `resolve_named_node`.
+        """
+        return cls.resolve_named_node(node)
+
+    @classmethod
+    def lazy_reference(cls, node:NamedNode, hydrator):
+        """lazy_reference
+        returns a placeholder instance for given node that is loaded from
+        the triple store on first access, or None when the class can not
+        be loaded lazily (then it is resolved right away).
+        """
+        return None
+
+    @classmethod
+    def lazy_predicates(cls, loading:dict)->frozenset:
+        """lazy_predicates
+        returns predicates whose objects should be loaded lazily, given
+        per field loading strategy overrides.
+        """
+        return frozenset()
+
+    def __rdf_references__(self)->Iterable[Any]:
+        """__rdf_references__
+        returns the values the instance points to, named nodes or lists
+        of them. Recursive serialization only reaches nodes returned here,
+        the default has none.
+        """
+        return ()
+
+
+# marks the end of a level in `walk_named_nodes`
+_END = object()
+
+
+def walk_named_nodes(root:AbstractNamedNode)->Generator[AbstractNamedNode, None, None]:
+    """
+    Yields `root` and every named node reachable from it exactly once, 
+    depth first. 
+    
+    The walk keeps one iterator per level instead of recursing, so memory
+    grows with the depth of the object graph and the number of visited 
+    uris only. Shared objects and references back to a visited object 
+    (cycles) are skipped. Lists are walked through, their triples belong 
+    to the object holding them.
+    """
+    visited = { root.__rdf_uri__ }
+    lists = set()
+    yield root
+    stack = [ iter(root.__rdf_references__()) ]
+    while stack:
+        value = next(stack[-1], _END)
+        if value is _END:
+            stack.pop()
+        elif isinstance(value, list):
+            if id(value) not in lists:
+                lists.add(id(value))
+                stack.append(iter(value))
+        elif isinstance(value, AbstractNamedNode):
+            uri = value.__rdf_uri__
+            if uri not in visited:
+                visited.add(uri)
+                yield value
+                stack.append(iter(value.__rdf_references__()))
+
+
+@dataclass
+class BulkStats:
+    """BulkStats
+
+    Throughput counters reported by bulk write operations.
+    """
+    objects:int = 0
+    triples:int = 0
+    batches:int = 0
+    seconds:float = 0.0
+
+    @property
+    def objects_per_second(self)->float:
+        return self.objects / self.seconds if self.seconds else 0.0
+
+    @property
+    def triples_per_second(self)->float:
+        return self.triples / self.seconds if self.seconds else 0.0
+
+
+class _GraphRouter(object):
+    """
+    Assigns triples read from triple formats to the graph their objects
+    are stored in, lists go to the graph of the object holding them.
+    """
+
+    def __init__(self, registry:'RdfRegistry'):
+        self.registry = registry
+        self.model_graphs:Dict[type, Optional[NamedNode]] = dict()
+        self.list_graphs:Dict[NamedNode, Optional[NamedNode]] = dict()
+        self.pending:Dict[NamedNode, List[Triple]] = defaultdict(list)
+
+    def graph_of(self, basemodel:AbstractNamedNode)->Optional[NamedNode]:
+        if basemodel not in self.model_graphs:
+            self.model_graphs[basemodel] = basemodel.__rdf_graph__()
+        return self.model_graphs[basemodel]
+
+    def route(self, triple:Triple)->List[Quad]:
+        s, p, o = triple
+        if not isinstance(s, NamedNode) or not self.registry.uri_can_resolve(s):
+            return [ Quad(s, p, o, None) ]
+        basemodel = self.registry.uri_to_basemodel(s)
+        if issubclass(basemodel, list):
+            if s not in self.list_graphs:
+                # holder of the list is not read yet
+                self.pending[s].append(triple)
+                return []
+            graph = self.list_graphs[s]
+        else:
+            graph = self.graph_of(basemodel)
+
+        quads = [ Quad(s, p, o, graph) ]
+        if isinstance(o, NamedNode) \
+                and self.registry.uri_can_resolve(o) \
+                and issubclass(self.registry.uri_to_basemodel(o), list) \
+                and o not in self.list_graphs:
+            self.list_graphs[o] = graph
+            for pending in self.pending.pop(o, ()):
+                quads.extend(self.route(pending))
+        return quads
+
+    def remaining(self)->List[Quad]:
+        """
+        Returns triples of lists whose holder was never read, in the 
+        default graph.
+        """
+        quads = [ Quad(*triple) for triples in self.pending.values() for triple in triples ]
+        self.pending.clear()
+        return quads
+
+
+class Transaction(object):
+    """Transaction
+
+    Buffers changes written to the registry until the `transaction()` 
+    block ends, so they are applied with a single store operation.
+    """
+
+    def __init__(self):
+        # quad -> whether it is inserted (True) or deleted (False), the 
+        # latest change of a quad wins
+        self.changes:Dict[Quad, bool] = dict()
+        self.rollbacks:List[Callable[[], None]] = list()
+
+    def __len__(self)->int:
+        return len(self.changes)
+
+    def write(self, inserts:Iterable[Quad]=(), deletes:Iterable[Quad]=()):
+        for quad in deletes:
+            self.changes[as_quad(quad)] = False
+        for quad in inserts:
+            self.changes[as_quad(quad)] = True
+
+    def rollback(self):
+        """
+        Discards buffered changes and reverts in-memory state of the objects
+        that wrote them.
+        """
+        self.changes.clear()
+        for callback in reversed(self.rollbacks):
+            callback()
+        self.rollbacks.clear()
+
 
 class RdfRegistry(set):
 
@@ -59,51 +261,147 @@ class RdfRegistry(set):
     A global registry holds list of AbstractNamedNode models.
 
     """
-    def __init__(self, path=None, uri_prefix="cellini:"):
-        self._store = Store(path)
+    def __init__(self, path=None, uri_prefix="cellini:", graph_per_model=False):
+        self._store = OxigraphStore(path)
         self._uri_prefix = uri_prefix
+        self.graph_per_model = graph_per_model
+        self._index = None
+        # model -> (model and its registered subclasses, whether any of 
+        # them overrides `__rdf_graph__`, graphs by registry settings)
+        self._scopes:Dict[type, Tuple[Tuple[type, ...], bool, Dict[Tuple[bool, str], Optional[Tuple[NamedNode, ...]]]]] = dict()
+        self._transaction:ContextVar[Optional[Transaction]] = ContextVar('cellini_transaction', default=None)
 
     @property
     def uri_prefix(self):
         return self._uri_prefix
 
     @property
-    def triple_store(self):
+    def triple_store(self)->StoreAdapter:
+        # plain pyoxigraph stores are wrapped by the default adapter
+        if not isinstance(self._store, StoreAdapter):
+            self._store = OxigraphStore(store=self._store)
         return self._store
 
-    @property
-    def query(self):
-        return self.triple_store.query
+    def query(self, query:str, local:bool=False, **kwargs):
+        """
+        Evaluates a SPARQL query on the triple store. Unless graphs are
+        given, triples of every graph are matched as if they were in the
+        default graph. `local` queries only join triples of a same subject
+        (see `StoreAdapter.local_query`).
+        """
+        if 'default_graph' not in kwargs:
+            kwargs.setdefault('use_default_graph_as_union', True)
+        if local:
+            return self.triple_store.local_query(query, **kwargs)
+        return self.triple_store.query(query, **kwargs)
 
-    def set_triple_store(self, path:None):
-        self._store = Store(path)
+    def graph_for(self, basemodel:AbstractNamedNode)->Optional[NamedNode]:
+        """
+        Returns the default named graph of given model, one graph per model
+        titled after it when `graph_per_model` is set, otherwise None (the
+        default graph).
+        """
+        if self.graph_per_model:
+            return NamedNode(basemodel.__rdf_title__())
+        return None
 
-    def get_basemodel(self, title:str)->AbstractNamedNode:
-        for basemodel in self:
-            if basemodel.__rdf_title__() == title:
+    def graphs_of(self, basemodel:AbstractNamedNode)->Optional[Tuple[NamedNode, ...]]:
+        """
+        Returns the named graphs holding instances of given model and of
+        its registered subclasses, or None if any of them is stored in the
+        default graph.
+
+        Subclasses are cached until models are added or removed, graphs are
+        cached per `graph_per_model` and `uri_prefix` setting unless a model
+        decides its graph itself (overrides `__rdf_graph__`).
+        """
+        scope = self._scopes.get(basemodel)
+        if scope is None:
+            models = (basemodel, *(model for model in self if issubclass(model, basemodel) and model is not basemodel))
+            dynamic = any(
+                getattr(model.__rdf_graph__, '__func__', None) is not AbstractNamedNode.__rdf_graph__.__func__
+                for model in models)
+            scope = (models, dynamic, dict())
+            self._scopes[basemodel] = scope
+        models, dynamic, cached = scope
+
+        settings = (self.graph_per_model, self._uri_prefix)
+        if not dynamic and settings in cached:
+            return cached[settings]
+
+        graphs = dict()
+        for model in models:
+            graph = model.__rdf_graph__()
+            if graph is None:
+                graphs = None
+                break
+            graphs[graph] = None
+        if graphs is not None:
+            graphs = tuple(graphs)
+        if not dynamic:
+            cached[settings] = graphs
+        return graphs
+
+    def set_triple_store(self, path:Union[None, str, Store, StoreAdapter]=None):
+        """
+        Sets the store holding registry data, either a `StoreAdapter`, a 
+        pyoxigraph `Store` or the path of a pyoxigraph store.
+        """
+        if isinstance(path, (StoreAdapter, Store)):
+            self._store = path
+        else:
+            self._store = OxigraphStore(path)
+
+    def _title_index(self)->Dict[str, AbstractNamedNode]:
+        """
+        Returns a mapping of model titles to models, rebuilt when registry
+        changes or `uri_prefix` is modified.
+        """
+        if self._index is None or self._index[0] != self._uri_prefix:
+            titles = { basemodel.__rdf_title__(): basemodel for basemodel in self }
+            self._index = (self._uri_prefix, titles)
+        return self._index[1]
+
+    def _lookup(self, uri:str)->Optional[AbstractNamedNode]:
+        """
+        Returns the model that given uri belongs to, or None.
+
+        Uris have the form `<title>:<identifier>`, so the title is looked up 
+        directly. Titles and identifiers may contain `:` as well, so every
+        `:` is tried from the last one, the longest matching title wins.
+        """
+        titles = self._title_index()
+        end = len(uri)
+        while True:
+            end = uri.rfind(':', 0, end)
+            if end < 0:
+                return None
+            basemodel = titles.get(uri[:end])
+            if basemodel is not None:
                 return basemodel
-        raise ValueError(f"Model '{title}' is not included in Registry")
+
+    def get_basemodel(self, title:str)->AbstractNamedNode:
+        basemodel = self._title_index().get(title)
+        if basemodel is None:
+            raise ValueError(f"Model '{title}' is not included in Registry")
+        return basemodel
 
     def uri_can_resolve(self, uri:Union[str, NamedNode])->bool:
         """Checks whether given uri points to a registered AbstractNamedNode.
         """
         if isinstance(uri, NamedNode) or isinstance(uri, Literal):
             uri = uri.value
-        for basemodel in self:
-            if uri.startswith(basemodel.__rdf_title__()):
-                return True
-        return False
+        return self._lookup(uri) is not None
 
     def uri_to_basemodel(self, uri:Union[str, NamedNode])->AbstractNamedNode:
         """Reverses the given uri and returns the corresponding AbstractNamedNode.
         """
         if isinstance(uri, NamedNode):
             uri = uri.value
-        for basemodel in self:
-            if uri.startswith(basemodel.__rdf_title__()):
-                return basemodel
-
-        raise ValueError(f'Model for {uri} is not included in Registry')
+        basemodel = self._lookup(uri)
+        if basemodel is None:
+            raise ValueError(f'Model for {uri} is not included in Registry')
+        return basemodel
 
     def resolve_named_node(self, uri:NamedNode):
         """
@@ -113,6 +411,262 @@ class RdfRegistry(set):
         basemodel = self.uri_to_basemodel(uri)
         return basemodel.resolve_named_node(uri)
 
+    @contextmanager
+    def transaction(self)->Generator[Transaction, None, None]:
+        """
+        Buffers every change written in the block (saves, deletes, creates)
+        and applies all of them atomically with a single store operation 
+        when the block ends. 
+
+        If the block raises, buffered changes are discarded and nothing is 
+        written. Nested blocks join the outer transaction. Reads inside the 
+        block do not see buffered changes.
+
+            with registry.transaction():
+                org.save()
+                employee.delete()
+        """
+        current = self._transaction.get()
+        if current is not None:
+            yield current
+            return
+
+        transaction = Transaction()
+        token = self._transaction.set(transaction)
+        try:
+            yield transaction
+        except BaseException:
+            transaction.rollback()
+            raise
+        finally:
+            self._transaction.reset(token)
+
+        changes = transaction.changes
+        try:
+            self._apply(
+                inserts=[ triple for triple, inserted in changes.items() if inserted ],
+                deletes=[ triple for triple, inserted in changes.items() if not inserted ])
+        except BaseException:
+            transaction.rollback()
+            raise
+
+    def on_rollback(self, callback:Callable[[], None]):
+        """
+        Registers a callback reverting in-memory changes if the running
+        transaction is rolled back. Does nothing outside transactions.
+        """
+        transaction = self._transaction.get()
+        if transaction is not None:
+            transaction.rollbacks.append(callback)
+
+    def write(self, inserts:Iterable[Union[Triple, Quad]]=(), deletes:Iterable[Union[Triple, Quad]]=()):
+        """
+        Removes `deletes` and adds `inserts` to the triple store atomically, 
+        in a single store operation, or buffers them while a transaction 
+        is running. Triples are written to the default graph.
+        """
+        transaction = self._transaction.get()
+        if transaction is not None:
+            transaction.write(inserts=inserts, deletes=deletes)
+        else:
+            self._apply(inserts=inserts, deletes=deletes)
+
+    def clear_graph(self, graph_name:NamedNode):
+        """
+        Removes every triple of given named graph, as part of the running
+        transaction if any.
+        """
+        if self._transaction.get() is not None:
+            self.write(deletes=list(self.triple_store.quads_for_pattern(graph_name=graph_name)))
+        else:
+            self.triple_store.clear_graph(graph_name)
+
+    def _apply(self, inserts:Iterable[Union[Triple, Quad]]=(), deletes:Iterable[Union[Triple, Quad]]=()):
+        self.triple_store.apply(
+            inserts=[ as_quad(quad) for quad in inserts ], 
+            deletes=[ as_quad(quad) for quad in deletes ])
+
+    def bulk_save(self, objs:Iterable[AbstractNamedNode], batch_size:int=1000, recursive=True)->BulkStats:
+        """
+        Streams the triples of many objects into the triple store using
+        the store's bulk loader, `batch_size` objects at a time.
+
+        Unlike `RdfBaseModel.save` there is no check whether an object is
+        already stored and nothing is deleted first, so it is meant for
+        loading new objects. Bulk loading is not transactional, a failure
+        may leave part of a batch written, unless a transaction is running,
+        then triples are buffered by the transaction like any other write.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size should be a positive integer, but {batch_size} given")
+
+        transaction = self._transaction.get()
+        insert = self.triple_store.bulk_insert if transaction is None else self.write
+
+        stats = BulkStats()
+        started = time.perf_counter()
+        batch = []
+        pending = 0
+
+        for obj in objs:
+            batch.extend(obj.to_quads(recursive=recursive))
+            stats.objects += 1
+            pending += 1
+
+            if pending >= batch_size:
+                insert(batch)
+                stats.triples += len(batch)
+                stats.batches += 1
+                batch = []
+                pending = 0
+
+        if batch:
+            insert(batch)
+            stats.triples += len(batch)
+            stats.batches += 1
+
+        stats.seconds = time.perf_counter() - started
+        return stats
+
+    def _progress(self, 
+                    quads:Iterable[Quad], 
+                    stats:BulkStats, 
+                    started:float,
+                    progress:Optional[Callable[[BulkStats], None]], 
+                    progress_every:int)->Iterator[Quad]:
+        """
+        Counts quads (and objects, by their identifier) passing through, 
+        reporting to `progress` every `progress_every` quads.
+        """
+        for quad in quads:
+            stats.triples += 1
+            if quad.predicate == DCTERMS.identifier:
+                stats.objects += 1
+            if progress is not None and stats.triples % progress_every == 0:
+                stats.seconds = time.perf_counter() - started
+                progress(stats)
+            yield quad
+
+    def dump(self, 
+                output:Any, 
+                format:Optional[str]=None, 
+                models:Optional[Sequence[AbstractNamedNode]]=None,
+                progress:Optional[Callable[[BulkStats], None]]=None,
+                progress_every:int=100000)->BulkStats:
+        """
+        Streams stored data to given file, path or binary stream, without
+        loading any object. 
+
+        `format` is a mime type or a name like `nq`, `nt`, `ttl` or `trig`, 
+        guessed from the path extension when not given (N-Quads otherwise).
+        Triple formats drop graph names. `models` limits the export to 
+        objects of given models and of their subclasses.
+
+        `progress` is called with the running stats every `progress_every`
+        triples and once at the end.
+        """
+        mime_type = rdf_mime_type(format, output)
+        stats = BulkStats(batches=1)
+        started = time.perf_counter()
+
+        if models is None:
+            quads = self.triple_store.quads_for_pattern()
+        else:
+            # subclasses are exported with their parents, so models covered
+            # by another given model are skipped
+            models = list(dict.fromkeys(models))
+            models = [ model for model in models if not any(other is not model and issubclass(model, other) for other in models) ]
+            quads = (quad for model in models for quad in model.objects.quads())
+        quads = self._progress(quads, stats, started, progress, progress_every)
+
+        if mime_type not in QUAD_FORMATS:
+            quads = (quad.triple for quad in quads)
+        serialize(quads, output, mime_type)
+
+        stats.seconds = time.perf_counter() - started
+        if progress is not None:
+            progress(stats)
+        return stats
+
+    def _validate(self, quad:Union[Triple, Quad], types:Dict[type, Optional[FrozenSet[NamedNode]]]):
+        """
+        Checks that given triple describes an object of a registered model
+        with one of the model's rdf types.
+        """
+        if not isinstance(quad.subject, NamedNode) or not self.uri_can_resolve(quad.subject):
+            raise ValueError(f"{quad.subject} does not belong to any registered model")
+        if quad.predicate != RDF.type:
+            return
+        basemodel = self.uri_to_basemodel(quad.subject)
+        if basemodel not in types:
+            if hasattr(basemodel, '__rdf_types__'):
+                types[basemodel] = frozenset(basemodel.__rdf_types__())
+            else:
+                types[basemodel] = None
+        if types[basemodel] is not None and quad.object not in types[basemodel]:
+            raise ValueError(f"{quad.subject} has type {quad.object}, which is not a type of {basemodel.__name__}")
+
+    def load(self, 
+                input:Any, 
+                format:Optional[str]=None, 
+                batch_size:int=100000,
+                validate:bool=True,
+                progress:Optional[Callable[[BulkStats], None]]=None,
+                progress_every:int=100000)->BulkStats:
+        """
+        Streams data from given file, path or binary stream into the triple
+        store with the store's bulk loader, `batch_size` triples at a time.
+
+        Quads keep their graph, triples of triple formats go to the graph
+        of the model they belong to (see `__rdf_graph__`). When `validate`
+        is set, every subject should belong to a registered model and its
+        types should be the ones of that model, otherwise a ValueError is 
+        raised. Batches are checked before they are written, but as with
+        `bulk_save` a failure leaves previous batches loaded.
+
+        `progress` is called with the running stats every `progress_every`
+        triples and once at the end.
+        """
+        if batch_size < 1:
+            raise ValueError(f"batch_size should be a positive integer, but {batch_size} given")
+
+        mime_type = rdf_mime_type(format, input)
+        stats = BulkStats()
+        started = time.perf_counter()
+
+        if not validate and mime_type in QUAD_FORMATS and isinstance(self.triple_store, OxigraphStore):
+            # nothing to check or route, pyoxigraph reads the file itself
+            before = len(self.triple_store)
+            self.triple_store.store.bulk_load(input, mime_type)
+            stats.triples = len(self.triple_store) - before
+            stats.batches = 1
+        else:
+            router = _GraphRouter(self)
+            types = dict()
+            batch = []
+            for item in parse(input, mime_type):
+                if validate:
+                    self._validate(item, types)
+                if isinstance(item, Quad):
+                    batch.append(item)
+                else:
+                    batch.extend(router.route(item))
+
+                if len(batch) >= batch_size:
+                    self.triple_store.bulk_insert(self._progress(batch, stats, started, progress, progress_every))
+                    stats.batches += 1
+                    batch = []
+
+            batch.extend(router.remaining())
+            if batch:
+                self.triple_store.bulk_insert(self._progress(batch, stats, started, progress, progress_every))
+                stats.batches += 1
+
+        stats.seconds = time.perf_counter() - started
+        if progress is not None:
+            progress(stats)
+        return stats
+
     def add(self, obj:AbstractNamedNode):
         """
         Overwrite add method to allow only unique `AbstractNamedNode`s to
@@ -123,6 +677,24 @@ class RdfRegistry(set):
         else:
             if obj not in self:
                 super().add(obj)
+                self._models_changed()
+
+    def remove(self, obj:AbstractNamedNode):
+        super().remove(obj)
+        self._models_changed()
+
+    def discard(self, obj:AbstractNamedNode):
+        super().discard(obj)
+        self._models_changed()
+
+    def clear(self):
+        super().clear()
+        self._models_changed()
+
+    def _models_changed(self):
+        # drops indexes computed from the registered models
+        self._index = None
+        self._scopes.clear()
 
 
 registry = RdfRegistry()
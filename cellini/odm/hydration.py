@@ -0,0 +1,220 @@
+"""
+Batched loading of object graphs from the triple store
+"""
+from typing import Any, Dict, Generator, List, Iterable, Optional, Tuple, Union
+from pyoxigraph import NamedNode, Literal, Triple
+
+from cellini.odm.base import AbstractNamedNode, registry
+from cellini.odm.session import Session, current_session
+
+
+# Maximum number of subjects requested by a single CONSTRUCT query
+HYDRATION_CHUNK_SIZE = 500
+
+
+class Hydrator(object):
+    """Hydrator
+
+    Loads object graphs with one store request per depth level instead of
+    one request per object.
+
+    All pending uris of a depth are fetched together, objects pointing to
+    registered models are queued for the next depth, and once the whole
+    graph is in memory every object is built from the collected triples.
+    Objects referenced more than once are built only once.
+
+    When a `Session` is active, objects already in its identity map are
+    neither fetched nor built again, and new objects are added to it.
+
+    Objects of fields loaded lazily (see `loading` strategies) are not
+    fetched; they get placeholders that load themselves on first access.
+    Lazy lists are fetched, so their members are known, but their members
+    are placeholders as well. `loading` overrides the strategy of fields,
+    by field name, of every model loaded by the hydrator.
+
+    Stored data was validated when it was saved, so objects are built
+    without validating them again (see `RdfBaseModel.from_triples`), 
+    unless `validate` is set.
+    """
+
+    def __init__(self, 
+                    chunk_size:int=HYDRATION_CHUNK_SIZE, 
+                    session:Optional[Session]=None, 
+                    loading:Optional[Dict[str, str]]=None,
+                    use_session:bool=True,
+                    validate:bool=False):
+        self.chunk_size = chunk_size
+        self.validate = validate
+        self.session = None
+        if use_session:
+            self.session = session if session is not None else current_session()
+        self.loading = dict(loading or {})
+        self._triples:Dict[NamedNode, List[Tuple[NamedNode, Union[NamedNode, Literal]]]] = dict()
+        self._resolved:Dict[NamedNode, AbstractNamedNode] = dict()
+        self._lazy:Dict[NamedNode, AbstractNamedNode] = dict()
+        self._lazy_predicates:Dict[type, frozenset] = dict()
+        # list uri -> member converters of the field holding it
+        self._list_members:Dict[NamedNode, Any] = dict()
+        self._resolving = set()
+
+    def _construct(self, uris:List[NamedNode]):
+        """
+        Requests all triples of given subjects with a single store request
+        """
+        return registry.triple_store.subject_triples(uris)
+
+    def fetch(self, uris:Iterable[NamedNode]):
+        """
+        Loads triples of given uris and of every registered model they
+        point to, breadth first.
+        """
+        self._fetch({ uri: False for uri in uris if not self._known(uri) })
+
+    def _fetch(self, pending:Dict[NamedNode, bool]):
+        # pending maps uris to whether their objects are loaded lazily
+        while pending:
+            queued = dict()
+            for uri in pending:
+                self._triples[uri] = list()
+            subjects = list(pending)
+
+            for start in range(0, len(subjects), self.chunk_size):
+                for s, p, o in self._construct(subjects[start:start + self.chunk_size]):
+                    self._triples[s].append((p, o))
+
+                    # objects that point to models in our registry are loaded
+                    # in the next round
+                    if not isinstance(o, NamedNode) \
+                            or not registry.uri_can_resolve(o) \
+                            or self._known(o):
+                        continue
+
+                    if pending[s] or p in self.lazy_predicates(registry.uri_to_basemodel(s)):
+                        # lazy objects are not loaded, apart from lists that
+                        # are needed to know their (lazy) members
+                        if issubclass(registry.uri_to_basemodel(o), list):
+                            queued.setdefault(o, True)
+                    else:
+                        queued[o] = False
+
+            pending = queued
+
+    def _known(self, uri:NamedNode)->bool:
+        """
+        Checks whether given uri is already loaded or in the session
+        """
+        return uri in self._triples \
+                or uri in self._resolved \
+                or uri in self._lazy \
+                or (self.session is not None and uri in self.session)
+
+    def fetch_owned(self, uris:Iterable[NamedNode]):
+        """
+        Loads triples of given uris and of the lists they hold, but not of
+        other models they point to.
+        """
+        self._fetch({ uri: True for uri in uris if uri not in self._triples })
+
+    def owned_triples(self, uri:NamedNode)->Generator[Triple, None, None]:
+        """
+        Yields loaded triples of given uri and of the lists it holds. 
+        """
+        pending = [ uri ]
+        while pending:
+            subject = pending.pop()
+            for p, o in self.triples(subject):
+                yield Triple(subject, p, o)
+                if isinstance(o, NamedNode) \
+                        and registry.uri_can_resolve(o) \
+                        and issubclass(registry.uri_to_basemodel(o), list):
+                    pending.append(o)
+
+    def lazy_predicates(self, basemodel:AbstractNamedNode)->frozenset:
+        """
+        Returns predicates of given model loaded lazily by this hydrator.
+        """
+        predicates = self._lazy_predicates.get(basemodel)
+        if predicates is None:
+            predicates = basemodel.lazy_predicates(self.loading)
+            self._lazy_predicates[basemodel] = predicates
+        return predicates
+
+    def set_list_members(self, uri:NamedNode, members:Any):
+        """
+        Sets how members of given list are converted when it is built, see
+        `types.ListMembers`.
+        """
+        self._list_members[uri] = members
+
+    def list_members(self, uri:NamedNode)->Optional[Any]:
+        return self._list_members.get(uri)
+
+    def triples(self, uri:NamedNode)->List[Tuple[NamedNode, Union[NamedNode, Literal]]]:
+        """
+        Returns (predicate, object) pairs loaded for given uri.
+        """
+        if uri not in self._triples:
+            self._fetch({ uri: False })
+        return self._triples[uri]
+
+    def resolve(self, uri:NamedNode, basemodel:Optional[AbstractNamedNode]=None)->AbstractNamedNode:
+        """
+        Returns the object of given uri, building it from loaded triples.
+        """
+        if uri in self._resolved:
+            return self._resolved[uri]
+        if self.session is not None:
+            obj = self.session.get(uri)
+            if obj is not None:
+                self._resolved[uri] = obj
+                return obj
+        if uri in self._resolving:
+            raise ValueError(f"Circular reference detected while resolving {uri}")
+
+        if basemodel is None:
+            basemodel = registry.uri_to_basemodel(uri)
+        triples = self.triples(uri)
+
+        self._resolving.add(uri)
+        try:
+            obj = basemodel.from_triples(uri, triples, self)
+        finally:
+            self._resolving.discard(uri)
+
+        self._resolved[uri] = obj
+        if self.session is not None:
+            self.session.add(obj, uri)
+        return obj
+
+    def lazy(self, uri:NamedNode)->AbstractNamedNode:
+        """
+        Returns a placeholder of given uri that is loaded on first access,
+        or the object itself if it is already loaded or can not be loaded
+        lazily.
+        """
+        if uri in self._resolved:
+            return self._resolved[uri]
+        if uri in self._lazy:
+            return self._lazy[uri]
+        if self.session is not None:
+            obj = self.session.get(uri)
+            if obj is not None:
+                return obj
+
+        basemodel = registry.uri_to_basemodel(uri)
+        obj = basemodel.lazy_reference(uri, self)
+        if obj is None:
+            return self.resolve(uri, basemodel)
+
+        self._lazy[uri] = obj
+        if self.session is not None:
+            self.session.add(obj, uri)
+        return obj
+
+    def resolve_many(self, uris:Iterable[NamedNode])->List[AbstractNamedNode]:
+        """
+        Loads all given uris at once and returns their objects in order.
+        """
+        uris = list(uris)
+        self.fetch(uris)
+        return [self.resolve(uri) for uri in uris]
@@ -2,26 +2,100 @@
 Functions related to conversion between pydantic models and rdf triples
 """
 import uuid
-from pydantic import Field, BaseModel, model_validator
-from typing import Generator, Any
+import weakref
+from dataclasses import dataclass
+from types import MappingProxyType
+from pydantic import Field, BaseModel, PrivateAttr, ValidationError, model_validator
+from pydantic_core import PydanticUndefined
+from typing import Generator, Any, Callable, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, Tuple
 from pyoxigraph import *
 
-from cellini.odm.utils import literal_rdf_to_python, RDF, DCTERMS
-from cellini.odm.base  import AbstractNamedNode, registry
-from cellini.odm.types import python_value_to_triples
+from cellini.odm.utils import literal_codecs, RDF, DCTERMS
+from cellini.odm.base  import AbstractNamedNode, registry, walk_named_nodes
+from cellini.odm.types import python_value_to_triples, list_members, Bag, ListMembers, CONTAINERS
 from cellini.odm.query import Query
+from cellini.odm.hydration import Hydrator
+from cellini.odm import aio
 
 
-class UnresovableNode(Exception):
+class UnresovableNode(ValueError):
     pass
 
 
+# How related objects of a field are loaded, set with `Field(loading=...)`
+#  - batched: loaded together with the rest objects of the same depth (default)
+#  - eager: same as batched, every non lazy field is loaded in batches
+#  - lazy: loaded on first access of the related object's fields
+LOADING_STRATEGIES = ('batched', 'eager', 'lazy')
+
+
+@dataclass(frozen=True)
+class RdfMetadata:
+    """RdfMetadata
+
+    Class level rdf information of a `RdfBaseModel` subclass, computed once
+    and reused by every serialization and resolve call.
+    """
+    uri_prefix:str
+    title:str
+    rdf_type:NamedNode
+    rdf_types:Tuple[NamedNode, ...]
+    field_predicates:Mapping[str, NamedNode]
+    predicate_fields:Mapping[NamedNode, str]
+    computed_fields:FrozenSet[str]
+    ignore_unknown_predicates:bool
+    field_loading:Mapping[str, str]
+    field_containers:Mapping[str, type]
+    # literal converters compiled from field annotations
+    field_encoders:Mapping[str, Optional[Callable[[Any], Literal]]]
+    field_decoders:Mapping[str, Callable[[Literal], Any]]
+    # member converters of list fields
+    field_members:Mapping[str, Optional[ListMembers]]
+    codecs_version:int
+    # whether subclasses define `model_post_init`, which trusted builds run
+    custom_post_init:bool
+
+
+class Snapshot(frozenset):
+    """Snapshot
+
+    Stored triples of an object, with a weak reference to the triple store
+    they were read from or written to.
+    """
+    __slots__ = ('store', )
+
+
+def _plain_list(value:list)->list:
+    """
+    Returns a copy of given (nested) Bag as plain lists.
+    """
+    return [ _plain_list(item) if isinstance(item, list) else item for item in value ]
+
+
+def _defines_post_init(post_init:Callable)->bool:
+    """
+    Checks whether given `model_post_init` runs user code. pydantic wraps
+    it on every class with private attributes, so wrappers are unwrapped
+    down to the initialization of private attributes or a user function.
+    """
+    while getattr(post_init, '__name__', None) == 'wrapped_model_post_init':
+        cells = dict(zip(post_init.__code__.co_freevars, post_init.__closure__ or ()))
+        if 'original_model_post_init' not in cells:
+            return True
+        post_init = cells['original_model_post_init'].cell_contents
+    return getattr(post_init, '__name__', None) != 'init_private_attributes'
+
+
 class RdfBaseModel(BaseModel, AbstractNamedNode):
 
     identifier:uuid.UUID = Field(default_factory=uuid.uuid4,
                                     predicate=DCTERMS.identifier.value,
                                     description="UUID identifier for any object")
 
+    # set on lazy references until their fields are loaded
+    _rdf_unloaded:bool = PrivateAttr(default=False)
+    # stored triples of the object (and its lists) when loaded or last saved
+    _rdf_snapshot:Optional[FrozenSet[Triple]] = PrivateAttr(default=None)
 
     def __init_subclass__(cls, *args, **kwargs):
         """
@@ -38,24 +112,111 @@ class RdfBaseModel(BaseModel, AbstractNamedNode):
     def __rdf_namespace__(cls)->str:
         return "https://cellini.io/ns/"
 
+    @classmethod
+    def __rdf_unknown_predicates__(cls)->str:
+        """
+        What to do when a stored triple has a predicate that matches no field
+        while resolving; either "raise" (default) or "ignore".
+        """
+        return "raise"
+
+    @classmethod
+    def __rdf_metadata__(cls)->RdfMetadata:
+        """
+        Returns the cached rdf metadata of the class. 
+
+        Metadata are built on first use and rebuilt when registry's 
+        `uri_prefix` changes or literal codecs are registered.
+        """
+        metadata = cls.__dict__.get('__rdf_metadata_cache__')
+        if metadata is None \
+                or metadata.uri_prefix != registry.uri_prefix \
+                or metadata.codecs_version != literal_codecs.version:
+            metadata = cls._build_rdf_metadata()
+            cls.__rdf_metadata_cache__ = metadata
+        return metadata
+
+    @classmethod
+    def _build_rdf_metadata(cls)->RdfMetadata:
+        # same title pydantic uses in json schema, without generating the schema
+        name = cls.model_config.get('title') or cls.__name__
+        rdf_type = NamedNode(f"{ cls.__rdf_namespace__() }{ name }")
+
+        rdf_types = [ rdf_type ]
+        for cl in cls.mro()[1:]:
+            if cl == RdfBaseModel:
+                break
+            rdf_types.append(cl.__rdf_type__())
+
+        field_predicates = {
+            field_name: cls._predicate_from_field_info(field_name)
+            for field_name in cls.model_fields.keys()
+        }
+
+        # computed fields are not stored, but their predicates are known so
+        # they are indexed as well
+        predicate_fields = {
+            cls._predicate_from_field_info(field_name): field_name
+            for field_name in cls.model_computed_fields.keys()
+        }
+        predicate_fields.update({ p: f for f, p in field_predicates.items() })
+
+        field_loading = dict()
+        for field_name, field_info in cls.model_fields.items():
+            loading = 'batched'
+            if isinstance(field_info.json_schema_extra, dict):
+                loading = field_info.json_schema_extra.get('loading', loading)
+            if loading not in LOADING_STRATEGIES:
+                raise ValueError(f"Unexpected loading strategy '{loading}' for field {cls.__name__}.{field_name}, expected one of {LOADING_STRATEGIES}")
+            field_loading[field_name] = loading
+
+        field_containers = dict()
+        for field_name, field_info in cls.model_fields.items():
+            container = 'bag'
+            if isinstance(field_info.json_schema_extra, dict):
+                container = field_info.json_schema_extra.get('container', container)
+            if container not in CONTAINERS:
+                raise ValueError(f"Unexpected container '{container}' for field {cls.__name__}.{field_name}, expected one of {tuple(CONTAINERS)}")
+            field_containers[field_name] = CONTAINERS[container]
+
+        field_encoders, field_decoders, field_members = dict(), dict(), dict()
+        for field_name, field_info in cls.model_fields.items():
+            field_encoders[field_name], field_decoders[field_name] = literal_codecs.field_converters(field_info.annotation)
+            field_members[field_name] = list_members(field_info.annotation)
+
+        unknown_predicates = cls.__rdf_unknown_predicates__()
+        if unknown_predicates not in ("raise", "ignore"):
+            raise ValueError(f"Unexpected __rdf_unknown_predicates__ value '{unknown_predicates}' for {cls}, expected 'raise' or 'ignore'")
+
+        return RdfMetadata(
+            uri_prefix=registry.uri_prefix,
+            title=f"{ registry.uri_prefix }{ name }",
+            rdf_type=rdf_type,
+            rdf_types=tuple(rdf_types),
+            field_predicates=MappingProxyType(field_predicates),
+            predicate_fields=MappingProxyType(predicate_fields),
+            computed_fields=frozenset(cls.model_computed_fields.keys()),
+            ignore_unknown_predicates=unknown_predicates == "ignore",
+            field_loading=MappingProxyType(field_loading),
+            field_containers=MappingProxyType(field_containers),
+            field_encoders=MappingProxyType(field_encoders),
+            field_decoders=MappingProxyType(field_decoders),
+            field_members=MappingProxyType(field_members),
+            codecs_version=literal_codecs.version,
+            custom_post_init=_defines_post_init(cls.model_post_init),
+        )
+
     @classmethod
     def __rdf_title__(cls)->str:
-        return f"{ registry.uri_prefix }{ cls.model_json_schema()['title'] }"
+        return cls.__rdf_metadata__().title
     
     @classmethod
     def __rdf_type__(cls) -> NamedNode:
-        return NamedNode(f"{ cls.__rdf_namespace__() }{ cls.model_json_schema()['title'] }")
-    
-    @classmethod
-    def __rdf_types__(cls) -> Generator[NamedNode, None, None]:
-        yield cls.__rdf_type__()
+        return cls.__rdf_metadata__().rdf_type
 
     @classmethod
     def __rdf_types__(cls) -> Generator[NamedNode, None, None]:
-        for cl in cls.mro():
-            if cl == RdfBaseModel:
-                break
-            yield cl.__rdf_type__()
+        yield from cls.__rdf_metadata__().rdf_types
 
     @model_validator(mode='before')
     @classmethod
@@ -68,10 +229,134 @@ class RdfBaseModel(BaseModel, AbstractNamedNode):
                     data[k] = registry.resolve_named_node(v)
         return data
 
+    def __getattr__(self, name:str)->Any:
+        # fields of lazy references are missing until the first access of
+        # any of them, which loads the whole object
+        if name in type(self).model_fields:
+            try:
+                private = object.__getattribute__(self, '__pydantic_private__')
+            except AttributeError:
+                private = None
+            if private and private.get('_rdf_unloaded'):
+                self._load_lazy_reference()
+                return self.__dict__[name]
+        return super().__getattr__(name)
+
+    def __setattr__(self, name:str, value:Any):
+        # assigning a field of a lazy reference loads it first, so the 
+        # change is saved along with the rest of the stored fields
+        if name in type(self).model_fields:
+            self._load_lazy_reference()
+        super().__setattr__(name, value)
+
+    def __eq__(self, other:Any)->bool:
+        self._load_lazy_reference()
+        if isinstance(other, RdfBaseModel):
+            other._load_lazy_reference()
+        return super().__eq__(other)
+
+    def model_dump(self, *args, **kwargs)->Dict[str, Any]:
+        self._load_lazy_references()
+        return super().model_dump(*args, **kwargs)
+
+    def model_dump_json(self, *args, **kwargs)->str:
+        self._load_lazy_references()
+        return super().model_dump_json(*args, **kwargs)
+
+    def _load_lazy_references(self):
+        """
+        Loads the object and every lazy reference reachable from it, nodes
+        are loaded as the walk reaches them so their references are walked
+        too.
+        """
+        for obj in walk_named_nodes(self):
+            if isinstance(obj, RdfBaseModel):
+                obj._load_lazy_reference()
+
     @classmethod
-    def _get_predicate_from_field(cls, field_name:str)->NamedNode:
+    def _construct_trusted(cls, data:Dict[str, Any])->'RdfBaseModel':
         """
-        Returns predicate for given field name. 
+        Builds an instance from values that already have the field types,
+        without validation. Same as `model_construct`, which spends more
+        time on generic handling (aliases, extra fields) than pydantic 
+        spends validating.
+
+        Missing required fields raise the `ValidationError` validation 
+        would, and so does a missing identifier, which is never generated.
+        """
+        values = dict()
+        missing = []
+        for field_name, field_info in cls.model_fields.items():
+            if field_name in data:
+                values[field_name] = data[field_name]
+            elif field_name == 'identifier' or field_info.is_required():
+                missing.append({ 'type': 'missing', 'loc': (field_name, ), 'input': data })
+            else:
+                values[field_name] = field_info.get_default(call_default_factory=True)
+        if missing:
+            raise ValidationError.from_exception_data(cls.__name__, missing)
+
+        obj = cls.__new__(cls)
+        object.__setattr__(obj, '__dict__', values)
+        object.__setattr__(obj, '__pydantic_fields_set__', set(data))
+        object.__setattr__(obj, '__pydantic_extra__', None)
+        private = dict()
+        for name, attr in cls.__private_attributes__.items():
+            default = attr.get_default()
+            if default is not PydanticUndefined:
+                private[name] = default
+        object.__setattr__(obj, '__pydantic_private__', private)
+        if cls.__rdf_metadata__().custom_post_init:
+            obj.model_post_init(None)
+        return obj
+
+    @classmethod
+    def lazy_reference(cls, uri:NamedNode, hydrator:Hydrator)->'RdfBaseModel':
+        """
+        Returns an instance holding only the identifier of given uri, the
+        rest fields are loaded from the triple store on first access.
+        """
+        identifier = uuid.UUID(uri.value[len(cls.__rdf_title__()) + 1:])
+        obj = cls.model_construct(identifier=identifier)
+        object.__setattr__(obj, '__dict__', { 'identifier': identifier })
+        obj.__pydantic_private__['_rdf_unloaded'] = True
+        return obj
+
+    @classmethod
+    def lazy_predicates(cls, loading:dict)->frozenset:
+        metadata = cls.__rdf_metadata__()
+        strategies = dict(metadata.field_loading)
+        for field_name, strategy in loading.items():
+            if strategy not in LOADING_STRATEGIES:
+                raise ValueError(f"Unexpected loading strategy '{strategy}' for field {field_name}, expected one of {LOADING_STRATEGIES}")
+            if field_name in strategies:
+                strategies[field_name] = strategy
+        return frozenset(
+            metadata.field_predicates[field_name]
+            for field_name, strategy in strategies.items() if strategy == 'lazy')
+
+    def _load_lazy_reference(self):
+        """
+        Loads fields of a lazy reference, does nothing for loaded objects.
+        """
+        if not self.__pydantic_private__ or not self.__pydantic_private__.get('_rdf_unloaded'):
+            return
+        cls = self.__class__
+        uri = self.__rdf_uri__
+        hydrator = Hydrator()
+        triples = hydrator.triples(uri)
+        if not triples:
+            raise UnresovableNode(f"Could not load {uri}, no triples found in triple store")
+        loaded = cls.from_triples(uri, triples, hydrator)
+        object.__setattr__(self, '__dict__', loaded.__dict__)
+        object.__setattr__(self, '__pydantic_fields_set__', loaded.__pydantic_fields_set__)
+        self.__pydantic_private__['_rdf_snapshot'] = loaded._rdf_snapshot
+        self.__pydantic_private__['_rdf_unloaded'] = False
+
+    @classmethod
+    def _predicate_from_field_info(cls, field_name:str)->NamedNode:
+        """
+        Computes predicate for given field name from its field info. 
         """
         predicate = None
         field_info = None
@@ -91,32 +376,57 @@ class RdfBaseModel(BaseModel, AbstractNamedNode):
             return predicate
         raise ValueError(f"Unexpected field predicate type {type(predicate)} for field {cls.__rdf_title__()}.{field_name}")
 
+    @classmethod
+    def _get_predicate_from_field(cls, field_name:str)->NamedNode:
+        """
+        Returns predicate for given field name. 
+        """
+        predicate = cls.__rdf_metadata__().field_predicates.get(field_name)
+        if predicate is None:
+            return cls._predicate_from_field_info(field_name)
+        return predicate
+
     @classmethod
     def _get_field_name_from_predicate(cls, predicate:NamedNode)->Field:
         """
         Returns field name for given predicate. 
         """
-        for field_name in cls.model_fields.keys():
-            if predicate in [ RDF.type ]:
+        metadata = cls.__rdf_metadata__()
+        field_name = metadata.predicate_fields.get(predicate)
+        if field_name is None:
+            if predicate == RDF.type or metadata.ignore_unknown_predicates:
                 return None
-            elif predicate == cls._get_predicate_from_field(field_name):
-                return field_name
-        raise ValueError(f'No field match given predicate {predicate}, for class {cls.__rdf_title__()}')
+            raise ValueError(f'No field match given predicate {predicate}, for class {cls.__rdf_title__()}')
+        return field_name
 
     def to_triples(self, recursive=True)->Generator[Triple, None, None]:
         """ 
         Serialize model to list of triples
+
+        With `recursive` set, triples of every related object follow, each
+        object serialized once however many times it is referenced (see
+        `walk_named_nodes`). Lazy references that were never accessed are 
+        stored unchanged, so they yield no triples.
         """
+        if self.__pydantic_private__ and self.__pydantic_private__.get('_rdf_unloaded'):
+            return
+
+        if recursive:
+            for obj in walk_named_nodes(self):
+                yield from obj.to_triples(recursive=False)
+            return
         
         # every triple will use __rdf_uri__ as subject  
         subject = self.__rdf_uri__
 
+        metadata = self.__rdf_metadata__()
+
         # First map current and parent classes to rdf:type triples
-        for rdf_type in self.__rdf_types__():
+        for rdf_type in metadata.rdf_types:
             yield Triple(subject, RDF.type, rdf_type)
 
-        # Loop through all pydantic fields 
-        for field_name in self.model_fields.keys():
+        # Loop through all pydantic fields and their predicates
+        for field_name, predicate in metadata.field_predicates.items():
 
             # load actual field value
             python_value = getattr(self, field_name)
@@ -125,49 +435,232 @@ class RdfBaseModel(BaseModel, AbstractNamedNode):
             if python_value == None:
                 continue
 
-            # load predicate from field.
-            predicate = self._get_predicate_from_field( field_name )
+            # lists are stored in the container of their field
+            if type(python_value) is list and metadata.field_containers[field_name] is not Bag:
+                container = metadata.field_containers[field_name]
+                python_value = container(python_value, node=container.node_for(subject, predicate))
 
             # convert field's value to triples
-            for triple in python_value_to_triples(subject, predicate, python_value, recursive=recursive):
+            for triple in python_value_to_triples(
+                                subject, 
+                                predicate, 
+                                python_value, 
+                                recursive=False, 
+                                encode=metadata.field_encoders.get(field_name)):
                 yield triple
 
+    def __rdf_references__(self)->Iterable[Any]:
+        if self._rdf_unloaded:
+            return ()
+        return (getattr(self, field_name) for field_name in self.__rdf_metadata__().field_predicates)
+
+
+    def to_quads(self, recursive=True)->Generator[Quad, None, None]:
+        """
+        Serialize model to quads, triples of the lists the object holds
+        are kept in the graph of the object.
+        """
+        graph = self.__rdf_graph__()
+        for s, p, o in self.to_triples(recursive=False):
+            yield Quad(s, p, o, graph)
+        if recursive:
+            for obj in self._related_models():
+                yield from obj.to_quads(recursive=False)
 
     @classmethod
     def resolve_named_node(cls, uri:NamedNode):
+        return Hydrator().resolve(uri, cls)
+
+    @classmethod
+    def from_triples(cls, uri:NamedNode, triples:list, hydrator:Hydrator):
+        if not triples:
+            raise UnresovableNode(f"Could not load {uri}, no triples found in triple store")
         data = dict()
+        metadata = cls.__rdf_metadata__()
+        predicate_fields = metadata.predicate_fields
+        lazy_predicates = hydrator.lazy_predicates(cls)
 
-        # Request all triples relevant to given uri from triple store. 
-        for s, p, o in registry.triple_store.query(f"DESCRIBE {uri}"):
+        # Loop through all triples loaded for given uri
+        for p, o in triples:
 
             # get field from predicate 
-            field_name = cls._get_field_name_from_predicate(p)
+            field_name = predicate_fields.get(p)
             
             # if we cant find a field corresponding to given predicate
-            # then we continue to the next triple
-            if not field_name:
+            # (rdf:type or unknown predicate) then we continue to the next
+            # triple, or raise if the class doesnt allow unknown predicates
+            if field_name is None:
+                if p == RDF.type or metadata.ignore_unknown_predicates:
+                    continue
+                raise ValueError(f'No field match given predicate {p}, for class {cls.__rdf_title__()}')
+
+            # computed fields are derived from the rest of the fields
+            if field_name in metadata.computed_fields:
                 continue
 
             # At this stage we know that the triple refer to an actual field
             # So first we check if the field can be resolved (points to a model
             # in our registry)  
-            if registry.uri_can_resolve(o):
-                # if object points to a model in registry, then we return it
-                # as is and will be resolved at a later stage
-                data[field_name] = o
+            if isinstance(o, NamedNode) and registry.uri_can_resolve(o):
+                # lists convert their members to the member type of the field
+                members = metadata.field_members[field_name]
+                if members is not None:
+                    hydrator.set_list_members(o, members)
+
+                # if object points to a model in registry, then the hydrator
+                # has already loaded its triples so we build it from memory,
+                # unless the field is loaded lazily
+                if p in lazy_predicates:
+                    data[field_name] = hydrator.lazy(o)
+                else:
+                    data[field_name] = hydrator.resolve(o)
             
             # If object doesnt point to a model in our registry, we assume
             # that is a literal value so we try to convert it back to pythonic 
             # value
             else:
-                data[field_name] = literal_rdf_to_python(o)
+                data[field_name] = metadata.field_decoders[field_name](o)
+
+        if hydrator.validate:
+            obj = cls(**data)
+        else:
+            # values are already converted to the field types, lists are
+            # passed as plain lists the way validation would
+            for field_name, value in data.items():
+                if isinstance(value, list):
+                    data[field_name] = _plain_list(value)
+            obj = cls._construct_trusted(data)
+        # keep what is stored, so saving writes only what changed
+        obj._set_snapshot(frozenset(hydrator.owned_triples(uri)))
+        return obj
+
+    def _owned_triples(self)->FrozenSet[Triple]:
+        """
+        Returns triples of the object and of the lists it holds.
+        """
+        return frozenset(self.to_triples(recursive=False))
 
-        return cls(**data)
+    def _related_models(self)->List[AbstractNamedNode]:
+        """
+        Returns all models reachable from the object's fields.
+        """
+        related = walk_named_nodes(self)
+        next(related)
+        return list(related)
+
+    def _set_snapshot(self, snapshot:Optional[FrozenSet[Triple]]):
+        """
+        Keeps given stored triples of the object, taken from the current
+        triple store.
+        """
+        if snapshot is not None:
+            snapshot = Snapshot(snapshot)
+            snapshot.store = weakref.ref(registry.triple_store)
+        self.__pydantic_private__['_rdf_snapshot'] = snapshot
+
+    def _stored_snapshot(self)->Optional[FrozenSet[Triple]]:
+        """
+        Returns the snapshot of the object, or None if it was taken from 
+        another triple store than the current one.
+        """
+        snapshot = self._rdf_snapshot
+        if not isinstance(snapshot, Snapshot) or snapshot.store() is not registry.triple_store:
+            return None
+        return snapshot
+
+    def dirty_fields(self)->Set[str]:
+        """
+        Returns names of fields changed since the object was loaded or
+        saved. All fields are dirty for objects never stored.
+        """
+        if self._rdf_unloaded:
+            return set()
+        snapshot = self._stored_snapshot()
+        if snapshot is None:
+            return set(self.model_fields.keys())
+        current = self._owned_triples()
+
+        uri = self.__rdf_uri__
+        predicate_fields = self.__rdf_metadata__().predicate_fields
+        # lists are mapped back to the subject and predicate holding them
+        holders = { o: (s, p) for s, p, o in current | snapshot if isinstance(o, NamedNode) }
+
+        fields = set()
+        for s, p, o in current ^ snapshot:
+            while s != uri and s in holders:
+                s, p = holders[s]
+            if s == uri and p in predicate_fields:
+                fields.add(predicate_fields[p])
+        return fields
 
     def save(self, recursive=True):
-        if self.__class__.objects.exists(self):
-            self.__class__.objects.delete(self)
-        self.__class__.objects.create(self, recursive=recursive)
+        """
+        Stores the object, and its related objects when `recursive` is set.
+
+        Only triples added or removed since the objects were loaded or last
+        saved are written, all of them in a single store operation. Objects 
+        that were not loaded from the store, were loaded from another store
+        or were deleted since, are compared with what is currently stored.
+        """
+        # lazy references that were never accessed have nothing to save
+        if self._rdf_unloaded:
+            return
+
+        objects = [ self ]
+        inserts, deletes = [], []
+
+        if recursive:
+            for obj in self._related_models():
+                if isinstance(obj, RdfBaseModel):
+                    # lazy references that were never accessed have nothing to save
+                    if not obj._rdf_unloaded:
+                        objects.append(obj)
+                else:
+                    # other named node types can not be compared, so their 
+                    # triples are added as they are
+                    inserts.extend(obj.to_quads(recursive=False))
+
+        # a diff is only valid while the object is still stored
+        store = registry.triple_store
+        snapshots = []
+        for obj in objects:
+            snapshot = obj._stored_snapshot()
+            if snapshot is not None and not store.has_subject(obj.__rdf_uri__):
+                snapshot = None
+            snapshots.append(snapshot)
+
+        hydrator = Hydrator(use_session=False)
+        hydrator.fetch_owned(obj.__rdf_uri__ for obj, snapshot in zip(objects, snapshots) if snapshot is None)
+
+        written = []
+        for obj, snapshot in zip(objects, snapshots):
+            current = obj._owned_triples()
+            if snapshot is None:
+                snapshot = frozenset(hydrator.owned_triples(obj.__rdf_uri__))
+            graph = obj.__rdf_graph__()
+            deletes.extend(Quad(s, p, o, graph) for s, p, o in snapshot - current)
+            inserts.extend(Quad(s, p, o, graph) for s, p, o in current - snapshot)
+            written.append((obj, current))
+
+        registry.write(inserts=inserts, deletes=deletes)
+
+        previous = [ (obj, obj._rdf_snapshot) for obj, _ in written ]
+        def rollback():
+            for obj, snapshot in previous:
+                obj._rdf_snapshot = snapshot
+        registry.on_rollback(rollback)
+
+        for obj, current in written:
+            obj._set_snapshot(current)
 
     def delete(self):
         self.__class__.objects.delete(self)
+
+    async def asave(self, recursive=True):
+        """
+        Same as `save`, without blocking the event loop.
+        """
+        await aio.run_sync(self.save, recursive=recursive)
+
+    async def adelete(self):
+        await aio.run_sync(self.delete)
@@ -1,11 +1,30 @@
 
 
 import uuid
-from typing import Generator, Union, TYPE_CHECKING
+import contextvars
+from itertools import islice
+from dataclasses import dataclass
+from threading import Lock
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from typing import Any, AsyncGenerator, Callable, Dict, Generator, Hashable, Iterable, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING, get_args, get_origin
 from pyoxigraph import *
 
-from cellini.odm.utils import literal_python_to_rdf, RDF, DCTERMS
-from cellini.odm.base  import registry
+from cellini.odm.utils import literal_python_to_rdf, literal_rdf_to_python, RDF, RDF_MEMBER_PREFIX
+from cellini.odm.base  import AbstractNamedNode, registry, BulkStats
+from cellini.odm.hydration import Hydrator, HYDRATION_CHUNK_SIZE
+from cellini.odm import aio
+
+try:
+    from types import UnionType
+except ImportError: # python < 3.10
+    UnionType = Union
+
+try:
+    import numpy
+except ImportError: # optional, only needed by `QuerySet.to_columns`
+    numpy = None
 
 class Query(object):
 
@@ -14,45 +33,881 @@ class Query(object):
 
     @property
     def query(self):
-        return registry.triple_store.query
+        return registry.query
     
     def create(self, obj:'RdfBaseModel', **kwargs):
-        for s,p,o in obj.to_triples(**kwargs):
-            registry.triple_store.add(Quad(s, p, o))
+        registry.write(inserts=obj.to_quads(**kwargs))
+
+    def bulk_create(self, objs:Iterable['RdfBaseModel'], batch_size:int=1000, **kwargs)->BulkStats:
+        """
+        Stores many new objects at once, see `RdfRegistry.bulk_save`.
+        """
+        def checked():
+            for obj in objs:
+                if not isinstance(obj, self.model_class):
+                    raise TypeError(f"{self.model_class.__name__}.objects.bulk_create expects {self.model_class.__name__} instances, but {type(obj)} given")
+                yield obj
+
+        return registry.bulk_save(checked(), batch_size=batch_size, **kwargs)
     
     def exists(self, obj:'RdfBaseModel')->bool:
-        return self.query(f"ASK {{ ?s  { DCTERMS.identifier } { literal_python_to_rdf(obj.identifier) } }}")
+        return registry.triple_store.has_subject(obj.__rdf_uri__)
 
     def delete(self, obj:'RdfBaseModel'):
-        for s, p, o in self.query(f"DESCRIBE {obj.__rdf_uri__}"):
-            registry.triple_store.remove(Quad(s, p, o))
+        """
+        Removes triples of the object and of the lists it holds.
+        """
+        uri = obj.__rdf_uri__
+        hydrator = Hydrator(use_session=False)
+        hydrator.fetch_owned([ uri ])
+        graph = obj.__rdf_graph__()
+        registry.write(deletes=[ Quad(s, p, o, graph) for s, p, o in hydrator.owned_triples(uri) ])
 
-    def filter(self, **kwargs)->Generator['RdfBaseModel', None, None]:
-        filters = []
-        
-        for k, v in kwargs.items():
-            predicate = self.model_class._get_predicate_from_field(k)    
-            value = literal_python_to_rdf(v)
-            filters.append(f"?s {predicate} {value}")
-        
-        filter_clause = f"FILTER EXISTS {{ {';'.join(filters)} }}"
-
-        for q in self.query(f"""SELECT DISTINCT ?s WHERE {{
-            ?s { RDF.type } { self.model_class.__rdf_type__() } .
-            {filter_clause}
-        }}"""):
-            yield self.resolve(q['s'])
-
-    def all(self)->Generator['RdfBaseModel', None, None]:
-        return self.filter()
-
-    def get(self, identifier:Union[str, uuid.UUID])->'RdfBaseModel':
-        return registry.resolve_named_node(NamedNode(f"{ self.model_class.__rdf_title__() }:{ identifier }"))
+        snapshot = obj._rdf_snapshot
+        def rollback():
+            obj._rdf_snapshot = snapshot
+        registry.on_rollback(rollback)
+        obj._set_snapshot(None)
+
+    def quads(self, chunk_size:int=HYDRATION_CHUNK_SIZE)->Generator[Quad, None, None]:
+        """
+        Yields stored quads of all objects of the model and of its 
+        registered subclasses. 
+
+        Models kept in named graphs are read straight from their graphs, 
+        otherwise objects are selected and their triples are requested 
+        `chunk_size` objects at a time, while selected uris are read.
+        """
+        graphs = registry.graphs_of(self.model_class)
+        if graphs is not None:
+            for graph in graphs:
+                yield from registry.triple_store.quads_for_pattern(graph_name=graph)
+            return
+
+        uris = self.all().uris()
+        while True:
+            chunk = list(islice(uris, chunk_size))
+            if not chunk:
+                return
+            hydrator = Hydrator(use_session=False)
+            hydrator.fetch_owned(chunk)
+            for uri in chunk:
+                graph = registry.uri_to_basemodel(uri).__rdf_graph__()
+                for s, p, o in hydrator.owned_triples(uri):
+                    yield Quad(s, p, o, graph)
+
+    def export(self, output, mime_type:str="application/n-quads"):
+        """
+        Serializes stored quads of the model (see `quads`) to given file 
+        or path, in any quad format supported by pyoxigraph.
+        """
+        serialize(self.quads(), output, mime_type)
+
+    def clear(self):
+        """
+        Removes all objects of the model and of its registered subclasses. 
+        Models kept in named graphs have their graphs dropped, without 
+        selecting their objects first.
+        """
+        graphs = registry.graphs_of(self.model_class)
+        if graphs is None:
+            registry.write(deletes=list(self.quads()))
+            return
+        for graph in graphs:
+            registry.clear_graph(graph)
+
+    def filter(self, **kwargs)->'QuerySet':
+        """
+        Returns objects whose fields match given values, see 
+        `QuerySet.filter`. Every keyword is a lookup, loading options are 
+        set with `all` or with queryset methods (`loading`, `parallel`, 
+        `validate`).
+        """
+        return self.all().filter(**kwargs)
+
+    def all(self, 
+                *,
+                loading:Optional[Dict[str, str]]=None, 
+                workers:Optional[int]=None, 
+                validate:bool=False)->'QuerySet':
+        """
+        Returns all objects. `loading` overrides the loading strategy of 
+        fields by name (see `LOADING_STRATEGIES`), `workers` loads results
+        in parallel (see `QuerySet.iter_parallel`) and `validate` runs 
+        pydantic validation on loaded objects.
+        """
+        return QuerySet(self.model_class, loading=loading, workers=workers, validate=validate)
+
+    def loading(self, **strategies:str)->'QuerySet':
+        return self.all().loading(**strategies)
+
+    def parallel(self, workers:int)->'QuerySet':
+        return self.all().parallel(workers)
+
+    def validate(self, validate:bool=True)->'QuerySet':
+        return self.all().validate(validate)
+
+    def order_by(self, *fields:str)->'QuerySet':
+        return self.all().order_by(*fields)
+
+    def limit(self, limit:int)->'QuerySet':
+        return self.all().limit(limit)
+
+    def offset(self, offset:int)->'QuerySet':
+        return self.all().offset(offset)
+
+    def after(self, identifier:Union[str, uuid.UUID])->'QuerySet':
+        return self.all().after(identifier)
+
+    def count(self)->int:
+        return self.all().count()
+
+    def first(self)->Optional['RdfBaseModel']:
+        return self.all().first()
+
+    def values(self, *fields:str)->Generator[Dict[str, Any], None, None]:
+        return self.all().values(*fields)
+
+    def values_list(self, *fields:str, flat:bool=False)->Generator[Any, None, None]:
+        return self.all().values_list(*fields, flat=flat)
+
+    def to_columns(self, *fields:str)->Dict[str, Any]:
+        return self.all().to_columns(*fields)
+
+    def get(self, 
+                identifier:Union[str, uuid.UUID], 
+                *,
+                loading:Optional[Dict[str, str]]=None, 
+                validate:bool=False)->'RdfBaseModel':
+        return Hydrator(loading=loading, validate=validate).resolve(NamedNode(f"{ self.model_class.__rdf_title__() }:{ identifier }"))
 
     def resolve(self, uri:NamedNode)->'RdfBaseModel':
         return registry.resolve_named_node(uri)
+
+    async def aget(self, 
+                    identifier:Union[str, uuid.UUID], 
+                    *,
+                    loading:Optional[Dict[str, str]]=None, 
+                    validate:bool=False)->'RdfBaseModel':
+        """
+        Same as `get`, without blocking the event loop.
+        """
+        return await aio.run_sync(self.get, identifier, loading=loading, validate=validate)
+
+    def afilter(self, **kwargs)->AsyncGenerator['RdfBaseModel', None]:
+        """
+        Same as `filter`, but returns an async generator of matching objects.
+        Use `QuerySet.aiterator` to set the chunk size.
+
+            async for person in Person.objects.afilter(age=30):
+                ...
+        """
+        return self.filter(**kwargs).aiterator()
+
+    async def acount(self)->int:
+        return await self.all().acount()
  
 
 
+class QuerySet(object):
+    """QuerySet
+
+    Lazy, chainable selection of objects of a model. 
+
+    Every method returns a new queryset and nothing is requested from the
+    triple store until the queryset is iterated (or counted). Iteration
+    runs a single SELECT query and loads the matching objects in chunks, 
+    so results are streamed instead of kept in memory. Objects are built 
+    from stored data without validating them, unless `validate` is set.
+
+        Person.objects.filter(age=30).order_by('-name').offset(20).limit(10)
+    """
+
+    def __init__(self, 
+                    model_class:'RdfBaseModel', 
+                    filters:Tuple[Tuple[str, Any], ...]=(),
+                    ordering:Tuple[str, ...]=(),
+                    limit:Optional[int]=None,
+                    offset:Optional[int]=None,
+                    after:Optional[str]=None,
+                    loading:Optional[Dict[str, str]]=None,
+                    workers:Optional[int]=None,
+                    validate:bool=False):
+        if workers is not None and workers < 1:
+            raise ValueError(f"workers should be a positive integer, but {workers} given")
+        self.model_class = model_class
+        self._filters = filters
+        self._ordering = ordering
+        self._limit = limit
+        self._offset = offset
+        self._after = after
+        self._loading = loading
+        self._workers = workers
+        self._validate = validate
+
+    def _clone(self, **changes)->'QuerySet':
+        attrs = dict(
+            filters=self._filters,
+            ordering=self._ordering,
+            limit=self._limit,
+            offset=self._offset,
+            after=self._after,
+            loading=self._loading,
+            workers=self._workers,
+            validate=self._validate,
+        )
+        attrs.update(changes)
+        return QuerySet(self.model_class, **attrs)
+
+    def _field_predicate(self, field_name:str)->NamedNode:
+        if field_name not in self.model_class.model_fields:
+            raise ValueError(f"{self.model_class.__name__} has no field '{field_name}'")
+        return self.model_class._get_predicate_from_field(field_name)
+
+    def filter(self, **kwargs)->'QuerySet':
+        """
+        Narrows the queryset to objects whose fields match given values.
+
+        Keys are field names, optionally followed by related model fields
+        and a lookup (see `LOOKUPS`), separated by `__`. Fields holding 
+        lists match if any of their members does.
+
+            Person.objects.filter(age__gte=18, name__startswith="J")
+            Organization.objects.filter(owner__name__in=["John", "Jane"])
+        """
+        filters = []
+        for key, value in kwargs.items():
+            fields, lookup = split_lookup(key)
+            self._path(key)
+            if lookup == 'exact' and value is None:
+                key, value, lookup = f"{ '__'.join(fields) }__isnull", True, 'isnull'
+            if lookup == 'range' and (isinstance(value, (str, bytes)) or len(value) != 2):
+                raise ValueError(f"{ key } expects a (start, end) pair, but { value } given")
+            if lookup == 'in':
+                value = tuple(value)
+            filters.append((key, value))
+        return self._clone(filters=self._filters + tuple(filters))
+
+    def order_by(self, *fields:str)->'QuerySet':
+        """
+        Orders results by given fields, prefix a field with `-` for 
+        descending order. Replaces any previous ordering.
+        """
+        for field_name in fields:
+            self._field_predicate(field_name.lstrip('-'))
+        if self._after is not None and fields[:1] != ('identifier', ):
+            raise ValueError("Keyset pagination (after) requires ordering by identifier")
+        return self._clone(ordering=tuple(fields))
+
+    def limit(self, limit:int)->'QuerySet':
+        if limit < 0:
+            raise ValueError(f"limit should not be negative, but {limit} given")
+        return self._clone(limit=limit)
+
+    def offset(self, offset:int)->'QuerySet':
+        if offset < 0:
+            raise ValueError(f"offset should not be negative, but {offset} given")
+        return self._clone(offset=offset)
+
+    def after(self, identifier:Union[str, uuid.UUID])->'QuerySet':
+        """
+        Keyset pagination, returns objects whose identifier comes after 
+        given one, ordered by identifier.
+
+        Unlike offset, the store doesnt have to skip previous pages, pass
+        the identifier of the last object of a page to get the next one.
+        """
+        if self._ordering and self._ordering[0] != 'identifier':
+            raise ValueError("Keyset pagination (after) requires ordering by identifier")
+        return self._clone(after=f"{identifier}", ordering=self._ordering or ('identifier', ))
+
+    def parallel(self, workers:int)->'QuerySet':
+        """
+        Loads results with given number of threads when iterated, see 
+        `iter_parallel`.
+        """
+        if workers < 1:
+            raise ValueError(f"workers should be a positive integer, but {workers} given")
+        return self._clone(workers=workers)
+
+    def loading(self, **strategies:str)->'QuerySet':
+        """
+        Overrides the loading strategy of fields by name, see 
+        `LOADING_STRATEGIES`.
+
+            Organization.objects.filter(name="org").loading(owner='lazy')
+        """
+        return self._clone(loading={ **(self._loading or {}), **strategies })
+
+    def validate(self, validate:bool=True)->'QuerySet':
+        """
+        Runs pydantic validation on loaded objects, which are otherwise 
+        built from stored data without validation.
+        """
+        return self._clone(validate=validate)
+
+    def _path(self, key:str)->List[Tuple[NamedNode, bool]]:
+        """
+        Returns the (predicate, holds a list) steps from `?s` to the value 
+        filtered by given lookup key.
+        """
+        fields, _ = split_lookup(key)
+        model = self.model_class
+        steps = []
+        for depth, field_name in enumerate(fields):
+            if model is None:
+                if depth == len(fields) - 1 and key.count('__') == depth:
+                    # lookups are only split off when known, so the last
+                    # name after a literal field is an unsupported lookup
+                    raise ValueError(f"Unsupported lookup '{ field_name }', expected one of { LOOKUPS }")
+                raise ValueError(f"Field '{ fields[depth - 1] }' of lookup '{ key }' is not a relation")
+            if field_name not in model.model_fields:
+                raise ValueError(f"{model.__name__} has no field '{field_name}'")
+            related, many = field_relation(model.model_fields[field_name].annotation)
+            steps.append((model._get_predicate_from_field(field_name), many))
+            model = related
+        return steps
+
+    @staticmethod
+    def _path_patterns(idx:int, steps:List[Tuple[NamedNode, bool]], target:str)->List[str]:
+        """
+        Returns patterns walking given steps from `?s` to `target`, members
+        of lists are reached through their `rdf:_<N>` predicates.
+        """
+        patterns = []
+        subject = "?s"
+        for depth, (predicate, many) in enumerate(steps):
+            node = target if depth == len(steps) - 1 else f"?t{idx}_{depth}"
+            if many:
+                patterns.append(
+                    f"{ subject } { predicate } ?bag{idx}_{depth} . ?bag{idx}_{depth} ?member{idx}_{depth} { node } . "
+                    f"FILTER (STRSTARTS(STR(?member{idx}_{depth}), \"{ RDF_MEMBER_PREFIX }\"))")
+            else:
+                patterns.append(f"{ subject } { predicate } { node } .")
+            subject = node
+        return patterns
+
+    def _lookup_patterns(self, idx:int, key:str, value:Any)->List[str]:
+        """
+        Returns patterns and filters of a lookup, its values are bound to
+        `?f<N>` variables (see `_bindings`).
+        """
+        _, lookup = split_lookup(key)
+        steps = self._path(key)
+
+        if lookup in ('exact', 'in'):
+            return self._path_patterns(idx, steps, f"?f{idx}")
+        if lookup == 'isnull':
+            exists = ' '.join(self._path_patterns(idx, steps, f"?v{idx}"))
+            return [ f"FILTER { 'NOT EXISTS' if value else 'EXISTS' } {{ { exists } }}" ]
+
+        patterns = self._path_patterns(idx, steps, f"?v{idx}")
+        if lookup == 'range':
+            patterns.append(f"FILTER (?v{idx} >= ?f{idx}_0 && ?v{idx} <= ?f{idx}_1)")
+        elif lookup == 'startswith':
+            patterns.append(f"FILTER (STRSTARTS(STR(?v{idx}), ?f{idx}))")
+        else:
+            patterns.append(f"FILTER (?v{idx} { COMPARISONS[lookup] } ?f{idx})")
+        return patterns
+
+    def _where(self)->Tuple[List[str], List[str]]:
+        """
+        Returns graph patterns selecting `?s`, plus variables used for
+        ordering as `?order<N>`. Filter values are not part of the patterns,
+        they are bound to `?f<N>` (see `_bindings`).
+
+        Patterns are split to the ones matching triples of `?s` itself, and
+        the ones following relations to other objects.
+        """
+        local = [ f"?s { RDF.type } { self.model_class.__rdf_type__() } ." ]
+        related = []
+
+        for idx, (key, value) in enumerate(self._filters):
+            patterns = self._lookup_patterns(idx, key, value)
+            if len(split_lookup(key)[0]) > 1:
+                related.extend(patterns)
+            else:
+                local.extend(patterns)
+
+        for idx, field_name in enumerate(self._ordering):
+            local.append(f"OPTIONAL {{ ?s { self._field_predicate(field_name.lstrip('-')) } ?order{idx} }}")
+
+        if self._after is not None:
+            local.append("FILTER (STR(?order0) > ?after)")
+
+        return local, related
+
+    def _bindings(self)->str:
+        """
+        Returns the VALUES clauses binding filter values to the variables
+        of `_where`, a single row for most lookups and a row per value for
+        `in` lookups.
+        """
+        variables, terms, clauses = [], [], []
+        for idx, (key, value) in enumerate(self._filters):
+            _, lookup = split_lookup(key)
+            if lookup == 'isnull':
+                continue
+            elif lookup == 'in':
+                clauses.append(f"VALUES ?f{idx} {{ { ' '.join(f'{ python_value_to_term(item) }' for item in value) } }}")
+            elif lookup == 'range':
+                variables.extend([ f"?f{idx}_0", f"?f{idx}_1" ])
+                terms.extend(f"{ python_value_to_term(item) }" for item in value)
+            elif lookup == 'startswith':
+                variables.append(f"?f{idx}")
+                terms.append(f"{ Literal(f'{value}') }")
+            else:
+                variables.append(f"?f{idx}")
+                terms.append(f"{ python_value_to_term(value) }")
+        if self._after is not None:
+            variables.append("?after")
+            terms.append(f"{ literal_python_to_rdf(self._after) }")
+        if variables:
+            clauses.append(f"VALUES ({ ' '.join(variables) }) {{ ({ ' '.join(terms) }) }}")
+        return ''.join(f"{ clause } " for clause in clauses)
+
+    def _scope(self, local:List[str], related:List[str])->Tuple[str, str]:
+        """
+        Returns the text before and after the bindings of the group matching
+        given patterns. Patterns of `?s` itself are restricted to the named 
+        graphs of the model when its instances are kept in named graphs,
+        related objects are matched in any graph.
+        """
+        graphs = registry.graphs_of(self.model_class)
+        if graphs is None:
+            return '', ' '.join(local + related)
+        return (
+            f"VALUES ?g {{ { ' '.join(f'{graph}' for graph in graphs) } }} GRAPH ?g {{ ", 
+            f"{ ' '.join(local) } }} { ' '.join(related) }")
+
+    def _order_by(self)->str:
+        if not self._ordering:
+            return ''
+        conditions = [
+            f"DESC(?order{idx})" if field_name.startswith('-') else f"ASC(?order{idx})"
+            for idx, field_name in enumerate(self._ordering)
+        ]
+        # subject breaks ties, so pages are stable
+        return f"ORDER BY { ' '.join(conditions) } ?s"
+
+    def _slice(self)->str:
+        modifiers = []
+        if self._limit is not None:
+            modifiers.append(f"LIMIT { self._limit }")
+        if self._offset is not None:
+            modifiers.append(f"OFFSET { self._offset }")
+        return ' '.join(modifiers)
+
+    def _compiled(self, kind:str, fields:Tuple[str, ...]=())->'CompiledQuery':
+        """
+        Returns the compiled query of given kind (`select`, `rows` or 
+        `count`) for the shape of this queryset, from `query_cache`.
+        """
+        graphs = registry.graphs_of(self.model_class)
+        key = (
+            kind,
+            self.model_class,
+            registry.uri_prefix,
+            graphs,
+            # isnull lookups change the query text, other values are bound
+            tuple((key, value if split_lookup(key)[1] == 'isnull' else None) for key, value in self._filters),
+            self._ordering,
+            self._limit is not None,
+            self._offset is not None,
+            self._after is not None,
+            fields,
+        )
+        return query_cache.get(key, lambda: self._compile(kind, fields))
+
+    def _compile(self, kind:str, fields:Tuple[str, ...]=())->'CompiledQuery':
+        """
+        Builds the SPARQL text of given query kind around the parts that 
+        change between executions.
+        """
+        local, related = self._where()
+        variables = ''
+        if kind == 'rows':
+            for idx, field_name in enumerate(fields):
+                local.append(f"OPTIONAL {{ ?s { self._field_predicate(field_name) } ?value{idx} }}")
+            variables = ' ' + ' '.join(f"?value{idx}" for idx in range(len(fields)))
+        before, after = self._scope(local, related)
+
+        # solutions of queries matching triples of ?s only can be merged
+        # from wherever subjects are stored, unless they are sorted or
+        # sliced. List members are triples of another subject
+        per_subject = not related \
+            and not any(many for key, _ in self._filters for _, many in self._path(key)) \
+            and self._limit is None and self._offset is None \
+            and (kind == 'count' or not self._ordering)
+
+        if kind != 'count':
+            return CompiledQuery(
+                f"SELECT DISTINCT ?s{ variables } WHERE {{ { before }",
+                f"{ after } }} { self._order_by() } ",
+                "",
+                per_subject)
+        if self._ordering or self._limit is not None or self._offset is not None:
+            return CompiledQuery(
+                f"SELECT (COUNT(*) AS ?count) WHERE {{ SELECT DISTINCT ?s WHERE {{ { before }",
+                f"{ after } }} { self._order_by() } ",
+                " }",
+                per_subject)
+        return CompiledQuery(f"SELECT (COUNT(DISTINCT ?s) AS ?count) WHERE {{ { before }", f"{ after } }}", "", per_subject)
+
+    def _query(self, kind:str, fields:Tuple[str, ...]=()):
+        compiled = self._compiled(kind, fields)
+        return registry.query(compiled.render(self._bindings(), self._slice()), local=compiled.local)
+
+    def uris(self)->Generator[NamedNode, None, None]:
+        """
+        Yields uris of matching objects without loading them.
+        """
+        for solution in self._query('select'):
+            yield solution['s']
+
+    def iterator(self, chunk_size:int=HYDRATION_CHUNK_SIZE)->Generator['RdfBaseModel', None, None]:
+        """
+        Yields matching objects, loading `chunk_size` objects at a time.
+        """
+        uris = []
+        for uri in self.uris():
+            uris.append(uri)
+
+            # results are loaded in chunks, so every depth of a chunk costs a
+            # single store request
+            if len(uris) >= chunk_size:
+                yield from Hydrator(loading=self._loading, validate=self._validate).resolve_many(uris)
+                uris = []
+
+        if uris:
+            yield from Hydrator(loading=self._loading, validate=self._validate).resolve_many(uris)
+
+    def iter_parallel(self, 
+                        workers:Optional[int]=None, 
+                        chunk_size:int=HYDRATION_CHUNK_SIZE)->Generator['RdfBaseModel', None, None]:
+        """
+        Yields matching objects in order, loading chunks of `chunk_size` 
+        objects on `workers` threads at the same time.
+
+        Store queries and most of the conversion run in native code that
+        releases the GIL, so large result sets load faster than with
+        `iterator`. At most two chunks per worker are loaded ahead of the
+        consumer. Objects referenced from more than one chunk are loaded
+        once per chunk.
+        """
+        workers = workers or self._workers or 1
+        if workers < 1:
+            raise ValueError(f"workers should be a positive integer, but {workers} given")
+
+        # query results can only be read by the thread that created them
+        uris = list(self.uris())
+        chunks = [ uris[start:start + chunk_size] for start in range(0, len(uris), chunk_size) ]
+
+        def load(chunk:List[NamedNode])->List['RdfBaseModel']:
+            return Hydrator(loading=self._loading, validate=self._validate).resolve_many(chunk)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cellini-hydration') as executor:
+            pending = deque()
+            try:
+                for chunk in chunks:
+                    # every chunk runs in the caller's context, so it uses
+                    # the active session
+                    pending.append(executor.submit(contextvars.copy_context().run, load, chunk))
+                    if len(pending) >= 2 * workers:
+                        yield from pending.popleft().result()
+                while pending:
+                    yield from pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def __iter__(self)->Iterator['RdfBaseModel']:
+        if self._workers is not None:
+            return self.iter_parallel()
+        return self.iterator()
+
+    async def aiterator(self, chunk_size:int=HYDRATION_CHUNK_SIZE)->AsyncGenerator['RdfBaseModel', None]:
+        """
+        Async version of `iterator`, store work runs on the `aio` executor
+        and objects are yielded as soon as their chunk is loaded.
+        """
+        # query results can only be read by the thread that created them, 
+        # so the (small) uris are selected at once and objects are loaded 
+        # chunk by chunk
+        uris = await aio.run_sync(lambda: list(self.uris()))
+        chunks = [ uris[start:start + chunk_size] for start in range(0, len(uris), chunk_size) ]
+
+        def load(chunk:List[NamedNode])->List['RdfBaseModel']:
+            return Hydrator(loading=self._loading, validate=self._validate).resolve_many(chunk)
+
+        async for obj in aio.iterate_chunks(chunks, load):
+            yield obj
+
+    def __aiter__(self)->AsyncGenerator['RdfBaseModel', None]:
+        return self.aiterator()
+
+    def _rows(self, fields:Tuple[str, ...])->Generator[Tuple[Any, ...], None, None]:
+        """
+        Yields tuples with the values of given fields of matching objects,
+        selected with a single query and without loading the objects. 
+        Literals are converted by the field decoders, so values have the
+        types of loaded objects.
+        """
+        if not fields:
+            fields = tuple(self.model_class.model_fields.keys())
+        for field_name in fields:
+            self._field_predicate(field_name)
+
+        metadata = self.model_class.__rdf_metadata__()
+        decoders = [ metadata.field_decoders.get(field_name, literal_rdf_to_python) for field_name in fields ]
+        variables = [ f"value{idx}" for idx in range(len(fields)) ]
+        for solution in self._query('rows', tuple(fields)):
+            yield tuple(
+                rdf_term_to_python_value(solution[variable], decode)
+                for variable, decode in zip(variables, decoders)
+            )
+
+    def values(self, *fields:str)->Generator[Dict[str, Any], None, None]:
+        """
+        Yields a dict of given fields (all fields if none given) for every
+        matching object, without loading the objects.
+
+        Related objects are returned as their uri (NamedNode).
+        """
+        if not fields:
+            fields = tuple(self.model_class.model_fields.keys())
+        for row in self._rows(fields):
+            yield dict(zip(fields, row))
+
+    def values_list(self, *fields:str, flat:bool=False)->Generator[Any, None, None]:
+        """
+        Same as `values` but yields tuples, or single values when `flat` is
+        set and one field is given.
+        """
+        if flat and len(fields) != 1:
+            raise ValueError("values_list(flat=True) expects exactly one field")
+        for row in self._rows(fields):
+            yield row[0] if flat else row
+
+    def to_columns(self, *fields:str)->Dict[str, Any]:
+        """
+        Returns a numpy array with the values of every given field (all 
+        fields if none given) of matching objects, selected with a single
+        query and without building the objects.
+
+        Numeric, boolean and date fields get typed arrays (datetimes in UTC),
+        masked where objects have no value. Other fields are object arrays
+        holding None for missing values and the uri of related objects.
+        """
+        if numpy is None:
+            raise ImportError("QuerySet.to_columns requires numpy, install it with `pip install cellini-odm[numpy]`")
+        if not fields:
+            fields = tuple(self.model_class.model_fields.keys())
+        columns = [ [] for _ in fields ]
+        for row in self._rows(fields):
+            for column, value in zip(columns, row):
+                column.append(value)
+
+        model_fields = self.model_class.model_fields
+        return {
+            field_name: to_column(values, column_dtype(model_fields[field_name].annotation) if field_name in model_fields else None)
+            for field_name, values in zip(fields, columns)
+        }
+
+    def count(self)->int:
+        """
+        Counts matching objects in the triple store, without loading them.
+        """
+        # local counts yield a solution per store
+        return sum(int(solution['count'].value) for solution in self._query('count'))
+
+    def first(self)->Optional['RdfBaseModel']:
+        """
+        Returns the first matching object or None.
+        """
+        limit = 1 if self._limit is None else min(self._limit, 1)
+        for obj in self._clone(limit=limit):
+            return obj
+        return None
+
+    async def acount(self)->int:
+        return await aio.run_sync(self.count)
+
+    async def afirst(self)->Optional['RdfBaseModel']:
+        return await aio.run_sync(self.first)
+
+
+# Lookups accepted by `QuerySet.filter`, as `<field>__<lookup>`
+LOOKUPS = ('exact', 'gt', 'gte', 'lt', 'lte', 'range', 'in', 'startswith', 'isnull')
+
+COMPARISONS = { 'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<=' }
+
+
+def split_lookup(key:str)->Tuple[List[str], str]:
+    """
+    Splits a filter key to its field names and lookup, `exact` if none.
+    """
+    fields = key.split('__')
+    if len(fields) > 1 and fields[-1] in LOOKUPS:
+        return fields[:-1], fields[-1]
+    return fields, 'exact'
+
+
+def field_relation(annotation:Any)->Tuple[Optional[type], bool]:
+    """
+    Returns the model a field annotation points to (None for literals), 
+    and whether the field holds a list.
+    """
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        args = get_args(annotation)
+        return (field_relation(args[0])[0] if args else None), True
+    if origin is Union or origin is UnionType:
+        for arg in get_args(annotation):
+            related, many = field_relation(arg)
+            if related is not None or many:
+                return related, many
+        return None, False
+    if isinstance(annotation, type) \
+            and issubclass(annotation, AbstractNamedNode) \
+            and not issubclass(annotation, list):
+        return annotation, False
+    return None, False
+
+
+@dataclass(frozen=True)
+class CompiledQuery:
+    """CompiledQuery
+
+    SPARQL text of a queryset shape, split where the parts that change 
+    between executions go: the VALUES clause binding filter values, and
+    LIMIT/OFFSET. `local` queries only join triples of `?s` itself (see
+    `StoreAdapter.local_query`).
+    """
+    head:str
+    body:str
+    tail:str
+    local:bool = False
+
+    def render(self, bindings:str, slice:str)->str:
+        return f"{ self.head }{ bindings }{ self.body }{ slice }{ self.tail }"
+
+
+class QueryCache(object):
+    """QueryCache
+
+    LRU cache of compiled queries keyed by queryset shape (model, filtered
+    fields, ordering, ...), so querysets of the same shape with different
+    values build their SPARQL text once.
+    """
+
+    def __init__(self, maxsize:int=256):
+        if maxsize < 1:
+            raise ValueError(f"maxsize should be a positive integer, but {maxsize} given")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._queries:OrderedDict = OrderedDict()
+
+    def __len__(self)->int:
+        return len(self._queries)
+
+    def get(self, key:Hashable, compile:Callable[[], CompiledQuery])->CompiledQuery:
+        """
+        Returns the compiled query of given key, compiling it on miss.
+        """
+        with self._lock:
+            compiled = self._queries.get(key)
+            if compiled is not None:
+                self.hits += 1
+                self._queries.move_to_end(key)
+                return compiled
+            self.misses += 1
+
+        compiled = compile()
+        with self._lock:
+            self._queries[key] = compiled
+            while len(self._queries) > self.maxsize:
+                self._queries.popitem(last=False)
+        return compiled
+
+    def clear(self):
+        with self._lock:
+            self._queries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Compiled queries shared by all querysets
+query_cache = QueryCache()
+
+# numpy dtypes of `QuerySet.to_columns` columns by field type
+COLUMN_DTYPES = {
+    bool: 'bool',
+    int: 'int64',
+    float: 'float64',
+    datetime: 'datetime64[us]',
+    date: 'datetime64[D]',
+}
+
+
+def column_dtype(annotation:Any)->Optional[str]:
+    """
+    Returns the numpy dtype of columns of a field annotated with given type,
+    or None for object columns.
+    """
+    args = [ arg for arg in get_args(annotation) if arg is not type(None) ]
+    if get_origin(annotation) in (Union, UnionType) and len(args) == 1:
+        annotation = args[0]
+    return COLUMN_DTYPES.get(annotation)
+
+
+def to_column(values:List[Any], dtype:Optional[str])->Any:
+    """
+    Converts values of a column to a numpy array of given dtype, masked 
+    where values are missing.
+    """
+    if dtype is None:
+        column = numpy.empty(len(values), dtype=object)
+        column[:] = values
+        return column
+
+    if dtype == COLUMN_DTYPES[datetime]:
+        # numpy datetimes have no timezone
+        values = [ value.astimezone(timezone.utc).replace(tzinfo=None) if value is not None and value.tzinfo else value for value in values ]
+    mask = [ value is None for value in values ]
+    if not any(mask):
+        return numpy.array(values, dtype=dtype)
+    fill = numpy.zeros(1, dtype=dtype)[0]
+    return numpy.ma.masked_array(
+                numpy.array([ fill if value is None else value for value in values ], dtype=dtype), 
+                mask=mask)
+
+
+def python_value_to_term(value:Any)->Union[NamedNode, Literal]:
+    """
+    Converts a filter value to the rdf term it is stored as.
+    """
+    if isinstance(value, AbstractNamedNode):
+        return value.__rdf_uri__
+    if isinstance(value, NamedNode):
+        return value
+    return literal_python_to_rdf(value)
+
+
+def rdf_term_to_python_value(term:Union[None, NamedNode, Literal], 
+                             decode:Callable[[Literal], Any]=literal_rdf_to_python)->Any:
+    """
+    Converts a selected rdf term back to a python value with `decode`, 
+    uris of related objects are returned as they are.
+    """
+    if term is None:
+        return None
+    if isinstance(term, NamedNode):
+        return term
+    return decode(term)
+
+
 if TYPE_CHECKING:
     from cellini.odm.model import RdfBaseModel 
@@ -0,0 +1,134 @@
+"""
+Session keeping a single instance per rdf uri while resolving
+"""
+import weakref
+from threading import RLock
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Optional, Union
+from pyoxigraph import NamedNode
+
+from cellini.odm.base import AbstractNamedNode, registry
+
+
+_current_session:ContextVar[Optional['Session']] = ContextVar('cellini_session', default=None)
+
+
+def current_session()->Optional['Session']:
+    """
+    Returns the session activated by the innermost `with Session()` block,
+    or None.
+    """
+    return _current_session.get()
+
+
+class Session(object):
+    """Session
+
+    Identity map of resolved objects keyed by their `__rdf_uri__`.
+
+    While a session is active (used as context manager) every resolve goes
+    through it, so an object referenced many times is loaded once and all
+    references share the same instance.
+
+    By default the map keeps every object until the session ends. Use
+    `maxsize` to keep only the most recently used objects, or `weak=True`
+    to keep objects only as long as something else references them.
+    """
+
+    def __init__(self, maxsize:Optional[int]=None, weak:bool=False):
+        if maxsize is not None and maxsize < 1:
+            raise ValueError(f"maxsize should be a positive integer, but {maxsize} given")
+        if maxsize is not None and weak:
+            raise ValueError("Session accepts either `maxsize` or `weak` eviction, not both")
+        self.maxsize = maxsize
+        self.weak = weak
+        self.hits = 0
+        self.misses = 0
+        self._lock = RLock()
+        self._tokens = []
+        self._identity_map = weakref.WeakValueDictionary() if weak else OrderedDict()
+
+    def __enter__(self)->'Session':
+        self._tokens.append(_current_session.set(self))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _current_session.reset(self._tokens.pop())
+
+    def __len__(self)->int:
+        return len(self._identity_map)
+
+    def __contains__(self, uri:NamedNode)->bool:
+        return self._key(uri) in self._identity_map
+
+    @staticmethod
+    def _key(uri:Union[str, NamedNode])->str:
+        return uri.value if isinstance(uri, NamedNode) else uri
+
+    def get(self, uri:Union[str, NamedNode])->Optional[AbstractNamedNode]:
+        """
+        Returns the object loaded for given uri, or None.
+        """
+        key = self._key(uri)
+        with self._lock:
+            obj = self._identity_map.get(key)
+            if obj is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            if self.maxsize is not None:
+                self._identity_map.move_to_end(key)
+            return obj
+
+    def add(self, obj:AbstractNamedNode, uri:Optional[NamedNode]=None)->AbstractNamedNode:
+        """
+        Adds given object to the identity map, replacing any other instance
+        of the same uri.
+        """
+        key = self._key(uri if uri is not None else obj.__rdf_uri__)
+        with self._lock:
+            try:
+                self._identity_map[key] = obj
+            except TypeError:
+                # objects that cant be weakly referenced are not kept
+                return obj
+            if self.maxsize is not None:
+                self._identity_map.move_to_end(key)
+                while len(self._identity_map) > self.maxsize:
+                    self._identity_map.popitem(last=False)
+        return obj
+
+    def expunge(self, uri:Union[str, NamedNode]):
+        """
+        Removes given uri from the identity map, so it is loaded again
+        next time.
+        """
+        with self._lock:
+            self._identity_map.pop(self._key(uri), None)
+
+    def clear(self):
+        with self._lock:
+            self._identity_map.clear()
+
+    def flush(self):
+        """
+        Saves every changed object of the identity map (including new 
+        objects added with `add`) in a single registry transaction.
+        """
+        from cellini.odm.model import RdfBaseModel
+
+        with self._lock:
+            objects = list(self._identity_map.values())
+
+        with registry.transaction():
+            for obj in objects:
+                if isinstance(obj, RdfBaseModel) and obj.dirty_fields():
+                    obj.save()
+
+    def resolve(self, uri:NamedNode)->AbstractNamedNode:
+        """
+        Resolves given uri through this session.
+        """
+        with self:
+            return registry.resolve_named_node(uri)
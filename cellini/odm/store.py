@@ -0,0 +1,469 @@
+"""
+Triple store backends used by the registry
+"""
+import zlib
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from threading import RLock
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
+from pyoxigraph import DefaultGraph, NamedNode, Literal, Triple, Quad, Store
+
+
+Term = Union[NamedNode, Literal]
+GraphName = Union[NamedNode, DefaultGraph]
+
+
+# Subject lookups of up to this many subjects are answered by quad pattern
+# matching, larger ones by a single SPARQL query
+PATTERN_LOOKUP_MAX_SUBJECTS = 1
+
+
+def as_quad(triple:Union[Triple, Quad])->Quad:
+    """
+    Returns given triple as a quad of the default graph, quads are returned
+    as they are.
+    """
+    if isinstance(triple, Quad):
+        return triple
+    return Quad(triple.subject, triple.predicate, triple.object)
+
+
+class StoreAdapter(ABC):
+    """StoreAdapter
+
+    Interface between the registry and the triple store holding the data.
+
+    Every read and write of the ODM goes through these methods, so a
+    backend only has to answer SPARQL queries and apply changes. Query
+    results are pyoxigraph results (solutions, triples or a boolean).
+    """
+
+    @abstractmethod
+    def query(self, query:str, **kwargs):
+        """query
+        evaluates a SPARQL query and returns pyoxigraph results, keyword 
+        arguments are the ones of `pyoxigraph.Store.query`.
+        """
+
+    def local_query(self, query:str, **kwargs)->Iterator[Any]:
+        """local_query
+        evaluates a SELECT query whose patterns only join triples of a 
+        same subject, and yields its solutions. 
+
+        Such a query can run wherever the subjects are stored, backends
+        spreading them over several stores yield the solutions of each, so
+        aggregates yield one solution per store.
+        """
+        return iter(self.query(query, **kwargs))
+
+    @abstractmethod
+    def apply(self, inserts:Iterable[Quad]=(), deletes:Iterable[Quad]=()):
+        """apply
+        removes `deletes` and adds `inserts`, deletes first.
+        """
+
+    @abstractmethod
+    def quads_for_pattern(self,
+                                subject:Optional[NamedNode]=None,
+                                predicate:Optional[NamedNode]=None,
+                                object:Optional[Term]=None,
+                                graph_name:Optional[GraphName]=None)->Iterator[Quad]:
+        """quads_for_pattern
+        yields stored quads matching given terms, None matches anything.
+        """
+
+    @abstractmethod
+    def named_graphs(self)->Iterator[NamedNode]:
+        """named_graphs
+        yields names of graphs holding quads.
+        """
+
+    @abstractmethod
+    def __len__(self)->int:
+        """
+        Returns the number of stored quads
+        """
+
+    @abstractmethod
+    def clear(self):
+        """clear
+        removes every stored quad.
+        """
+
+    def clear_graph(self, graph_name:GraphName):
+        """clear_graph
+        removes every quad of given graph.
+        """
+        self.apply(deletes=list(self.quads_for_pattern(graph_name=graph_name)))
+
+    def has_subject(self, subject:NamedNode)->bool:
+        """has_subject
+        checks whether any triple of given subject is stored.
+        """
+        for _ in self.quads_for_pattern(subject):
+            return True
+        return False
+
+    def subject_triples(self, subjects:Sequence[NamedNode])->Iterator[Triple]:
+        """subject_triples
+        yields every triple of given subjects, from any graph, with a 
+        single request.
+
+        Few subjects are matched directly against the store indexes, which
+        is cheaper than parsing and planning a SPARQL query.
+        """
+        if len(subjects) <= PATTERN_LOOKUP_MAX_SUBJECTS:
+            # same triple of different graphs is returned once
+            return iter(dict.fromkeys(
+                quad.triple 
+                for subject in subjects 
+                for quad in self.quads_for_pattern(subject)))
+
+        values = ' '.join(f"{subject}" for subject in subjects)
+        return iter(self.query(
+            f"CONSTRUCT {{ ?s ?p ?o }} WHERE {{ VALUES ?s {{ {values} }} ?s ?p ?o }}",
+            use_default_graph_as_union=True))
+
+    def bulk_insert(self, quads:Iterable[Quad]):
+        """bulk_insert
+        adds many new quads at once, without the guarantees of `apply`.
+        """
+        self.apply(inserts=quads)
+
+    def add(self, quad:Union[Triple, Quad]):
+        self.apply(inserts=[ as_quad(quad) ])
+
+    def remove(self, quad:Union[Triple, Quad]):
+        self.apply(deletes=[ as_quad(quad) ])
+
+
+def _data_block(quads:List[Quad])->str:
+    """
+    Formats quads as the content of an `INSERT DATA`/`DELETE DATA` block
+    """
+    graphs = defaultdict(list)
+    for quad in quads:
+        graphs[quad.graph_name].append(f"{ quad.subject } { quad.predicate } { quad.object } .")
+
+    blocks = []
+    for graph_name, statements in graphs.items():
+        if isinstance(graph_name, DefaultGraph):
+            blocks.append(' '.join(statements))
+        else:
+            blocks.append(f"GRAPH { graph_name } {{ { ' '.join(statements) } }}")
+    return ' '.join(blocks)
+
+
+def _update_snapshot(snapshot:Optional[Store], inserts:List[Quad]=(), deletes:List[Quad]=()):
+    """
+    Applies given changes to the in-memory copy SPARQL queries run on, if
+    it was built already.
+    """
+    if snapshot is None:
+        return
+    for quad in deletes:
+        snapshot.remove(quad)
+    if inserts:
+        snapshot.extend(inserts)
+
+
+class OxigraphStore(StoreAdapter):
+    """OxigraphStore
+
+    Default backend, a pyoxigraph `Store` kept at `path` (in memory if no
+    path is given). Changes are applied atomically.
+    """
+
+    def __init__(self, path:Optional[str]=None, store:Optional[Store]=None):
+        self.store = store if store is not None else Store(path)
+
+    def query(self, query:str, **kwargs):
+        return self.store.query(query, **kwargs)
+
+    def apply(self, inserts:Iterable[Quad]=(), deletes:Iterable[Quad]=()):
+        inserts = list(inserts)
+        deletes = list(deletes)
+        if not deletes:
+            if inserts:
+                self.store.extend(inserts)
+            return
+
+        operations = [ f"DELETE DATA {{ { _data_block(deletes) } }}" ]
+        if inserts:
+            operations.append(f"INSERT DATA {{ { _data_block(inserts) } }}")
+        self.store.update(' ; '.join(operations))
+
+    def bulk_insert(self, quads:Iterable[Quad]):
+        self.store.bulk_extend(quads)
+
+    def quads_for_pattern(self,
+                                subject:Optional[NamedNode]=None,
+                                predicate:Optional[NamedNode]=None,
+                                object:Optional[Term]=None,
+                                graph_name:Optional[GraphName]=None)->Iterator[Quad]:
+        return self.store.quads_for_pattern(subject, predicate, object, graph_name)
+
+    def named_graphs(self)->Iterator[NamedNode]:
+        return self.store.named_graphs()
+
+    def clear_graph(self, graph_name:GraphName):
+        self.store.clear_graph(graph_name)
+
+    def __len__(self)->int:
+        return len(self.store)
+
+    def clear(self):
+        self.store.clear()
+
+
+class MemoryStore(StoreAdapter):
+    """MemoryStore
+
+    Keeps quads in python sets indexed by subject, predicate, object and
+    graph, meant for tests and small datasets.
+
+    Pattern lookups are answered from the indexes. SPARQL queries run on an
+    in-memory pyoxigraph copy of the data, built on first query and kept up
+    to date by every change afterwards.
+    """
+
+    def __init__(self, quads:Iterable[Union[Triple, Quad]]=()):
+        self._lock = RLock()
+        self._quads:Set[Quad] = set()
+        # position of a term in a quad -> term -> quads
+        self._indexes:Tuple[Dict[Any, Set[Quad]], ...] = tuple(defaultdict(set) for _ in range(4))
+        self._snapshot:Optional[Store] = None
+        self.apply(inserts=(as_quad(quad) for quad in quads))
+
+    def apply(self, inserts:Iterable[Quad]=(), deletes:Iterable[Quad]=()):
+        inserts = list(inserts)
+        deletes = list(deletes)
+        deleted = []
+        inserted = []
+        with self._lock:
+            for quad in deletes:
+                if quad not in self._quads:
+                    continue
+                deleted.append(quad)
+                self._quads.discard(quad)
+                for index, term in zip(self._indexes, quad):
+                    quads = index[term]
+                    quads.discard(quad)
+                    if not quads:
+                        del index[term]
+            for quad in inserts:
+                if quad in self._quads:
+                    continue
+                inserted.append(quad)
+                self._quads.add(quad)
+                for index, term in zip(self._indexes, quad):
+                    index[term].add(quad)
+            _update_snapshot(self._snapshot, inserted, deleted)
+
+    def quads_for_pattern(self,
+                                subject:Optional[NamedNode]=None,
+                                predicate:Optional[NamedNode]=None,
+                                object:Optional[Term]=None,
+                                graph_name:Optional[GraphName]=None)->Iterator[Quad]:
+        pattern = (subject, predicate, object, graph_name)
+        with self._lock:
+            # the smallest index of the given terms is scanned
+            candidates = [
+                index.get(term, ())
+                for index, term in zip(self._indexes, pattern) if term is not None
+            ]
+            quads = min(candidates, key=len) if candidates else self._quads
+            matches = [
+                quad for quad in quads
+                if all(term is None or term == value for term, value in zip(pattern, quad))
+            ]
+        return iter(matches)
+
+    def subject_triples(self, subjects:Sequence[NamedNode])->Iterator[Triple]:
+        with self._lock:
+            # same triple of different graphs is returned once
+            matches = dict.fromkeys(
+                quad.triple
+                for subject in dict.fromkeys(subjects)
+                for quad in self._indexes[0].get(subject, ())
+            )
+        return iter(matches)
+
+    def named_graphs(self)->Iterator[NamedNode]:
+        with self._lock:
+            graphs = [ graph_name for graph_name in self._indexes[3] if isinstance(graph_name, NamedNode) ]
+        return iter(graphs)
+
+    def query(self, query:str, **kwargs):
+        with self._lock:
+            if self._snapshot is None:
+                snapshot = Store()
+                snapshot.bulk_extend(self._quads)
+                self._snapshot = snapshot
+            snapshot = self._snapshot
+        return snapshot.query(query, **kwargs)
+
+    def __len__(self)->int:
+        return len(self._quads)
+
+    def clear(self):
+        with self._lock:
+            self._quads.clear()
+            for index in self._indexes:
+                index.clear()
+            self._snapshot = None
+
+
+class ShardedStore(StoreAdapter):
+    """ShardedStore
+
+    Spreads quads over several stores by hashing their subject, so each
+    shard (and the disk or process behind it) takes a part of the writes.
+
+    Subject lookups, the bulk of object loading, go to the shards holding
+    the subjects, other pattern lookups are streamed shard by shard. Local
+    queries (see `StoreAdapter.local_query`), which the ODM uses to list 
+    and count objects, run on every shard. Other SPARQL queries may join
+    quads of different shards, so they run on an in-memory union of the 
+    shards, built for every query, or once and kept up to date by every
+    change afterwards when `union` is set.
+
+    Changes touching several shards are applied shard by shard and are
+    atomic only per shard.
+    """
+
+    def __init__(self, shards:Union[int, Sequence[Union[str, StoreAdapter]]], union:bool=False):
+        if isinstance(shards, int):
+            if shards < 1:
+                raise ValueError(f"ShardedStore expects at least one shard, but {shards} given")
+            shards = [ OxigraphStore() for _ in range(shards) ]
+        self.shards:List[StoreAdapter] = [
+            shard if isinstance(shard, StoreAdapter) else OxigraphStore(shard)
+            for shard in shards
+        ]
+        if not self.shards:
+            raise ValueError("ShardedStore expects at least one shard")
+        self.union = union
+        self._lock = RLock()
+        self._snapshot:Optional[Store] = None
+        self._executor = ThreadPoolExecutor(max_workers=len(self.shards), thread_name_prefix='cellini-shard')
+
+    def shard_of(self, subject:NamedNode)->int:
+        """
+        Returns the index of the shard holding given subject, stable
+        between processes.
+        """
+        return zlib.crc32(subject.value.encode('utf-8')) % len(self.shards)
+
+    def _route(self, quads:Iterable[Quad])->Dict[int, List[Quad]]:
+        routed = defaultdict(list)
+        for quad in quads:
+            routed[self.shard_of(quad.subject)].append(quad)
+        return routed
+
+    def _fan_out(self, calls:Dict[int, Callable[[], Optional[Iterable]]])->Dict[int, list]:
+        # results are materialized on the worker thread, as pyoxigraph
+        # results can only be read by the thread that created them
+        futures = { idx: self._executor.submit(lambda call=call: list(call() or ())) for idx, call in calls.items() }
+        return { idx: future.result() for idx, future in futures.items() }
+
+    def _all_shards(self, call:Callable[[StoreAdapter], Optional[Iterable]])->Dict[int, list]:
+        return self._fan_out({ idx: (lambda shard=shard: call(shard)) for idx, shard in enumerate(self.shards) })
+
+    def _write(self, calls:Dict[int, Callable[[], None]], update:Callable[[Store], None]):
+        if not self.union:
+            self._fan_out(calls)
+            return
+        # every quad is held by a single shard, so changes applied to the
+        # union keep it equal to the shards
+        with self._lock:
+            try:
+                self._fan_out(calls)
+            except BaseException:
+                # shards may be partly changed, the union is built again
+                self._snapshot = None
+                raise
+            if self._snapshot is not None:
+                update(self._snapshot)
+
+    def apply(self, inserts:Iterable[Quad]=(), deletes:Iterable[Quad]=()):
+        inserts = list(inserts)
+        deletes = list(deletes)
+        routed_inserts = self._route(inserts)
+        routed_deletes = self._route(deletes)
+        self._write({
+            idx: (lambda shard=self.shards[idx], idx=idx: shard.apply(inserts=routed_inserts.get(idx, ()), deletes=routed_deletes.get(idx, ())))
+            for idx in set(routed_inserts) | set(routed_deletes)
+        }, lambda snapshot: _update_snapshot(snapshot, inserts, deletes))
+
+    def bulk_insert(self, quads:Iterable[Quad]):
+        quads = list(quads)
+        self._write({
+            idx: (lambda shard=self.shards[idx], batch=batch: shard.bulk_insert(batch))
+            for idx, batch in self._route(quads).items()
+        }, lambda snapshot: _update_snapshot(snapshot, inserts=quads))
+
+    def clear_graph(self, graph_name:GraphName):
+        self._write({
+            idx: (lambda shard=shard: shard.clear_graph(graph_name))
+            for idx, shard in enumerate(self.shards)
+        }, lambda snapshot: snapshot.clear_graph(graph_name))
+
+    def quads_for_pattern(self,
+                                subject:Optional[NamedNode]=None,
+                                predicate:Optional[NamedNode]=None,
+                                object:Optional[Term]=None,
+                                graph_name:Optional[GraphName]=None)->Iterator[Quad]:
+        if subject is not None:
+            return self.shards[self.shard_of(subject)].quads_for_pattern(subject, predicate, object, graph_name)
+        # shards are read one after the other, so scans of the whole store
+        # keep a single shard iterator open
+        return (
+            quad
+            for shard in self.shards
+            for quad in shard.quads_for_pattern(subject, predicate, object, graph_name))
+
+    def subject_triples(self, subjects:Sequence[NamedNode])->Iterator[Triple]:
+        routed = defaultdict(list)
+        for subject in subjects:
+            routed[self.shard_of(subject)].append(subject)
+        results = self._fan_out({
+            idx: (lambda shard=self.shards[idx], batch=batch: shard.subject_triples(batch))
+            for idx, batch in routed.items()
+        })
+        return (triple for idx in sorted(results) for triple in results[idx])
+
+    def named_graphs(self)->Iterator[NamedNode]:
+        results = self._all_shards(lambda shard: shard.named_graphs())
+        return iter(dict.fromkeys(graph_name for idx in sorted(results) for graph_name in results[idx]))
+
+    def _union(self)->Store:
+        union = Store()
+        union.bulk_extend(self.quads_for_pattern())
+        return union
+
+    def query(self, query:str, **kwargs):
+        if not self.union:
+            return self._union().query(query, **kwargs)
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self._union()
+            snapshot = self._snapshot
+        return snapshot.query(query, **kwargs)
+
+    def local_query(self, query:str, **kwargs)->Iterator[Any]:
+        # solutions are read on the calling thread, shard after shard
+        return (
+            solution
+            for shard in self.shards
+            for solution in shard.local_query(query, **kwargs))
+
+    def __len__(self)->int:
+        return sum(len(shard) for shard in self.shards)
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            for shard in self.shards:
+                shard.clear()
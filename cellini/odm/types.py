@@ -1,18 +1,28 @@
 import uuid
-from typing             import Optional, TYPE_CHECKING, Generator, Any
+from dataclasses        import dataclass
+from typing             import Optional, TYPE_CHECKING, Generator, Any, Callable, Iterable, List, Tuple, Union, get_args, get_origin
 from pyoxigraph         import NamedNode, Triple, Literal
-from cellini.odm.utils  import literal_rdf_to_python, literal_python_to_rdf, UnsupportedType, RDF
-from cellini.odm.base   import AbstractNamedNode, registry
+from cellini.odm.utils  import literal_codecs, literal_rdf_to_python, literal_python_to_rdf, UnsupportedType, UnionType, RDF, rdf_member, rdf_member_index
+from cellini.odm.base   import AbstractNamedNode, registry, walk_named_nodes
+from cellini.odm.hydration import Hydrator
 
 
-def python_value_to_triples(subject:NamedNode, predicate:NamedNode, python_value:Any, recursive=True)->Generator[Triple, None, None]:
+def python_value_to_triples(subject:NamedNode, 
+                            predicate:NamedNode, 
+                            python_value:Any, 
+                            recursive=True, 
+                            encode:Optional[Callable[[Any], Literal]]=None)->Generator[Triple, None, None]:
     """
     Helpfull function to convert any python value to rdf triples 
+
+    `encode` converts literal values, when the field type is known (see 
+    `LiteralCodecs.field_converters`), otherwise they are converted by 
+    their own type.
     """
     
     # If the field value is a list then we wrap it as rdf:Bag
     if type(python_value) is list:
-        python_value = Bag(python_value)
+        python_value = Bag(python_value, node=Bag.node_for(subject, predicate))
 
     # If python_value type is included in our registry then it points to 
     # an AbstractNamedNode model so we use it's autogenerated uri.
@@ -21,20 +31,48 @@ def python_value_to_triples(subject:NamedNode, predicate:NamedNode, python_value
         yield Triple(subject, predicate, python_value.__rdf_uri__)
 
         # If recursive is set to true then we return all models' sub-triples (if any)
-        if recursive:
-            for t in python_value.to_triples():
+        # Lists are part of the object holding them, so they are always returned
+        if recursive or isinstance(python_value, Bag):
+            for t in python_value.to_triples(recursive=recursive):
                 yield t
 
     # Otherwise the field is expected to point to a literal type 
     # so we convert it and return the corresponding triple 
     else:
-        value = literal_python_to_rdf(python_value)
+        value = literal_python_to_rdf(python_value) if encode is None else encode(python_value)
         if value:
             yield Triple(subject, predicate, value)
 
 
 
 
+@dataclass(frozen=True)
+class ListMembers:
+    """ListMembers
+
+    How members of a list field are converted back to python values, 
+    literals by `decode` and members that are lists by `members`.
+    """
+    decode:Callable[[Literal], Any]
+    members:Optional['ListMembers'] = None
+
+
+def list_members(annotation:Any)->Optional[ListMembers]:
+    """
+    Returns member converters of a field annotated with given (optional)
+    list type, or None for other fields.
+    """
+    args = [ arg for arg in get_args(annotation) if arg is not type(None) ]
+    if get_origin(annotation) in (Union, UnionType) and len(args) == 1:
+        annotation = args[0]
+        args = get_args(annotation)
+    if get_origin(annotation) not in (list, List):
+        return None
+    if not args:
+        return ListMembers(literal_rdf_to_python)
+    return ListMembers(literal_codecs.field_converters(args[0])[1], list_members(args[0]))
+
+
 class Bag(list, AbstractNamedNode):
 
     """
@@ -59,44 +97,131 @@ class Bag(list, AbstractNamedNode):
     def identifier(self):
         return self._identifier
 
+    @classmethod
+    def node_for(cls, subject:NamedNode, predicate:NamedNode)->NamedNode:
+        """
+        Returns the uri of the list held by `subject` under `predicate`. 
+        
+        It is the same on every serialization, so a stored list can be 
+        compared with and updated to its current value.
+        """
+        identifier = uuid.uuid5(uuid.NAMESPACE_URL, f"{subject.value} {predicate.value}")
+        return NamedNode(f"{cls.__rdf_title__()}:{identifier}")
+
     @classmethod
     def __rdf_title__(cls)->str:
         return f"{registry.uri_prefix}{cls.__name__}"
 
+    @classmethod
+    def __rdf_type__(cls)->NamedNode:
+        return RDF.Bag
+
+    @classmethod
+    def __rdf_types__(cls)->Generator[NamedNode, None, None]:
+        yield cls.__rdf_type__()
+
     def to_triples(self, recursive=True):
-        yield Triple(self.__rdf_uri__, RDF.type, RDF.Bag)
-        i = 1
-        for item in self:
-            for triple in python_value_to_triples(
-                            self.__rdf_uri__, 
-                            NamedNode(f"http://www.w3.org/1999/02/22-rdf-syntax-ns#_{i}"),
-                            item,
-                            recursive=recursive):
+        if recursive:
+            for obj in walk_named_nodes(self):
+                yield from obj.to_triples(recursive=False)
+            return
+
+        subject = self.__rdf_uri__
+        yield Triple(subject, RDF.type, self.__rdf_type__())
+        for i, item in enumerate(self, 1):
+            for triple in python_value_to_triples(subject, rdf_member(i), item, recursive=False):
                 yield triple
-            i += 1
+
+    def __rdf_references__(self)->Iterable[Any]:
+        return self
 
     @classmethod
     def resolve_named_node(cls, node:NamedNode)->AbstractNamedNode:
+        return Hydrator().resolve(node, cls)
 
-        data = cls(node=node)
+    @classmethod
+    def from_triples(cls, node:NamedNode, triples:list, hydrator:Hydrator)->AbstractNamedNode:
+        return cls._from_triples(node, triples, hydrator)
 
-        for s, p, o in registry.query(f"DESCRIBE {node}"):
+    @classmethod
+    def lazy_reference(cls, node:NamedNode, hydrator:Hydrator)->AbstractNamedNode:
+        """
+        Lists are loaded right away, but their members are lazy references.
+        """
+        return cls._from_triples(node, hydrator.triples(node), hydrator, lazy=True)
 
+    @classmethod
+    def _from_triples(cls, node:NamedNode, triples:list, hydrator:Hydrator, lazy:bool=False)->AbstractNamedNode:
+        """
+        Builds the list from its membership triples, which are stored (and
+        returned) in any order.
+        """
+        members:List[Tuple[int, Union[NamedNode, Literal]]] = []
+        for p, o in triples:
             if p == RDF.type:
-                if o != RDF.Bag:
-                    raise ValueError(f"Expected RDF.Bag type but got {o}")
+                if o != cls.__rdf_type__():
+                    raise ValueError(f"Expected {cls.__rdf_type__()} type but got {o}")
                 continue
-            
-            idx = int(p.value.split('_')[1])
+            idx = rdf_member_index(p)
+            if idx is None:
+                raise ValueError(f"Unexpected predicate {p} for {cls.__name__} {node}")
+            members.append((idx, o))
+
+        # members are numbered from 1 without gaps, unless the list was 
+        # changed outside of cellini, so they are placed by their index
+        ordered = [ _MISSING ] * len(members)
+        for idx, o in members:
+            if idx < 1 or idx > len(ordered) or ordered[idx - 1] is not _MISSING:
+                ordered = [ o for _, o in sorted(members, key=lambda member: member[0]) ]
+                break
+            ordered[idx - 1] = o
+
+        if lazy:
+            resolve = hydrator.lazy
+        else:
+            resolve = hydrator.resolve
+            # objects of members fetched together, if not already
+            hydrator.fetch(o for o in ordered if isinstance(o, NamedNode))
+
+        # literals are converted to the member type of the field holding 
+        # the list, when known
+        members = hydrator.list_members(node)
+        decode = literal_rdf_to_python if members is None else members.decode
+        nested = None if members is None else members.members
+
+        data = cls(node=node)
+        for o in ordered:
             if isinstance(o, Literal):
-                value = literal_rdf_to_python(o)
+                data.append(decode(o))
             elif isinstance(o, NamedNode):
-                value = registry.resolve_named_node(o)
+                if nested is not None:
+                    hydrator.set_list_members(o, nested)
+                data.append(resolve(o))
             else:
-                raise UnsupportedType(f"Unexpected triple type recieved {type(o)} (value={o})")            
+                raise UnsupportedType(f"Unexpected triple type recieved {type(o)} (value={o})")
+        return data
 
-            data.insert(idx, value)
 
-        return data
+class Seq(Bag):
+    """
+    Seq stores lists as rdf:Seq, the rdf container of ordered members. 
+
+    Fields use it with `Field(container='seq')`, lists are stored as rdf:Bag
+    otherwise. Both keep the order of their members and appending to 
+    either writes only the new member when saved.
+    """
+
+    @classmethod
+    def __rdf_type__(cls)->NamedNode:
+        return RDF.Seq
+
+
+# Containers of list fields, set with `Field(container=...)`
+CONTAINERS = { 'bag': Bag, 'seq': Seq }
+
+# placeholder of list members not placed yet
+_MISSING = object()
+
 
-registry.add(Bag)
\ No newline at end of file
+registry.add(Bag)
+registry.add(Seq)
@@ -1,10 +1,18 @@
+import base64
+import os
 import uuid
 from dataclasses import dataclass
+from decimal     import Decimal
 from pyoxigraph  import NamedNode, Literal
-from typing      import Any, Union
-from datetime    import datetime, date
+from typing      import Any, Callable, Dict, Optional, Tuple, Union, get_args, get_origin
+from datetime    import datetime, date, time
 from pydantic    import AnyHttpUrl, AnyUrl, NonNegativeInt
-from enum        import EnumType
+from enum        import Enum
+
+try:
+    from types import UnionType
+except ImportError: # python < 3.10
+    UnionType = Union
 
 @dataclass
 class DCTERMS:
@@ -20,12 +28,85 @@ class XSD:
     nonPositiveInteger = NamedNode("http://www.w3.org/2001/XMLSchema#nonPositiveInteger")
     string = NamedNode("http://www.w3.org/2001/XMLSchema#string")
     boolean = NamedNode("http://www.w3.org/2001/XMLSchema#boolean")
+    decimal = NamedNode("http://www.w3.org/2001/XMLSchema#decimal")
+    base64Binary = NamedNode("http://www.w3.org/2001/XMLSchema#base64Binary")
+    time = NamedNode("http://www.w3.org/2001/XMLSchema#time")
 
 @dataclass
 class RDF:
     Bag = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#Bag")
+    Seq = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#Seq")
     type = NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#type")
 
+# Prefix of container membership predicates (rdf:_1, rdf:_2, ...)
+RDF_MEMBER_PREFIX = "http://www.w3.org/1999/02/22-rdf-syntax-ns#_"
+
+_rdf_members:Dict[int, NamedNode] = dict()
+_rdf_member_indexes:Dict[NamedNode, int] = dict()
+
+
+def rdf_member(index:int)->NamedNode:
+    """
+    Returns the membership predicate (rdf:_<index>) of given 1-based index,
+    created once and reused by every serialization.
+    """
+    member = _rdf_members.get(index)
+    if member is None:
+        member = NamedNode(f"{ RDF_MEMBER_PREFIX }{ index }")
+        _rdf_member_indexes[member] = index
+        _rdf_members[index] = member
+    return member
+
+
+def rdf_member_index(predicate:NamedNode)->Optional[int]:
+    """
+    Returns the index of given membership predicate, or None when it is 
+    not one.
+    """
+    index = _rdf_member_indexes.get(predicate)
+    if index is None:
+        value = predicate.value
+        if not value.startswith(RDF_MEMBER_PREFIX) or not value[len(RDF_MEMBER_PREFIX):].isdigit():
+            return None
+        index = int(value[len(RDF_MEMBER_PREFIX):])
+    return index
+
+# Serialization formats by name or file extension
+RDF_FORMATS = {
+    'nt': "application/n-triples",
+    'ntriples': "application/n-triples",
+    'nq': "application/n-quads",
+    'nquads': "application/n-quads",
+    'ttl': "text/turtle",
+    'turtle': "text/turtle",
+    'trig': "application/trig",
+    'rdf': "application/rdf+xml",
+    'xml': "application/rdf+xml",
+    'rdfxml': "application/rdf+xml",
+}
+
+# Formats keeping the graph of each triple
+QUAD_FORMATS = ("application/n-quads", "application/trig")
+
+
+def rdf_mime_type(format:Optional[str]=None, target:Any=None)->str:
+    """
+    Returns the mime type of given format name (or mime type), guessed by
+    the extension of `target` path when no format is given. Defaults to
+    N-Quads.
+    """
+    if format is None:
+        if not isinstance(target, (str, os.PathLike)):
+            return "application/n-quads"
+        format = os.path.splitext(os.fspath(target))[1].lstrip('.')
+        if not format:
+            return "application/n-quads"
+    if '/' in format:
+        return format
+    if format.lower() not in RDF_FORMATS:
+        raise ValueError(f"Unknown rdf format '{format}', expected a mime type or one of { ', '.join(RDF_FORMATS) }")
+    return RDF_FORMATS[format.lower()]
+
 class ObjectAlreadyExists(Exception):
     pass
 
@@ -33,69 +114,180 @@ class UnsupportedType(Exception):
     pass
 
 
-def literal_python_to_rdf(value:Any, python_type:Any=None)->Union[None, NamedNode, Literal]:
-    """ convert standard python types to rdf literals """
-    if value == None:
-        return None
-
-    # If value is enum, then we handle the internal value and not the actual enum 
-    if isinstance(type(value), EnumType):
-        value = value.value
-
-    if python_type == None:
-        python_type = type(value)
-    # string
-    if python_type in [str, uuid.UUID]:
-        return Literal(f"{value}")
-    # Urls
-    if python_type in [AnyHttpUrl, AnyUrl]:
-        return Literal(f"{value}", datatype=XSD.anyURI)
-    # boolean
-    elif python_type == bool:
-        return Literal('true' if value else 'false', datatype=XSD.boolean)
-    # intreger
-    elif python_type in [int, NonNegativeInt]:
-        return Literal(f"{value}", datatype=XSD.integer)
-    # float
-    elif python_type == float:
-        return Literal(f"{value}", datatype=XSD.float)
-    # datetime
-    elif python_type == datetime:
-        return Literal(value.isoformat(), datatype=XSD.dateTime)
-    # date
-    elif python_type == date:
-        return Literal(value.isoformat(), datatype=XSD.date)
-
-    raise UnsupportedType(f"! Unknown value type={python_type} for value={value}")
+class LiteralCodecs(object):
+    """
+    Converters between python values and rdf literals, looked up by python
+    type when serializing and by literal datatype when resolving.
 
-def literal_rdf_to_python(value:Union[NamedNode, Literal])->Any:
-    """ convert rdf literals to python types """
+    Custom types are supported by registering them, e.g.
 
-    if isinstance(value, Literal):
-        
-        if value.datatype in [ XSD.string, XSD.anyURI ]:
-            return value.value
-        
-        if value.datatype == XSD.boolean:
-            if str(value.value) == 'false':
-                return False
-            elif str(value.value) == 'true':
-                return True
-            raise Exception(f'Could not parse value "{value}" to Python bool.')
+        literal_codecs.register(Fraction, NamedNode("https://example.org/fraction"), to_python=Fraction)
+    """
+
+    def __init__(self):
+        self._encoders:Dict[Any, Callable[[Any], Literal]] = dict()
+        self._datatypes:Dict[Any, NamedNode] = dict()
+        self._decoders:Dict[NamedNode, Callable[[str], Any]] = dict()
+        self._parsers:Dict[Any, Callable[[str], Any]] = dict()
+        self._resolved:Dict[Any, Any] = dict()
+        # bumped on every registration, so compiled field converters are rebuilt
+        self.version = 0
+
+    def register(self, 
+                    python_type:Any, 
+                    datatype:NamedNode, 
+                    to_rdf:Callable[[Any], str]=str, 
+                    to_python:Optional[Callable[[str], Any]]=None):
+        """
+        Stores values of `python_type` (and of its subclasses, unless they 
+        are registered too) as literals of `datatype`, with `to_rdf` giving
+        their lexical form. 
         
-        if value.datatype in [
-                                XSD.integer, 
-                                XSD.nonPositiveInteger,
-                            ]:
-            return int(value.value)
+        When `to_python` is given, fields of `python_type` are converted 
+        back with it, and so are other literals of `datatype` unless 
+        another type registered the datatype first.
+        """
+        if datatype == XSD.string:
+            self._encoders[python_type] = lambda value: Literal(to_rdf(value))
+        else:
+            self._encoders[python_type] = lambda value: Literal(to_rdf(value), datatype=datatype)
+        self._datatypes[python_type] = datatype
+        self._resolved.clear()
+        if to_python is not None:
+            self._parsers[python_type] = to_python
+            if datatype not in self._decoders:
+                self.register_datatype(datatype, to_python)
+        self.version += 1
+
+    def register_datatype(self, datatype:NamedNode, to_python:Callable[[str], Any]):
+        """
+        Converts literals of `datatype` back to python with `to_python`.
+        """
+        self._decoders[datatype] = to_python
+        self.version += 1
 
-        if value.datatype in [ XSD.float, ]:
-            return float(value.value)
+    def _resolve(self, python_type:Any)->Any:
+        """
+        Returns the registered type values of given type are converted as,
+        Enums are converted by their value.
+        """
+        if python_type in self._resolved:
+            return self._resolved[python_type]
+        resolved = None
+        if python_type in self._encoders:
+            resolved = python_type
+        elif isinstance(python_type, type):
+            if issubclass(python_type, Enum):
+                resolved = Enum
+            else:
+                resolved = next((cl for cl in python_type.__mro__ if cl in self._encoders), None)
+        if resolved is None:
+            raise UnsupportedType(f"! Unknown value type={python_type}")
+        self._resolved[python_type] = resolved
+        return resolved
 
-        if value.datatype in [ XSD.dateTime, ]:
-            return datetime.fromisoformat(value.value)
+    def encoder(self, python_type:Any)->Callable[[Any], Literal]:
+        """
+        Returns the function converting values of given type to literals.
+        """
+        resolved = self._resolve(python_type)
+        if resolved is Enum:
+            return self._encode_enum
+        return self._encoders[resolved]
 
-        if value.datatype in [ XSD.date, ]:
-            return datetime.fromisoformat(value.value).date()
+    def _encode_enum(self, value:Enum)->Optional[Literal]:
+        return self.encode(value.value)
 
-    raise UnsupportedType(f"! Unknown value type for value={value}")
\ No newline at end of file
+    def encode(self, value:Any, python_type:Any=None)->Optional[Literal]:
+        if value is None:
+            return None
+        if python_type is None:
+            python_type = type(value)
+        try:
+            encoder = self.encoder(python_type)
+        except UnsupportedType:
+            raise UnsupportedType(f"! Unknown value type={python_type} for value={value}")
+        return encoder(value)
+
+    def decode(self, value:Union[NamedNode, Literal])->Any:
+        if isinstance(value, Literal):
+            decoder = self._decoders.get(value.datatype)
+            if decoder is not None:
+                return decoder(value.value)
+        raise UnsupportedType(f"! Unknown value type for value={value}")
+
+    def field_converters(self, annotation:Any)->Tuple[Optional[Callable[[Any], Literal]], Callable[[Literal], Any]]:
+        """
+        Returns the (to rdf, to python) converters of a field annotated 
+        with given type. Types that are not a single literal type (unions,
+        lists, models) have no rdf converter, their values are converted 
+        by their own type.
+
+        Values converted to python have the field type, so objects can be 
+        built from them without validation.
+        """
+        args = [ arg for arg in get_args(annotation) if arg is not type(None) ]
+        if get_origin(annotation) in (Union, UnionType) and len(args) == 1:
+            annotation = args[0]
+        try:
+            resolved = self._resolve(annotation)
+        except (UnsupportedType, TypeError):
+            return None, self.decode
+        encoder = self.encoder(annotation)
+        decode = self.decode
+
+        if resolved is Enum:
+            return encoder, lambda value: annotation(decode(value))
+
+        datatype = self._datatypes.get(resolved)
+        to_python = self._parsers.get(resolved, self._decoders.get(datatype))
+        if to_python is None:
+            return encoder, decode
+
+        def field_decoder(value:Union[NamedNode, Literal])->Any:
+            if isinstance(value, Literal) and value.datatype == datatype:
+                return to_python(value.value)
+            return decode(value)
+        return encoder, field_decoder
+
+
+def _parse_bool(value:str)->bool:
+    if value == 'false':
+        return False
+    elif value == 'true':
+        return True
+    raise Exception(f'Could not parse value "{value}" to Python bool.')
+
+
+def _format_decimal(value:Decimal)->str:
+    text = format(value, 'f')
+    return text if '.' in text else f"{text}.0"
+
+
+literal_codecs = LiteralCodecs()
+literal_codecs.register(str, XSD.string, to_python=str)
+literal_codecs.register(uuid.UUID, XSD.string, to_python=uuid.UUID)
+# urls are read as strings, unless a field is declared as url
+literal_codecs.register_datatype(XSD.anyURI, str)
+literal_codecs.register(AnyUrl, XSD.anyURI, to_python=AnyUrl)
+literal_codecs.register(AnyHttpUrl, XSD.anyURI, to_python=AnyUrl)
+literal_codecs.register(bool, XSD.boolean, to_rdf=lambda value: 'true' if value else 'false', to_python=_parse_bool)
+literal_codecs.register(int, XSD.integer, to_python=int)
+literal_codecs.register(NonNegativeInt, XSD.integer)
+literal_codecs.register_datatype(XSD.nonPositiveInteger, int)
+literal_codecs.register(float, XSD.float, to_python=float)
+literal_codecs.register(datetime, XSD.dateTime, to_rdf=datetime.isoformat, to_python=datetime.fromisoformat)
+literal_codecs.register(date, XSD.date, to_rdf=date.isoformat, to_python=lambda value: datetime.fromisoformat(value).date())
+# types without a native json representation
+literal_codecs.register(Decimal, XSD.decimal, to_rdf=_format_decimal, to_python=Decimal)
+literal_codecs.register(bytes, XSD.base64Binary, to_rdf=lambda value: base64.b64encode(value).decode('ascii'), to_python=base64.b64decode)
+literal_codecs.register(time, XSD.time, to_rdf=time.isoformat, to_python=time.fromisoformat)
+
+
+def literal_python_to_rdf(value:Any, python_type:Any=None)->Union[None, NamedNode, Literal]:
+    """ convert standard python types to rdf literals """
+    return literal_codecs.encode(value, python_type)
+
+def literal_rdf_to_python(value:Union[NamedNode, Literal])->Any:
+    """ convert rdf literals to python types """
+    return literal_codecs.decode(value)
@@ -0,0 +1,162 @@
+import sys
+import asyncio
+import threading
+from tempfile import TemporaryDirectory
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List
+from pyoxigraph import *
+
+from cellini.odm import *
+from cellini.odm import aio
+
+
+def temp_clear_registry():
+    if not sys.warnoptions:
+        import warnings
+        warnings.simplefilter("ignore")
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.clear()
+    registry.add(Bag)
+
+
+class Person(RdfBaseModel):
+    name:str
+    age:Optional[int] = None
+
+
+class Group(RdfBaseModel):
+    name:str
+    members:List[Person]
+
+
+class TestAio(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Person)
+        registry.add(Group)
+
+    async def test_save_get(self):
+        person = Person(name="John Doe", age=30)
+        await person.asave()
+
+        loaded = await Person.objects.aget(person.identifier)
+        self.assertEqual(loaded, person)
+        self.assertEqual(await Person.objects.acount(), 1)
+
+        await loaded.adelete()
+        self.assertEqual(await Person.objects.acount(), 0)
+
+    async def test_afilter(self):
+        for i in range(10):
+            Person(name=f"person-{i}", age=i % 2).save()
+
+        names = [ person.name async for person in Person.objects.filter(age=1).aiterator(chunk_size=2) ]
+        self.assertEqual(sorted(names), [ f"person-{i}" for i in range(1, 10, 2) ])
+
+        ordered = [ person.name async for person in Person.objects.order_by('-name').limit(3) ]
+        self.assertEqual(ordered, ["person-9", "person-8", "person-7"])
+        self.assertEqual((await Person.objects.order_by('name').afirst()).name, "person-0")
+
+    async def test_runs_off_loop_thread(self):
+        threads = set()
+        def record():
+            threads.add(threading.get_ident())
+        await aio.run_sync(record)
+        self.assertNotIn(threading.get_ident(), threads)
+
+    async def test_session_context(self):
+        group = Group(name="group", members=[ Person(name="a"), Person(name="b") ])
+        group.save()
+
+        with Session() as session:
+            first = await Group.objects.aget(group.identifier)
+            second = await Group.objects.aget(group.identifier)
+            self.assertIs(first, second)
+            self.assertIn(first.__rdf_uri__, session)
+
+    async def test_break_stops_loading(self):
+        for i in range(6):
+            Person(name=f"person-{i}").save()
+
+        loaded = []
+        original = aio.run_sync
+        async def counting(func, *args, **kwargs):
+            loaded.append(func)
+            return await original(func, *args, **kwargs)
+        aio.run_sync = counting
+        try:
+            async for person in Person.objects.all().aiterator(chunk_size=2):
+                break
+        finally:
+            aio.run_sync = original
+        # one call selecting the uris and one loading the first chunk
+        self.assertEqual(len(loaded), 2)
+
+    async def test_concurrency(self):
+        aio.configure(max_workers=2)
+        try:
+            running, peak = [0], [0]
+            lock = threading.Lock()
+            def work():
+                with lock:
+                    running[0] += 1
+                    peak[0] = max(peak[0], running[0])
+                threading.Event().wait(0.02)
+                with lock:
+                    running[0] -= 1
+            await asyncio.gather(*(aio.run_sync(work) for _ in range(6)))
+            self.assertEqual(peak[0], 2)
+        finally:
+            aio.configure(max_workers=aio.DEFAULT_MAX_WORKERS)
+
+    async def test_cancel(self):
+        aio.configure(max_workers=1)
+        try:
+            started = threading.Event()
+            release = threading.Event()
+            calls = []
+            def blocking():
+                started.set()
+                release.wait(5)
+            def queued():
+                calls.append(1)
+
+            first = asyncio.ensure_future(aio.run_sync(blocking))
+            second = asyncio.ensure_future(aio.run_sync(queued))
+            await asyncio.get_running_loop().run_in_executor(None, started.wait)
+            second.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await second
+            release.set()
+            await first
+            await aio.run_sync(lambda: None)
+            self.assertEqual(calls, [])
+        finally:
+            aio.configure(max_workers=aio.DEFAULT_MAX_WORKERS)
+
+    def test_configure_validation(self):
+        with self.assertRaises(ValueError):
+            aio.configure(max_workers=0)
+
+    async def test_configure_executor(self):
+        created = aio.get_executor()
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            aio.configure(executor=executor)
+            # executors created by aio are shut down when replaced
+            with self.assertRaises(RuntimeError):
+                created.submit(lambda: None)
+            person = Person(name="test")
+            await person.asave()
+            aio.configure(max_workers=aio.DEFAULT_MAX_WORKERS)
+            # executors given by the caller are still usable
+            self.assertEqual(executor.submit(lambda: 1).result(), 1)
+            self.assertEqual((await Person.objects.aget(person.identifier)).name, "test")
+        finally:
+            executor.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
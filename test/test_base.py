@@ -49,6 +49,63 @@ class TestDefaultRegistry(unittest.TestCase):
 
 
 
+class Person(RdfBaseModel):
+    name:str
+
+class PersonDetail(RdfBaseModel):
+    detail:str
+
+
+class TestRegistryLookup(unittest.TestCase):
+
+    def setUp(self):
+        registry._store = Store(path=TemporaryDirectory().name)
+        registry.clear()
+        registry.add(Bag)
+        registry.add(Person)
+        registry.add(PersonDetail)
+
+    def test_shared_title_prefixes(self):
+        person = Person(name="test")
+        detail = PersonDetail(detail="test")
+        self.assertEqual(registry.uri_to_basemodel(person.__rdf_uri__), Person)
+        self.assertEqual(registry.uri_to_basemodel(detail.__rdf_uri__), PersonDetail)
+        self.assertEqual(registry.get_basemodel("cellini:PersonDetail"), PersonDetail)
+        self.assertTrue(registry.uri_can_resolve(detail.__rdf_uri__))
+
+    def test_unknown_uri(self):
+        self.assertFalse(registry.uri_can_resolve("cellini:Unknown:1234"))
+        self.assertFalse(registry.uri_can_resolve("cellini:Per:1234"))
+        with self.assertRaises(ValueError):
+            registry.uri_to_basemodel("cellini:Unknown:1234")
+        with self.assertRaises(ValueError):
+            registry.get_basemodel("cellini:Unknown")
+
+    def test_identifier_with_colon(self):
+        self.assertEqual(registry.uri_to_basemodel("cellini:Person:urn:isbn:1234"), Person)
+
+    def test_foreign_uri(self):
+        for uri in ("http://www.w3.org/1999/02/22-rdf-syntax-ns#type",
+                    Person.__rdf_type__(),
+                    "urn:isbn:1234",
+                    "cellini"):
+            self.assertFalse(registry.uri_can_resolve(uri))
+
+    def test_index_follows_registry_changes(self):
+        uri = Person(name="test").__rdf_uri__
+        registry.discard(Person)
+        self.assertFalse(registry.uri_can_resolve(uri))
+        registry.add(Person)
+        self.assertTrue(registry.uri_can_resolve(uri))
+
+        registry._uri_prefix = "http://example.com/"
+        try:
+            self.assertFalse(registry.uri_can_resolve(uri))
+            self.assertEqual(registry.uri_to_basemodel(Person(name="test").__rdf_uri__), Person)
+        finally:
+            registry._uri_prefix = "cellini:"
+
+
 class TestCustomRdfType(unittest.TestCase):
     
     def test_registry_with_custom_rdf_type(self):
@@ -0,0 +1,169 @@
+import io
+import os
+import sys
+from tempfile import TemporaryDirectory
+import unittest
+from typing import Optional, List
+from pyoxigraph import *
+
+from cellini.odm import *
+
+
+def temp_clear_registry():
+    if not sys.warnoptions:
+        import warnings
+        warnings.simplefilter("ignore")
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.clear()
+    registry.add(Bag)
+    registry.add(Person)
+    registry.add(Organization)
+    registry.add(Employee)
+
+
+class Person(RdfBaseModel):
+    name:str
+
+class Employee(Person):
+    pass
+
+class Organization(RdfBaseModel):
+    name:str
+    employees:List[Person]
+    owner:Optional[Person] = None
+
+
+def populate():
+    org = Organization(
+        name="org",
+        employees=[ Person(name=f"employee-{i}") for i in range(3) ],
+        owner=Person(name="owner"))
+    org.save()
+    return org
+
+
+class TestDump(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        self.org = populate()
+        self.size = len(registry.triple_store)
+
+    def tearDown(self):
+        registry.graph_per_model = False
+
+    def reload(self, output, **kwargs):
+        output.seek(0)
+        registry.set_triple_store(MemoryStore())
+        return registry.load(output, **kwargs)
+
+    def assertRestored(self):
+        org = Organization.objects.get(self.org.identifier)
+        self.assertEqual(org.name, "org")
+        self.assertEqual(sorted(e.name for e in org.employees), [ f"employee-{i}" for i in range(3) ])
+        self.assertEqual(org.owner.name, "owner")
+        self.assertEqual(Person.objects.count(), 4)
+
+    def test_round_trip(self):
+        for format in ("nq", "nt", "ttl", "trig"):
+            with self.subTest(format=format):
+                temp_clear_registry()
+                self.org = populate()
+                output = io.BytesIO()
+                stats = registry.dump(output, format=format)
+                self.assertEqual(stats.triples, self.size)
+                self.assertEqual(stats.objects, 5)
+
+                stats = self.reload(output, format=format)
+                self.assertEqual(stats.triples, self.size)
+                self.assertEqual(len(registry.triple_store), self.size)
+                self.assertRestored()
+
+    def test_path_format(self):
+        with TemporaryDirectory() as directory:
+            path = os.path.join(directory, "data.nt")
+            registry.dump(path)
+            with open(path) as f:
+                self.assertEqual(len(f.read().splitlines()), self.size)
+            temp_clear_registry()
+            registry.load(path)
+        self.assertRestored()
+        with self.assertRaises(ValueError):
+            registry.dump(io.BytesIO(), format="csv")
+
+    def test_models(self):
+        output = io.BytesIO()
+        stats = registry.dump(output, models=[Person])
+        self.assertEqual(stats.objects, 4)
+        self.reload(output)
+        self.assertEqual(Person.objects.count(), 4)
+        self.assertEqual(Organization.objects.count(), 0)
+
+    def test_models_with_subclasses(self):
+        Employee(name="employee").save()
+        size = len(registry.triple_store)
+        quads = set(Person.objects.quads())
+        self.assertEqual(set(Person.objects.quads(chunk_size=1)), quads)
+
+        output = io.BytesIO()
+        stats = registry.dump(output, models=[Person, Employee, Person])
+        self.assertEqual(stats.triples, len(quads))
+        self.assertEqual(stats.objects, 5)
+
+        output = io.BytesIO()
+        stats = registry.dump(output, models=[Employee, Organization, Person])
+        self.assertEqual(stats.triples, size)
+
+    def test_graph_routing(self):
+        output = io.BytesIO()
+        registry.dump(output, format="nt")
+        registry.graph_per_model = True
+        # lists are read before the object holding them
+        lines = output.getvalue().splitlines()
+        output = io.BytesIO(b"\n".join(sorted(lines, key=lambda line: b"Bag" not in line)))
+        self.reload(output, format="nt", batch_size=2)
+        self.assertEqual(
+            set(registry.triple_store.named_graphs()),
+            { NamedNode(Person.__rdf_title__()), NamedNode(Organization.__rdf_title__()) })
+        self.assertEqual(len(list(registry.triple_store.quads_for_pattern(graph_name=DefaultGraph()))), 0)
+        self.assertRestored()
+
+    def test_validation(self):
+        foreign = b'<http://example.org/a> <http://example.org/p> "x" .\n'
+        with self.assertRaises(ValueError):
+            registry.load(io.BytesIO(foreign), format="nt")
+
+        uri = self.org.owner.__rdf_uri__.value
+        wrong_type = f'<{ uri }> <http://www.w3.org/1999/02/22-rdf-syntax-ns#type> <{ Organization.__rdf_type__().value }> .\n'
+        with self.assertRaises(ValueError):
+            registry.load(io.BytesIO(wrong_type.encode()), format="nt")
+        self.assertEqual(len(registry.triple_store), self.size)
+
+        stats = registry.load(io.BytesIO(foreign), format="nt", validate=False)
+        self.assertEqual(stats.triples, 1)
+        self.assertEqual(len(registry.triple_store), self.size + 1)
+
+    def test_fast_path(self):
+        output = io.BytesIO()
+        registry.dump(output)
+        output.seek(0)
+        temp_clear_registry()
+        stats = registry.load(output, validate=False)
+        self.assertEqual(stats.triples, self.size)
+        self.assertRestored()
+
+    def test_progress(self):
+        reports = []
+        output = io.BytesIO()
+        stats = registry.dump(output, progress=lambda s: reports.append(s.triples), progress_every=10)
+        self.assertEqual(reports, list(range(10, self.size + 1, 10)) + [ self.size ])
+        self.assertGreater(stats.seconds, 0)
+        self.assertGreater(stats.triples_per_second, 0)
+
+        reports.clear()
+        self.reload(output, progress=lambda s: reports.append(s.triples), progress_every=10)
+        self.assertEqual(reports[-1], self.size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import io
+import sys
+from contextvars import ContextVar
+from tempfile import TemporaryDirectory
+import unittest
+from typing import Optional, List
+from pyoxigraph import *
+
+from cellini.odm import *
+
+
+def temp_clear_registry():
+    if not sys.warnoptions:
+        import warnings
+        warnings.simplefilter("ignore")
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.clear()
+    registry.add(Bag)
+
+
+tenant:ContextVar[str] = ContextVar('tenant', default="default")
+
+
+class Person(RdfBaseModel):
+    name:str
+
+class Employee(Person):
+    position:Optional[str] = None
+
+class Organization(RdfBaseModel):
+    name:str
+    employees:List[Employee]
+    owner:Optional[Person] = None
+
+class Document(RdfBaseModel):
+    title:str
+
+    @classmethod
+    def __rdf_graph__(cls):
+        return NamedNode(f"cellini:tenant:{ tenant.get() }")
+
+
+class TestNamedGraphs(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.graph_per_model = True
+        for model in (Person, Employee, Organization, Document):
+            registry.add(model)
+        self.org = Organization(
+            name="org",
+            employees=[ Employee(name=f"employee-{i}", position="any") for i in range(3) ],
+            owner=Person(name="owner"))
+        self.org.save()
+
+    def tearDown(self):
+        registry.graph_per_model = False
+
+    def graph_subjects(self, model):
+        return { quad.subject for quad in registry.triple_store.quads_for_pattern(graph_name=NamedNode(model.__rdf_title__())) }
+
+    def test_graph_per_model(self):
+        self.assertEqual(
+            set(registry.triple_store.named_graphs()), 
+            { NamedNode(model.__rdf_title__()) for model in (Person, Employee, Organization) })
+        self.assertEqual(self.graph_subjects(Person), { self.org.owner.__rdf_uri__ })
+        self.assertEqual(self.graph_subjects(Employee), { e.__rdf_uri__ for e in self.org.employees })
+        # lists are kept with the object holding them
+        self.assertEqual(len(self.graph_subjects(Organization)), 2)
+        self.assertEqual(len(list(registry.triple_store.quads_for_pattern(graph_name=DefaultGraph()))), 0)
+
+    def test_queries(self):
+        self.assertEqual(Person.objects.count(), 4)
+        self.assertEqual(Employee.objects.count(), 3)
+        self.assertEqual(
+            [ p.name for p in Person.objects.order_by('name').limit(2) ], ["employee-0", "employee-1"])
+        self.assertEqual(Employee.objects.filter(name="employee-1").first().position, "any")
+        self.assertEqual(list(Organization.objects.values_list('name', flat=True)), ["org"])
+
+        org = Organization.objects.get(self.org.identifier)
+        self.assertEqual(org.owner.name, "owner")
+        self.assertEqual(sorted(e.name for e in org.employees), ["employee-0", "employee-1", "employee-2"])
+        self.assertTrue(Organization.objects.exists(org))
+
+        # related objects are matched in their own graphs
+        self.assertEqual(Organization.objects.filter(owner__name="owner").count(), 1)
+        self.assertEqual(Organization.objects.filter(employees__name__startswith="employee-2").count(), 1)
+        self.assertEqual(Organization.objects.filter(owner__name="other").count(), 0)
+
+    def test_save_delete(self):
+        org = Organization.objects.get(self.org.identifier)
+        org.name = "renamed"
+        org.employees = org.employees[:1]
+        org.save()
+        self.assertEqual(Organization.objects.get(org.identifier).name, "renamed")
+        self.assertEqual(len(Organization.objects.get(org.identifier).employees), 1)
+
+        org.delete()
+        self.assertEqual(self.graph_subjects(Organization), set())
+        self.assertEqual(Person.objects.count(), 4)
+
+    def test_clear(self):
+        Employee.objects.clear()
+        self.assertEqual(Employee.objects.count(), 0)
+        self.assertEqual(Person.objects.count(), 1)
+
+        Person.objects.clear()
+        self.assertEqual(Person.objects.count(), 0)
+        self.assertEqual(Organization.objects.count(), 1)
+
+    def test_clear_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with registry.transaction():
+                Person.objects.clear()
+                raise RuntimeError()
+        self.assertEqual(Person.objects.count(), 4)
+
+    def test_export(self):
+        quads = list(Person.objects.quads())
+        self.assertEqual({ quad.graph_name for quad in quads }, { NamedNode(Person.__rdf_title__()), NamedNode(Employee.__rdf_title__()) })
+
+        output = io.BytesIO()
+        Organization.objects.export(output)
+        exported = list(parse(io.BytesIO(output.getvalue()), "application/n-quads"))
+        self.assertEqual(set(exported), set(Organization.objects.quads()))
+
+        registry.set_triple_store(MemoryStore(exported))
+        self.assertEqual(list(Organization.objects.values_list('name', flat=True)), ["org"])
+        self.assertEqual(Person.objects.count(), 0)
+
+    def test_custom_graph(self):
+        Document(title="a").save()
+        token = tenant.set("other")
+        try:
+            Document(title="b").save()
+            Document(title="c").save()
+            self.assertEqual(sorted(d.title for d in Document.objects.all()), ["b", "c"])
+            Document.objects.clear()
+        finally:
+            tenant.reset(token)
+        self.assertEqual([ d.title for d in Document.objects.all() ], ["a"])
+
+    def test_graph_scope_changes(self):
+        self.assertEqual(
+            set(registry.graphs_of(Person)),
+            { NamedNode(Person.__rdf_title__()), NamedNode(Employee.__rdf_title__()) })
+        registry.discard(Employee)
+        self.assertEqual(registry.graphs_of(Person), (NamedNode(Person.__rdf_title__()), ))
+        registry.add(Employee)
+        self.assertEqual(len(registry.graphs_of(Person)), 2)
+
+        registry.graph_per_model = False
+        self.assertIsNone(registry.graphs_of(Person))
+        registry.graph_per_model = True
+
+        token = tenant.set("other")
+        try:
+            self.assertEqual(registry.graphs_of(Document), (NamedNode("cellini:tenant:other"), ))
+        finally:
+            tenant.reset(token)
+        self.assertEqual(registry.graphs_of(Document), (NamedNode("cellini:tenant:default"), ))
+
+
+class TestDefaultGraph(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        for model in (Person, Employee, Organization):
+            registry.add(model)
+
+    def test_default_graph(self):
+        Organization(name="org", employees=[ Employee(name="employee") ]).save()
+        self.assertEqual(list(registry.triple_store.named_graphs()), [])
+        self.assertIsNone(registry.graphs_of(Person))
+
+        self.assertEqual(len(list(Employee.objects.quads())), len(list(Employee.objects.first().to_triples())))
+        Person.objects.clear()
+        self.assertEqual(Person.objects.count(), 0)
+        self.assertEqual(Organization.objects.count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,213 @@
+import sys
+from tempfile import TemporaryDirectory
+import unittest
+import uuid
+from datetime import datetime
+from typing import ClassVar, List, Optional
+from pydantic import PrivateAttr, ValidationError, field_validator
+from pyoxigraph import *
+
+from cellini.odm import *
+from cellini.odm.hydration import Hydrator
+
+
+def temp_clear_registry():
+    if not sys.warnoptions:
+        import warnings
+        warnings.simplefilter("ignore")
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.clear()
+    registry.add(Bag)
+
+
+class CountingStore(object):
+    """ wraps a store and counts the queries and pattern lookups sent to it """
+
+    def __init__(self, store):
+        self.store = store
+        self.queries = []
+
+    def query(self, query, **kwargs):
+        self.queries.append(query)
+        return self.store.query(query, **kwargs)
+
+    def quads_for_pattern(self, *pattern):
+        self.queries.append(pattern)
+        return self.store.quads_for_pattern(*pattern)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+class Person(RdfBaseModel):
+    name:str
+
+class Employee(Person):
+    position:Optional[str] = None
+
+class Owner(Person):
+    pass
+
+class Organization(RdfBaseModel):
+    name:str
+    employees:List[Employee]
+    owner:Owner
+
+
+class Audited(RdfBaseModel):
+    name:str
+    created:datetime
+    tags:List[str] = []
+    owner:Optional[Owner] = None
+
+    # names of validated objects
+    validated:ClassVar[List[str]] = []
+
+    @field_validator('name')
+    @classmethod
+    def count_validation(cls, value:str)->str:
+        cls.validated.append(value)
+        return value
+
+
+class Initialized(RdfBaseModel):
+    name:str
+
+    _upper:Optional[str] = PrivateAttr(default=None)
+
+    def model_post_init(self, context):
+        self._upper = self.name.upper()
+
+class InitializedChild(Initialized):
+    _lower:Optional[str] = PrivateAttr(default=None)
+
+
+class TestHydrator(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Person)
+        registry.add(Employee)
+        registry.add(Owner)
+        registry.add(Organization)
+        self.owner = Owner(name="owner")
+        self.orgs = [
+            Organization(
+                name=f"org-{i}",
+                employees=[Employee(name=f"employee-{i}-{j}", position="any") for j in range(20)],
+                owner=self.owner)
+            for i in range(3)
+        ]
+        for org in self.orgs:
+            org.save()
+        self.store = CountingStore(registry.triple_store.store)
+        registry._store = self.store
+
+    def tearDown(self):
+        registry._store = self.store.store
+
+    def test_resolve_one_query_per_depth(self):
+        org = Organization.objects.get(self.orgs[0].identifier)
+        # organization, then its bag and owner, then the employees
+        self.assertEqual(len(self.store.queries), 3)
+        self.assertEqual(org.name, "org-0")
+        self.assertEqual(org.owner.identifier, self.owner.identifier)
+        self.assertEqual(sorted(e.name for e in org.employees), sorted(e.name for e in self.orgs[0].employees))
+
+    def test_single_subject_pattern_lookup(self):
+        owner = Owner.objects.get(self.owner.identifier)
+        self.assertEqual(owner.name, "owner")
+        self.assertTrue(Owner.objects.exists(owner))
+        self.assertFalse(Owner.objects.exists(Owner(name="unsaved")))
+        # single subjects are matched against store indexes, without sparql
+        self.assertEqual(len(self.store.queries), 3)
+        self.assertFalse(any(isinstance(query, str) for query in self.store.queries))
+
+    def test_filter_one_query_per_depth(self):
+        orgs = list(Organization.objects.all())
+        # select, then the three depth levels of all organizations together
+        self.assertEqual(len(self.store.queries), 4)
+        self.assertEqual(sorted(org.name for org in orgs), ["org-0", "org-1", "org-2"])
+
+    def test_shared_reference_built_once(self):
+        hydrator = Hydrator()
+        orgs = hydrator.resolve_many([org.__rdf_uri__ for org in self.orgs])
+        self.assertIs(orgs[0].owner, orgs[1].owner)
+        self.assertIs(orgs[1].owner, orgs[2].owner)
+
+    def test_chunked_fetch(self):
+        hydrator = Hydrator(chunk_size=2)
+        orgs = hydrator.resolve_many([org.__rdf_uri__ for org in self.orgs])
+        self.assertEqual([org.identifier for org in orgs], [org.identifier for org in self.orgs])
+        self.assertEqual(len(orgs[2].employees), 20)
+
+
+
+class TestTrustedHydration(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Person)
+        registry.add(Owner)
+        registry.add(Audited)
+        self.obj = Audited(name="audited", created=datetime(2020, 1, 1, 12), tags=["a", "b"], owner=Owner(name="owner"))
+        self.obj.save()
+        Audited.validated.clear()
+
+    def test_stored_data_not_validated(self):
+        obj = Audited.objects.get(self.obj.identifier)
+        self.assertEqual(Audited.validated, [])
+        self.assertEqual(obj, self.obj)
+        self.assertIsInstance(obj.identifier, uuid.UUID)
+        self.assertIsInstance(obj.created, datetime)
+        self.assertIs(type(obj.tags), list)
+        self.assertEqual(obj.owner.name, "owner")
+        self.assertEqual(obj.dirty_fields(), set())
+
+        list(Audited.objects.all())
+        self.assertEqual(Audited.validated, [])
+
+    def test_post_init(self):
+        registry.add(Initialized)
+        obj = Initialized(name="initialized")
+        obj.save()
+        self.assertEqual(Initialized.objects.get(obj.identifier)._upper, "INITIALIZED")
+
+        self.assertTrue(Initialized.__rdf_metadata__().custom_post_init)
+        self.assertTrue(InitializedChild.__rdf_metadata__().custom_post_init)
+        self.assertFalse(Audited.__rdf_metadata__().custom_post_init)
+        self.assertFalse(Owner.__rdf_metadata__().custom_post_init)
+
+    def test_missing_object(self):
+        from cellini.odm.model import UnresovableNode
+        for validate in (False, True):
+            with self.assertRaises(UnresovableNode):
+                Audited.objects.get(uuid.uuid4(), validate=validate)
+            with self.assertRaises(UnresovableNode):
+                Owner.objects.get(uuid.uuid4(), validate=validate)
+
+    def test_missing_field(self):
+        uri = self.obj.__rdf_uri__
+        name = Audited._get_predicate_from_field('name')
+        registry.triple_store.remove(Triple(uri, name, Literal("audited")))
+        with self.assertRaises(ValidationError):
+            Audited.objects.get(self.obj.identifier)
+
+        identifier = Audited._get_predicate_from_field('identifier')
+        registry.triple_store.add(Triple(uri, name, Literal("audited")))
+        registry.triple_store.remove(Triple(uri, identifier, Literal(f"{self.obj.identifier}")))
+        with self.assertRaises(ValidationError):
+            Audited.objects.get(self.obj.identifier)
+
+    def test_validation_opt_in(self):
+        validated = Audited.objects.get(self.obj.identifier, validate=True)
+        self.assertEqual(Audited.validated, ["audited"])
+        self.assertEqual(validated, Audited.objects.get(self.obj.identifier))
+
+        list(Audited.objects.filter(name="audited").validate())
+        list(Audited.objects.all(validate=True).limit(1))
+        self.assertEqual(Audited.validated, ["audited"] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import sys
+from tempfile import TemporaryDirectory
+import unittest
+from typing import List, Optional
+from pydantic import Field
+from pyoxigraph import *
+
+from cellini.odm import *
+
+
+def temp_clear_registry():
+    if not sys.warnoptions:
+        import warnings
+        warnings.simplefilter("ignore")
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.clear()
+    registry.add(Bag)
+
+
+class CountingStore(object):
+    """ wraps a store and counts the queries and pattern lookups sent to it """
+
+    def __init__(self, store):
+        self.store = store
+        self.queries = []
+
+    def query(self, query, **kwargs):
+        self.queries.append(query)
+        return self.store.query(query, **kwargs)
+
+    def quads_for_pattern(self, *pattern):
+        self.queries.append(pattern)
+        return self.store.quads_for_pattern(*pattern)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+class Person(RdfBaseModel):
+    name:str
+
+class Employee(Person):
+    position:Optional[str] = None
+
+class Owner(Person):
+    pass
+
+class LazyOrganization(RdfBaseModel):
+    name:str
+    employees:List[Employee] = Field(json_schema_extra={'loading': 'lazy'})
+    owner:Owner = Field(json_schema_extra={'loading': 'lazy'})
+
+class Organization(RdfBaseModel):
+    name:str
+    employees:List[Employee]
+    owner:Owner
+
+
+class TestLazyLoading(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        for model in [Person, Employee, Owner, LazyOrganization, Organization]:
+            registry.add(model)
+        self.owner = Owner(name="owner")
+        self.employees = [Employee(name=f"employee-{i}", position="any") for i in range(3)]
+        self.lazy = LazyOrganization(name="lazy", employees=self.employees, owner=self.owner)
+        self.org = Organization(name="org", employees=self.employees, owner=self.owner)
+        self.lazy.save()
+        self.org.save()
+        self.store = CountingStore(registry.triple_store.store)
+        registry._store = self.store
+
+    def tearDown(self):
+        registry._store = self.store.store
+
+    def test_lazy_field(self):
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        # organization and the employees bag, but neither owner nor employees
+        self.assertEqual(len(self.store.queries), 2)
+        self.assertEqual(org.name, "lazy")
+        self.assertIsInstance(org.owner, Owner)
+        self.assertEqual(org.owner.identifier, self.owner.identifier)
+        self.assertEqual(org.owner.__rdf_uri__, self.owner.__rdf_uri__)
+        self.assertNotIn('name', org.owner.__dict__)
+        self.assertEqual(len(org.employees), 3)
+        self.assertEqual(len(self.store.queries), 2)
+
+        self.assertEqual(org.owner.name, "owner")
+        self.assertEqual(len(self.store.queries), 3)
+        self.assertEqual(sorted(e.position for e in org.employees), ["any", "any", "any"])
+        self.assertEqual(sorted(e.name for e in org.employees), [e.name for e in self.employees])
+
+    def test_query_loading_override(self):
+        org = Organization.objects.get(self.org.identifier, loading={'owner': 'lazy', 'employees': 'lazy'})
+        self.assertEqual(len(self.store.queries), 2)
+        self.assertNotIn('name', org.owner.__dict__)
+        self.assertEqual(org.owner.name, "owner")
+
+        org = Organization.objects.get(self.org.identifier)
+        self.assertIn('name', org.owner.__dict__)
+
+        orgs = list(Organization.objects.filter(name="org").loading(owner='lazy'))
+        self.assertNotIn('name', orgs[0].owner.__dict__)
+
+        org = LazyOrganization.objects.get(self.lazy.identifier, loading={'owner': 'eager'})
+        self.assertIn('name', org.owner.__dict__)
+
+    def test_save_unloaded_reference(self):
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        org.name = "renamed"
+        org.save()
+        org.owner.save()
+        res = LazyOrganization.objects.get(self.lazy.identifier)
+        self.assertEqual(res.name, "renamed")
+        self.assertEqual(res.owner.name, "owner")
+        self.assertEqual(len(res.employees), 3)
+        self.assertEqual(res.employees[0].position, "any")
+
+    def test_assign_unloaded_reference(self):
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        org.owner.name = "renamed"
+        self.assertEqual(org.owner.dirty_fields(), {'name'})
+        org.save()
+        self.assertEqual(Owner.objects.get(self.owner.identifier).name, "renamed")
+
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        org.owner.name = "changed"
+        org.owner.save()
+        self.assertEqual(Owner.objects.get(self.owner.identifier).name, "changed")
+
+    def test_equality_and_dump_load_reference(self):
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        self.assertEqual(org.owner, self.owner)
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        self.assertEqual(org.owner.model_dump()['name'], "owner")
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        dump = org.model_dump()
+        self.assertEqual(dump['owner']['name'], "owner")
+        self.assertEqual(sorted(e['position'] for e in dump['employees']), ["any", "any", "any"])
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        self.assertIn('"name":"owner"', org.model_dump_json())
+
+    def test_session_keeps_reference(self):
+        with Session():
+            org = LazyOrganization.objects.get(self.lazy.identifier)
+            owner = Owner.objects.get(self.owner.identifier)
+            self.assertIs(owner, org.owner)
+            self.assertEqual(owner.name, "owner")
+
+    def test_deleted_reference(self):
+        org = LazyOrganization.objects.get(self.lazy.identifier)
+        self.owner.delete()
+        with self.assertRaises(Exception):
+            org.owner.name
+
+    def test_invalid_loading_strategy(self):
+        with self.assertRaises(ValueError):
+            Organization.objects.get(self.org.identifier, loading={'owner': 'sometimes'})
+
+
+if __name__ == '__main__':
+    unittest.main()
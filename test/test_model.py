@@ -3,7 +3,7 @@ from tempfile import TemporaryDirectory
 import unittest
 from typing import Optional, List
 from datetime import datetime
-from pydantic import Field
+from pydantic import Field, computed_field
 from pyoxigraph import *
 
 from cellini.odm import *
@@ -32,6 +32,14 @@ class Complex(Simple):
 class DeepNested(RdfBaseModel):
     nested:Nested
 
+class Group(RdfBaseModel):
+    members:List[Simple]
+    owner:Optional[Simple] = None
+
+class Link(RdfBaseModel):
+    name:str
+    next:Optional['Link'] = None
+
 
 class TestDefaultNamespace(RdfBaseModel):
     
@@ -46,6 +54,23 @@ class TestCustomNamespace(RdfBaseModel):
     a_field:Optional[str] = Field(None)
 
 
+class TestPredicateIndex(RdfBaseModel):
+
+    name:str = Field(json_schema_extra={'predicate': "http://xmlns.com/foaf/0.1/name"})
+
+    @computed_field
+    @property
+    def upper_name(self)->str:
+        return self.name.upper()
+
+class TestIgnoreUnknownPredicates(RdfBaseModel):
+
+    @classmethod
+    def __rdf_unknown_predicates__(cls) -> str:
+        return "ignore"
+
+    name:str
+
     
 class TestRdfBaseModel(unittest.TestCase):
     """
@@ -119,6 +144,59 @@ class TestRdfBaseModel(unittest.TestCase):
 
 
 
+    def test_rdf_metadata_cache(self):
+        metadata = Simple.__rdf_metadata__()
+        self.assertIs(Simple.__rdf_metadata__(), metadata)
+        self.assertEqual(metadata.title, "cellini:Simple")
+        self.assertEqual(metadata.rdf_types, (Simple.__rdf_type__(), ))
+        self.assertEqual(metadata.field_predicates['number'].value, "https://cellini.io/ns/number")
+        self.assertEqual(metadata.predicate_fields[NamedNode("http://purl.org/dc/terms/identifier")], "identifier")
+        self.assertEqual(list(Complex.__rdf_types__()), [Complex.__rdf_type__(), Simple.__rdf_type__()])
+        with self.assertRaises(TypeError):
+            metadata.field_predicates['number'] = None
+
+    def test_rdf_metadata_uri_prefix_change(self):
+        metadata = Simple.__rdf_metadata__()
+        registry._uri_prefix = "http://example.com/"
+        try:
+            self.assertIsNot(Simple.__rdf_metadata__(), metadata)
+            self.assertEqual(Simple.__rdf_title__(), "http://example.com/Simple")
+            self.assertTrue(Simple(number=1, phrase="test").__rdf_uri__.value.startswith("http://example.com/Simple:"))
+        finally:
+            registry._uri_prefix = "cellini:"
+        self.assertEqual(Simple.__rdf_title__(), "cellini:Simple")
+
+    def test_predicate_index(self):
+        self.assertEqual(TestPredicateIndex._get_field_name_from_predicate(NamedNode("http://xmlns.com/foaf/0.1/name")), "name")
+        self.assertEqual(TestPredicateIndex._get_field_name_from_predicate(NamedNode("https://cellini.io/ns/upper_name")), "upper_name")
+        self.assertEqual(TestPredicateIndex._get_field_name_from_predicate(NamedNode("http://purl.org/dc/terms/identifier")), "identifier")
+        self.assertIsNone(TestPredicateIndex._get_field_name_from_predicate(NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#type")))
+        with self.assertRaises(ValueError):
+            TestPredicateIndex._get_field_name_from_predicate(NamedNode("https://cellini.io/ns/name"))
+
+    def test_predicate_index_resolve(self):
+        registry.add(TestPredicateIndex)
+        obj = TestPredicateIndex(name="test")
+        obj.save()
+        uri = obj.__rdf_uri__
+        registry.triple_store.add(Quad(uri, NamedNode("https://cellini.io/ns/upper_name"), Literal("TEST")))
+        res = TestPredicateIndex.objects.get(obj.identifier)
+        self.assertEqual(res.name, "test")
+        self.assertEqual(res.upper_name, "TEST")
+
+    def test_unknown_predicates(self):
+        registry.add(TestIgnoreUnknownPredicates)
+        obj = TestIgnoreUnknownPredicates(name="test")
+        obj.save()
+        registry.triple_store.add(Quad(obj.__rdf_uri__, NamedNode("https://cellini.io/ns/unknown"), Literal("any")))
+        self.assertEqual(TestIgnoreUnknownPredicates.objects.get(obj.identifier).name, "test")
+
+        simple = Simple(number=1, phrase="test")
+        simple.save()
+        registry.triple_store.add(Quad(simple.__rdf_uri__, NamedNode("https://cellini.io/ns/unknown"), Literal("any")))
+        with self.assertRaises(ValueError):
+            Simple.objects.get(simple.identifier)
+
     def test_simple_class_defaults(self):
         obj = Simple(number=1, phrase="test")
         self.assertEqual(obj.__rdf_title__(), "cellini:Simple")
@@ -204,6 +282,35 @@ class TestRdfBaseModel(unittest.TestCase):
         self.assertEqual(a.nested.simple.number, 2)
         self.assertEqual(a.nested.simple.phrase, "sec")
 
+    def test_shared_object_serialized_once(self):
+        registry.add(Bag)
+        registry.add(Group)
+        owner = Simple(number=1, phrase="owner")
+        groups = Bag(Group(members=[ owner, Simple(number=i, phrase="member") ], owner=owner) for i in range(3))
+        triples = list(groups.to_triples())
+        self.assertEqual(len(triples), len(set(triples)))
+        self.assertEqual(sum(1 for s, p, o in triples if s == owner.__rdf_uri__), 5)
+        self.assertEqual(len(list(groups[0].to_triples())), len(set(groups[0].to_triples())))
+
+    def test_cycles(self):
+        registry.add(Link)
+        first = Link(name="first")
+        last = Link(name="last", next=first)
+        first.next = last
+        triples = list(first.to_triples())
+        self.assertEqual({ s for s, p, o in triples }, { first.__rdf_uri__, last.__rdf_uri__ })
+        self.assertEqual(len(triples), 8)
+        self.assertEqual(first._related_models(), [ last ])
+
+    def test_deep_object_graph(self):
+        registry.add(Link)
+        link = None
+        depth = sys.getrecursionlimit() * 2
+        for i in range(depth):
+            link = Link(name=f"link-{i}", next=link)
+        self.assertEqual(len(list(link.to_triples())), depth * 4 - 1)
+        self.assertEqual(len(link._related_models()), depth - 1)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -1,12 +1,18 @@
 import sys
+import uuid
 from tempfile import TemporaryDirectory
 import unittest
+from enum import Enum
+from decimal import Decimal
+from fractions import Fraction
 from typing import Optional, List, Union
-from datetime import datetime
+from datetime import datetime, time
 from pydantic import Field
 from pyoxigraph import *
 
 from cellini.odm import *
+from cellini.odm.utils import XSD, RDF, UnsupportedType, rdf_member, rdf_member_index
+from cellini.odm.types import Seq
 
 
 def temp_clear_registry():
@@ -60,6 +66,38 @@ class TestComplexListUnion(RdfBaseModel):
                 ]
             ]
 
+class Color(Enum):
+    red = "red"
+    green = "green"
+
+class Level(Enum):
+    low = 1
+    high = 2
+
+class TestLiteralTypes(RdfBaseModel):
+    price:Decimal
+    data:bytes
+    at:time
+    color:Color
+    level:Optional[Level] = None
+    prices:List[Decimal] = Field(default_factory=list)
+
+class TestTypedLists(RdfBaseModel):
+    ids:List[uuid.UUID] = []
+    colors:Optional[List[Color]] = None
+    levels:List[List[Level]] = []
+    seq:List[uuid.UUID] = Field(default_factory=list, container='seq')
+
+class TestCustomLiteral(RdfBaseModel):
+    ratio:Fraction
+
+    model_config = {'arbitrary_types_allowed': True}
+
+class TestContainer(RdfBaseModel):
+    bag:List[int] = []
+    seq:List[str] = Field(default_factory=list, container='seq')
+    models:List[TestSimpleStr] = Field(default_factory=list, container='seq')
+
 class TestListFieldClass(unittest.TestCase):
     
     def setUp(self):
@@ -294,5 +332,135 @@ class TestListUnionFieldClass(unittest.TestCase):
     #                 ]
     #             ]
 
+
+class TestLiteralCodecs(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Seq)
+        registry.add(TestLiteralTypes)
+        registry.add(TestTypedLists)
+        registry.add(TestCustomLiteral)
+
+    def test_builtin_codecs(self):
+        obj = TestLiteralTypes(
+            price=Decimal("10.50"), 
+            data=b"\x00\xffbinary", 
+            at=time(12, 30, 5), 
+            color=Color.green,
+            level=Level.high,
+            prices=[ Decimal("1.5"), Decimal("1E+2") ])
+        obj.save()
+        literals = { p.value.rsplit('/', 1)[-1]: o for s, p, o in obj.to_triples(recursive=False) if isinstance(o, Literal) }
+        self.assertEqual(literals['price'], Literal("10.50", datatype=XSD.decimal))
+        self.assertEqual(literals['at'], Literal("12:30:05", datatype=XSD.time))
+        self.assertEqual(literals['color'], Literal("green"))
+        self.assertEqual(literals['level'], Literal("2", datatype=XSD.integer))
+
+        res = TestLiteralTypes.objects.get(obj.identifier)
+        self.assertEqual(res.price, Decimal("10.50"))
+        self.assertEqual(res.data, b"\x00\xffbinary")
+        self.assertEqual(res.at, time(12, 30, 5))
+        self.assertEqual(res.color, Color.green)
+        self.assertEqual(res.level, Level.high)
+        self.assertEqual(res.prices, [ Decimal("1.5"), Decimal("100") ])
+
+        values = next(TestLiteralTypes.objects.values('identifier', 'color', 'level', 'price'))
+        self.assertEqual(values, { 'identifier': obj.identifier, 'color': Color.green, 'level': Level.high, 'price': Decimal("10.50") })
+        self.assertIsInstance(values['identifier'], uuid.UUID)
+        self.assertEqual(list(TestLiteralTypes.objects.values_list('color', flat=True)), [ Color.green ])
+
+    def test_typed_lists(self):
+        obj = TestTypedLists(
+            ids=[ uuid.uuid4(), uuid.uuid4() ],
+            colors=[ Color.red, Color.green ],
+            levels=[ [ Level.low ], [ Level.high, Level.low ] ],
+            seq=[ uuid.uuid4() ])
+        obj.save()
+        for validate in (False, True):
+            res = TestTypedLists.objects.get(obj.identifier, validate=validate)
+            self.assertEqual(res, obj)
+            self.assertIsInstance(res.ids[0], uuid.UUID)
+            self.assertIs(res.colors[1], Color.green)
+            self.assertIs(res.levels[1][0], Level.high)
+            self.assertIsInstance(res.seq[0], uuid.UUID)
+
+        res = TestTypedLists.objects.get(obj.identifier, loading={ 'ids': 'lazy' })
+        self.assertEqual(res.ids, obj.ids)
+
+    def test_compiled_field_converters(self):
+        metadata = TestLiteralTypes.__rdf_metadata__()
+        self.assertIsNotNone(metadata.field_encoders['price'])
+        self.assertIsNotNone(metadata.field_encoders['level'])
+        self.assertIsNone(metadata.field_encoders['prices'])
+        self.assertEqual(metadata.field_decoders['price'](Literal("2.5", datatype=XSD.decimal)), Decimal("2.5"))
+
+    def test_custom_codec(self):
+        obj = TestCustomLiteral(ratio=Fraction(1, 3))
+        with self.assertRaises(UnsupportedType):
+            obj.save()
+
+        version = literal_codecs.version
+        literal_codecs.register(Fraction, NamedNode("https://example.org/fraction"), to_python=Fraction)
+        self.assertGreater(literal_codecs.version, version)
+        obj.save()
+        self.assertEqual(TestCustomLiteral.objects.get(obj.identifier).ratio, Fraction(1, 3))
+
+
+class TestContainers(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Seq)
+        registry.add(TestSimpleStr)
+        registry.add(TestContainer)
+
+    def test_member_predicates(self):
+        self.assertIs(rdf_member(12), rdf_member(12))
+        self.assertEqual(rdf_member(12).value, "http://www.w3.org/1999/02/22-rdf-syntax-ns#_12")
+        self.assertEqual(rdf_member_index(rdf_member(12)), 12)
+        self.assertEqual(rdf_member_index(NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#_31")), 31)
+        self.assertIsNone(rdf_member_index(RDF.type))
+
+    def test_order(self):
+        obj = TestContainer(
+            bag=list(range(30, 0, -1)), 
+            seq=[ f"item-{i}" for i in range(25) ], 
+            models=[ TestSimpleStr(name=f"model-{i}") for i in range(12) ])
+        obj.save()
+        res = TestContainer.objects.get(obj.identifier)
+        self.assertEqual(res.bag, obj.bag)
+        self.assertEqual(res.seq, obj.seq)
+        self.assertEqual([ m.name for m in res.models ], [ m.name for m in obj.models ])
+
+    def test_seq_container(self):
+        obj = TestContainer(bag=[1], seq=["a"])
+        obj.save()
+        types = { quad.object for quad in registry.triple_store.quads_for_pattern(None, RDF.type, None) }
+        self.assertIn(RDF.Bag, types)
+        self.assertIn(RDF.Seq, types)
+        res = TestContainer.objects.get(obj.identifier)
+        self.assertEqual(res.seq, ["a"])
+        self.assertEqual(TestContainer.objects.filter(seq="a").count(), 1)
+
+        with self.assertRaises(ValueError):
+            class TestWrongContainer(RdfBaseModel):
+                many:List[str] = Field(default_factory=list, container='list')
+            TestWrongContainer.__rdf_metadata__()
+
+    def test_unordered_indexes(self):
+        bag = Bag(node=NamedNode("cellini:Bag:unordered"))
+        for idx, value in ((5, "five"), (2, "two"), (9, "nine")):
+            registry.triple_store.add(Quad(bag.__rdf_uri__, rdf_member(idx), Literal(value)))
+        registry.triple_store.add(Quad(bag.__rdf_uri__, RDF.type, RDF.Bag))
+        self.assertEqual(Bag.resolve_named_node(bag.__rdf_uri__), ["two", "five", "nine"])
+
+        bag = Bag(node=NamedNode("cellini:Bag:zero"))
+        for idx, value in ((0, "first"), (1, "second")):
+            registry.triple_store.add(Quad(bag.__rdf_uri__, rdf_member(idx), Literal(value)))
+        registry.triple_store.add(Quad(bag.__rdf_uri__, RDF.type, RDF.Bag))
+        self.assertEqual(Bag.resolve_named_node(bag.__rdf_uri__), ["first", "second"])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,4 +1,5 @@
 import sys
+import warnings
 from tempfile import TemporaryDirectory
 import unittest
 from typing import Optional, List
@@ -8,6 +9,11 @@ from pyoxigraph import *
 
 from cellini.odm import *
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 
 def temp_clear_registry():
     if not sys.warnoptions:
@@ -28,6 +34,26 @@ class Complex(RdfBaseModel):
     many_list:List[str] = Field()
     simple:Simple
 
+class Member(RdfBaseModel):
+    name:str
+    age:Optional[int] = None
+
+class Team(RdfBaseModel):
+    name:str
+    owner:Optional[Member] = None
+    members:List[Member] = []
+    tags:List[str] = []
+
+with warnings.catch_warnings():
+    # `validate` shadows the deprecated `BaseModel.validate`
+    warnings.simplefilter("ignore")
+
+    class Job(RdfBaseModel):
+        name:str
+        loading:str
+        workers:int
+        validate:bool
+
 class TestQuery(unittest.TestCase):
     
     def setUp(self):
@@ -90,5 +116,314 @@ class TestQuery(unittest.TestCase):
         self.assertIsInstance(res.many_list, list)
         self.assertEqual(res.many_list, ["a", "b"])
 
+    def test_filter_many_fields(self):
+        Simple(number=1, phrase="test").save()
+        Simple(number=1, phrase="other").save()
+        Simple(number=2, phrase="test").save()
+        self.assertEqual(len(list(Simple.objects.filter(number=1, phrase="test"))), 1)
+        self.assertEqual(len(list(Simple.objects.filter(number=1).filter(phrase="other"))), 1)
+        with self.assertRaises(ValueError):
+            Simple.objects.filter(unknown=1)
+
+    def test_filter_related_object(self):
+        simple = Simple(number=1, phrase="test")
+        obj = Complex(name="test", many_list=[], simple=simple)
+        obj.save()
+        Complex(name="other", many_list=[], simple=Simple(number=1, phrase="test")).save()
+        res = list(Complex.objects.filter(simple=simple))
+        self.assertEqual([r.identifier for r in res], [obj.identifier])
+
+    def test_queryset_is_lazy(self):
+        qs = Simple.objects.filter(number=1)
+        Simple(number=1, phrase="test").save()
+        self.assertEqual(qs.count(), 1)
+        self.assertEqual(len(list(qs)), 1)
+
+    def test_order_limit_offset(self):
+        Simple.objects.bulk_create(Simple(number=i, phrase=f"test-{i % 3}") for i in range(10))
+        self.assertEqual([s.number for s in Simple.objects.order_by('number')], list(range(10)))
+        self.assertEqual([s.number for s in Simple.objects.order_by('-number').limit(3)], [9, 8, 7])
+        self.assertEqual([s.number for s in Simple.objects.order_by('number').offset(8)], [8, 9])
+        self.assertEqual([s.number for s in Simple.objects.order_by('number').offset(2).limit(2)], [2, 3])
+        self.assertEqual(
+            [(s.phrase, s.number) for s in Simple.objects.order_by('phrase', '-number').limit(4)],
+            [("test-0", 9), ("test-0", 6), ("test-0", 3), ("test-0", 0)])
+        with self.assertRaises(ValueError):
+            Simple.objects.order_by('unknown')
+        with self.assertRaises(ValueError):
+            Simple.objects.limit(-1)
+
+    def test_count_and_first(self):
+        self.assertEqual(Simple.objects.count(), 0)
+        self.assertIsNone(Simple.objects.first())
+        Simple.objects.bulk_create(Simple(number=i, phrase="test") for i in range(10))
+        self.assertEqual(Simple.objects.count(), 10)
+        self.assertEqual(Simple.objects.filter(number=3).count(), 1)
+        self.assertEqual(Simple.objects.limit(4).count(), 4)
+        self.assertEqual(Simple.objects.offset(8).count(), 2)
+        self.assertEqual(Simple.objects.order_by('-number').first().number, 9)
+        self.assertEqual(Simple.objects.filter(number=3).first().number, 3)
+
+    def test_keyset_pagination(self):
+        objs = [Simple(number=i, phrase="test") for i in range(10)]
+        Simple.objects.bulk_create(objs)
+        expected = sorted(f"{obj.identifier}" for obj in objs)
+
+        pages = []
+        page = list(Simple.objects.after("").limit(4))
+        while page:
+            pages.append([f"{obj.identifier}" for obj in page])
+            page = list(Simple.objects.after(page[-1].identifier).limit(4))
+
+        self.assertEqual([len(p) for p in pages], [4, 4, 2])
+        self.assertEqual(sum(pages, []), expected)
+        with self.assertRaises(ValueError):
+            Simple.objects.order_by('number').after(objs[0].identifier)
+
+    def test_iterator_chunks(self):
+        Simple.objects.bulk_create(Simple(number=i, phrase="test") for i in range(7))
+        self.assertEqual(sorted(s.number for s in Simple.objects.all().iterator(chunk_size=3)), list(range(7)))
+
+    def test_iter_parallel(self):
+        Complex.objects.bulk_create(
+            Complex(name=f"test-{i:02}", many_list=[f"{i}"], simple=Simple(number=i, phrase="test")) 
+            for i in range(20))
+        ordered = Complex.objects.order_by('name')
+
+        sequential = [ (c.name, c.simple.number, c.many_list) for c in ordered.iterator(chunk_size=3) ]
+        parallel = [ (c.name, c.simple.number, c.many_list) for c in ordered.iter_parallel(workers=4, chunk_size=3) ]
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(len(parallel), 20)
+
+        self.assertEqual(
+            [ c.name for c in Complex.objects.parallel(2).order_by('-name').limit(2) ], 
+            ["test-19", "test-18"])
+        self.assertEqual(
+            [ s.number for s in Simple.objects.order_by('number').parallel(3) ], list(range(20)))
+        with self.assertRaises(ValueError):
+            Simple.objects.all(workers=0)
+        with self.assertRaises(ValueError):
+            Simple.objects.parallel(0)
+
+    def test_option_named_fields(self):
+        registry.add(Job)
+        Job(name="a", loading="lazy", workers=2, validate=True).save()
+        Job(name="b", loading="eager", workers=4, validate=False).save()
+        self.assertEqual([ job.name for job in Job.objects.filter(loading="lazy") ], ["a"])
+        self.assertEqual([ job.name for job in Job.objects.filter(workers=4) ], ["b"])
+        self.assertEqual([ job.name for job in Job.objects.filter(validate=False).validate() ], ["b"])
+        self.assertEqual(Job.objects.filter(workers__gt=1).parallel(2).count(), 2)
+
+    def test_iter_parallel_session(self):
+        simple = Simple(number=1, phrase="test")
+        Complex.objects.bulk_create(Complex(name=f"test-{i}", many_list=[], simple=simple) for i in range(4))
+        with Session() as session:
+            objs = list(Complex.objects.all().iter_parallel(workers=2, chunk_size=1))
+            self.assertEqual(len(objs), 4)
+            self.assertIn(simple.__rdf_uri__, session)
+
+    def test_query_cache(self):
+        from cellini.odm.query import query_cache, QueryCache
+        query_cache.clear()
+        for i in range(3):
+            Simple(number=i, phrase=f"phrase-{i}").save()
+
+        for i in range(3):
+            self.assertEqual([ s.phrase for s in Simple.objects.filter(number=i) ], [ f"phrase-{i}" ])
+        self.assertEqual((query_cache.misses, query_cache.hits), (1, 2))
+
+        self.assertEqual(Simple.objects.filter(number=1).count(), 1)
+        self.assertEqual(Simple.objects.filter(number=2).count(), 1)
+        self.assertEqual(
+            [ s.number for s in Simple.objects.order_by('number').offset(1).limit(1) ], [ 1 ])
+        self.assertEqual(
+            [ s.number for s in Simple.objects.order_by('number').offset(2).limit(5) ], [ 2 ])
+        self.assertEqual((query_cache.misses, query_cache.hits), (3, 4))
+
+        cache = QueryCache(maxsize=2)
+        for key in ('a', 'b', 'a', 'c'):
+            cache.get(key, lambda: key)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.misses, cache.hits), (3, 1))
+        self.assertEqual(cache.get('a', lambda: 'new'), 'a')
+        self.assertEqual(cache.get('b', lambda: 'new'), 'new')
+
+    def test_filter_unusual_strings(self):
+        phrases = [ 'quote " } ; DROP ALL', "back\\slash", "new\nline", "'single'", "{ ?s ?p ?o }" ]
+        for idx, phrase in enumerate(phrases):
+            Simple(number=idx, phrase=phrase).save()
+        for idx, phrase in enumerate(phrases):
+            self.assertEqual([ s.number for s in Simple.objects.filter(phrase=phrase) ], [ idx ])
+        self.assertEqual(Simple.objects.count(), len(phrases))
+
+    def test_values(self):
+        Simple.objects.bulk_create(Simple(number=i, phrase=f"test-{i}", published=None) for i in range(3))
+        self.assertEqual(
+            list(Simple.objects.order_by('number').values('number', 'phrase', 'published')),
+            [
+                {'number': 0, 'phrase': "test-0", 'published': None},
+                {'number': 1, 'phrase': "test-1", 'published': None},
+                {'number': 2, 'phrase': "test-2", 'published': None},
+            ])
+        self.assertEqual(list(Simple.objects.filter(number=1).values_list('phrase', 'number')), [("test-1", 1)])
+        self.assertEqual(sorted(Simple.objects.values_list('number', flat=True)), [0, 1, 2])
+        self.assertEqual(
+            sorted(Simple.objects.values(), key=lambda v: v['number'])[2]['phrase'], "test-2")
+        with self.assertRaises(ValueError):
+            list(Simple.objects.values_list('number', 'phrase', flat=True))
+        with self.assertRaises(ValueError):
+            list(Simple.objects.values('unknown'))
+
+    def test_values_related(self):
+        obj = Complex(name="test", many_list=[], simple=Simple(number=1, phrase="test"))
+        obj.save()
+        self.assertEqual(list(Complex.objects.values_list('name', 'simple')), [("test", obj.simple.__rdf_uri__)])
+
+    def test_bulk_create(self):
+        objs = [Simple(number=i, phrase=f"test-{i}") for i in range(25)]
+        stats = Simple.objects.bulk_create(objs, batch_size=10)
+        self.assertEqual(stats.objects, 25)
+        self.assertEqual(stats.batches, 3)
+        self.assertEqual(stats.triples, 25 * 5)
+        self.assertGreaterEqual(stats.triples_per_second, 0)
+        self.assertEqual(len(list(Simple.objects.all())), 25)
+        res = Simple.objects.get(objs[7].identifier)
+        self.assertEqual(res.number, 7)
+        self.assertEqual(res.phrase, "test-7")
+
+    def test_bulk_create_nested(self):
+        objs = [
+            Complex(name=f"complex-{i}", many_list=["a", "b"], simple=Simple(number=i, phrase="test"))
+            for i in range(3)
+        ]
+        stats = registry.bulk_save(objs, batch_size=2)
+        self.assertEqual(stats.objects, 3)
+        self.assertEqual(stats.batches, 2)
+        self.assertEqual(len(list(Simple.objects.all())), 3)
+        res = Complex.objects.get(objs[1].identifier)
+        self.assertEqual(res.simple.number, 1)
+        self.assertEqual(res.many_list, ["a", "b"])
+
+    def test_bulk_create_wrong_type(self):
+        with self.assertRaises(TypeError):
+            Simple.objects.bulk_create([Complex(name="x", many_list=[], simple=Simple(number=1, phrase="test"))])
+        self.assertEqual(len(list(Complex.objects.all())), 0)
+
+
+class TestLookups(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Member)
+        registry.add(Team)
+        self.members = [ Member(name=name, age=age) for name, age in [("John", 30), ("Jane", 25), ("Jack", None), ("Anna", 41)] ]
+        for member in self.members:
+            member.save()
+        Team(name="a", owner=self.members[0], members=self.members[:2], tags=["red", "blue"]).save()
+        Team(name="b", owner=self.members[3], members=self.members[2:], tags=["green"]).save()
+        Team(name="c").save()
+
+    def names(self, queryset):
+        return sorted(obj.name for obj in queryset)
+
+    def test_comparisons(self):
+        self.assertEqual(self.names(Member.objects.filter(age__gt=25)), ["Anna", "John"])
+        self.assertEqual(self.names(Member.objects.filter(age__gte=25)), ["Anna", "Jane", "John"])
+        self.assertEqual(self.names(Member.objects.filter(age__lt=30)), ["Jane"])
+        self.assertEqual(self.names(Member.objects.filter(age__lte=30)), ["Jane", "John"])
+        self.assertEqual(self.names(Member.objects.filter(age__range=(26, 41))), ["Anna", "John"])
+        self.assertEqual(self.names(Member.objects.filter(age__exact=30)), ["John"])
+        self.assertEqual(Member.objects.filter(age__gt=25, name__startswith="J").count(), 1)
+
+    def test_in_startswith(self):
+        self.assertEqual(self.names(Member.objects.filter(name__in=["John", "Anna", "Nobody"])), ["Anna", "John"])
+        self.assertEqual(self.names(Member.objects.filter(name__in=[])), [])
+        self.assertEqual(self.names(Member.objects.filter(name__startswith="Ja")), ["Jack", "Jane"])
+        self.assertEqual(self.names(Member.objects.filter(name__startswith='"')), [])
+
+    def test_isnull(self):
+        self.assertEqual(self.names(Member.objects.filter(age__isnull=True)), ["Jack"])
+        self.assertEqual(self.names(Member.objects.filter(age=None)), ["Jack"])
+        self.assertEqual(Member.objects.filter(age__isnull=False).count(), 3)
+        self.assertEqual(self.names(Team.objects.filter(owner__isnull=True)), ["c"])
+
+    def test_traversal(self):
+        self.assertEqual(self.names(Team.objects.filter(owner__name="John")), ["a"])
+        self.assertEqual(self.names(Team.objects.filter(owner__age__gt=35)), ["b"])
+        self.assertEqual(self.names(Team.objects.filter(owner__name__in=["John", "Anna"])), ["a", "b"])
+        self.assertEqual(self.names(Team.objects.filter(owner__age__isnull=False)), ["a", "b"])
+        self.assertEqual(self.names(Team.objects.filter(owner=self.members[3])), ["b"])
+
+    def test_lists(self):
+        self.assertEqual(self.names(Team.objects.filter(tags="green")), ["b"])
+        self.assertEqual(self.names(Team.objects.filter(tags__in=["red", "green"])), ["a", "b"])
+        self.assertEqual(self.names(Team.objects.filter(members__name="Jack")), ["b"])
+        self.assertEqual(self.names(Team.objects.filter(members__age__lt=30)), ["a"])
+        self.assertEqual(self.names(Team.objects.filter(members=self.members[0])), ["a"])
+
+    def test_values_and_ordering(self):
+        self.assertEqual(
+            list(Member.objects.filter(age__gte=25).order_by('-age').values_list('name', flat=True)), 
+            ["Anna", "John", "Jane"])
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            Member.objects.filter(unknown__gt=1)
+        with self.assertRaisesRegex(ValueError, "Unsupported lookup 'contains'"):
+            Member.objects.filter(name__contains="x")
+        with self.assertRaisesRegex(ValueError, "Unsupported lookup 'contains'"):
+            Team.objects.filter(owner__name__contains="x")
+        with self.assertRaisesRegex(ValueError, "is not a relation"):
+            Member.objects.filter(name__name__gt="x")
+        with self.assertRaises(ValueError):
+            Team.objects.filter(owner__unknown="x")
+        with self.assertRaises(ValueError):
+            Member.objects.filter(age__range=(1, 2, 3))
+
+
+
+@unittest.skipIf(numpy is None, "numpy is not installed")
+class TestColumns(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Simple)
+        registry.add(Member)
+        registry.add(Team)
+
+    def test_typed_columns(self):
+        published = datetime(2020, 1, 2, 3, 4, 5, 6000)
+        for i in range(5):
+            Simple(number=i, phrase=f"phrase-{i}", published=published).save()
+        columns = Simple.objects.order_by('number').to_columns('number', 'phrase', 'published')
+
+        self.assertEqual(columns['number'].dtype, numpy.int64)
+        self.assertEqual(columns['number'].tolist(), list(range(5)))
+        self.assertEqual(columns['phrase'].dtype, object)
+        self.assertEqual(columns['phrase'].tolist(), [ f"phrase-{i}" for i in range(5) ])
+        self.assertEqual(columns['published'].dtype, numpy.dtype('datetime64[us]'))
+        self.assertEqual(columns['published'][0], numpy.datetime64(published))
+
+    def test_missing_values(self):
+        owner = Member(name="owner", age=40)
+        Team(name="a", owner=owner).save()
+        Member(name="ageless").save()
+        columns = Member.objects.order_by('name').to_columns('name', 'age')
+        self.assertIsInstance(columns['age'], numpy.ma.MaskedArray)
+        self.assertEqual(columns['age'].dtype, numpy.int64)
+        self.assertEqual(columns['age'].tolist(), [ None, 40 ])
+        self.assertEqual(int(columns['age'].sum()), 40)
+
+        columns = Team.objects.to_columns('owner')
+        self.assertEqual(columns['owner'].tolist(), [ owner.__rdf_uri__ ])
+
+        columns = Team.objects.filter(name="missing").to_columns()
+        self.assertEqual(set(columns), set(Team.model_fields))
+        self.assertEqual(len(columns['name']), 0)
+
+        with self.assertRaises(ValueError):
+            Member.objects.to_columns('unknown')
+
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,292 @@
+import sys
+from tempfile import TemporaryDirectory
+import unittest
+from typing import Optional, List
+from pyoxigraph import *
+
+from cellini.odm import *
+
+
+def temp_clear_registry():
+    if not sys.warnoptions:
+        import warnings
+        warnings.simplefilter("ignore")
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.clear()
+    registry.add(Bag)
+
+
+class RecordingStore(object):
+    """ wraps a store and records the write operations sent to it """
+
+    def __init__(self, store):
+        self.store = store
+        self.writes = []
+
+    def update(self, update, **kwargs):
+        self.writes.append(update)
+        return self.store.update(update, **kwargs)
+
+    def extend(self, quads):
+        quads = list(quads)
+        self.writes.append(quads)
+        return self.store.extend(quads)
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+
+class Simple(RdfBaseModel):
+    number:int
+    phrase:Optional[str] = None
+
+class Complex(RdfBaseModel):
+    name:str
+    many:List[str] = []
+    nested:List[List[str]] = []
+    simple:Optional[Simple] = None
+
+
+class TestDiffSave(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Simple)
+        registry.add(Complex)
+        self.store = RecordingStore(registry.triple_store.store)
+        registry._store = self.store
+
+    def tearDown(self):
+        registry._store = self.store.store
+
+    def stored(self):
+        return len(self.store.store)
+
+    def test_unchanged_save_writes_nothing(self):
+        obj = Complex(name="test", many=["a", "b"], simple=Simple(number=1))
+        obj.save()
+        self.assertEqual(len(self.store.writes), 1)
+        obj.save()
+        self.assertEqual(len(self.store.writes), 1)
+        res = Complex.objects.get(obj.identifier)
+        res.save()
+        self.assertEqual(len(self.store.writes), 1)
+
+    def test_single_field_change(self):
+        obj = Complex(name="test", many=["a", "b"], simple=Simple(number=1))
+        obj.save()
+        stored = self.stored()
+
+        res = Complex.objects.get(obj.identifier)
+        self.assertEqual(res.dirty_fields(), set())
+        res.name = "renamed"
+        self.assertEqual(res.dirty_fields(), {'name'})
+        res.save()
+        self.assertEqual(len(self.store.writes), 2)
+        self.assertIn('DELETE DATA', self.store.writes[-1])
+        self.assertEqual(self.stored(), stored)
+        self.assertEqual(Complex.objects.get(obj.identifier).name, "renamed")
+        self.assertEqual(res.dirty_fields(), set())
+
+    def test_list_changes(self):
+        obj = Complex(name="test", many=["a", "b"], nested=[["a"], ["b", "c"]])
+        obj.save()
+        stored = self.stored()
+
+        obj.many.append("c")
+        obj.nested[1].pop()
+        self.assertEqual(obj.dirty_fields(), {'many', 'nested'})
+        obj.save()
+        self.assertEqual(self.stored(), stored)
+        res = Complex.objects.get(obj.identifier)
+        self.assertEqual(sorted(res.many), ["a", "b", "c"])
+        self.assertEqual(sorted(map(sorted, res.nested)), [["a"], ["b"]])
+
+        res.many = []
+        res.save()
+        # empty list keeps only its rdf:type triple
+        self.assertEqual(self.stored(), stored - 3)
+
+    def test_append_writes_new_member(self):
+        obj = Complex(name="test", many=[ f"item-{i}" for i in range(100) ])
+        obj.save()
+        res = Complex.objects.get(obj.identifier)
+        res.many.append("last")
+        res.save()
+        self.assertEqual(self.store.writes[-1], [ Quad(Bag.node_for(obj.__rdf_uri__, Complex._get_predicate_from_field('many')), NamedNode("http://www.w3.org/1999/02/22-rdf-syntax-ns#_101"), Literal("last")) ])
+        self.assertEqual(Complex.objects.get(obj.identifier).many[-1], "last")
+
+    def test_related_changes(self):
+        obj = Complex(name="test", simple=Simple(number=1))
+        obj.save()
+        res = Complex.objects.get(obj.identifier)
+        res.simple.number = 2
+        self.assertEqual(res.dirty_fields(), set())
+        self.assertEqual(res.simple.dirty_fields(), {'number'})
+        res.save()
+        self.assertEqual(Simple.objects.get(obj.simple.identifier).number, 2)
+        self.assertEqual(len(list(Simple.objects.filter(number=1))), 0)
+
+        res.simple.number = 3
+        res.save(recursive=False)
+        self.assertEqual(Simple.objects.get(obj.simple.identifier).number, 2)
+
+    def test_save_not_loaded_object(self):
+        obj = Simple(number=1, phrase="test")
+        obj.save()
+        stored = self.stored()
+        copy = Simple(identifier=obj.identifier, number=2)
+        copy.save()
+        self.assertEqual(self.stored(), stored - 1)
+        res = Simple.objects.get(obj.identifier)
+        self.assertEqual(res.number, 2)
+        self.assertIsNone(res.phrase)
+
+    def test_save_deleted_object(self):
+        obj = Complex(name="test", many=["a"], simple=Simple(number=1))
+        obj.save()
+        first = Complex.objects.get(obj.identifier)
+        second = Complex.objects.get(obj.identifier)
+        second.delete()
+        first.name = "changed"
+        first.save()
+        res = Complex.objects.get(obj.identifier)
+        self.assertEqual(res.name, "changed")
+        self.assertEqual(res.many, ["a"])
+
+    def test_save_to_other_store(self):
+        obj = Complex(name="test", many=["a"], simple=Simple(number=1))
+        obj.save()
+        self.assertEqual(obj.dirty_fields(), set())
+        registry.set_triple_store(MemoryStore())
+        try:
+            self.assertEqual(obj.dirty_fields(), set(Complex.model_fields))
+            obj.save()
+            self.assertEqual(Complex.objects.get(obj.identifier), obj)
+            self.assertEqual(Simple.objects.count(), 1)
+        finally:
+            registry._store = self.store
+
+    def test_delete_removes_lists(self):
+        obj = Complex(name="test", many=["a", "b"], nested=[["a"]])
+        obj.save()
+        obj.delete()
+        self.assertEqual(self.stored(), 0)
+        obj.save()
+        self.assertEqual(Complex.objects.get(obj.identifier).many, ["a", "b"])
+
+
+class TestTransaction(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Simple)
+        registry.add(Complex)
+        self.store = RecordingStore(registry.triple_store.store)
+        registry._store = self.store
+
+    def tearDown(self):
+        registry._store = self.store.store
+
+    def test_single_write(self):
+        first = Simple(number=1)
+        first.save()
+        self.store.writes.clear()
+
+        with registry.transaction() as transaction:
+            for i in range(5):
+                Complex(name=f"test-{i}", many=["a"], simple=Simple(number=i)).save()
+            first.delete()
+            self.assertGreater(len(transaction), 0)
+            self.assertEqual(len(self.store.writes), 0)
+
+        self.assertEqual(len(self.store.writes), 1)
+        self.assertEqual(len(list(Complex.objects.all())), 5)
+        self.assertEqual(Simple.objects.count(), 5)
+
+    def test_latest_change_wins(self):
+        obj = Simple(number=1)
+        obj.save()
+        with registry.transaction():
+            obj.number = 2
+            obj.save()
+            obj.number = 1
+            obj.save()
+            obj.number = 3
+            obj.save()
+        self.assertEqual(Simple.objects.get(obj.identifier).number, 3)
+        self.assertEqual(len(self.store.store), 3)
+
+    def test_rollback(self):
+        obj = Simple(number=1)
+        obj.save()
+        stored = len(self.store.store)
+
+        with self.assertRaises(RuntimeError):
+            with registry.transaction():
+                obj.number = 2
+                obj.save()
+                Simple(number=3).save()
+                raise RuntimeError()
+
+        self.assertEqual(len(self.store.store), stored)
+        self.assertEqual(Simple.objects.get(obj.identifier).number, 1)
+        # snapshot is restored, so the change is still pending
+        self.assertEqual(obj.dirty_fields(), {'number'})
+        obj.save()
+        self.assertEqual(Simple.objects.get(obj.identifier).number, 2)
+
+    def test_rollback_delete(self):
+        obj = Simple(number=1)
+        obj.save()
+        with self.assertRaises(RuntimeError):
+            with registry.transaction():
+                obj.delete()
+                raise RuntimeError()
+        self.assertEqual(obj.dirty_fields(), set())
+        self.assertEqual(Simple.objects.count(), 1)
+
+    def test_rollback_bulk_save(self):
+        Simple(number=1).save()
+        stored = len(self.store.store)
+
+        with self.assertRaises(RuntimeError):
+            with registry.transaction() as transaction:
+                Simple.objects.bulk_create([ Simple(number=i) for i in range(5) ], batch_size=2)
+                self.assertEqual(Simple.objects.count(), 1)
+                self.assertGreater(len(transaction), 0)
+                raise RuntimeError()
+        self.assertEqual(len(self.store.store), stored)
+
+        with registry.transaction():
+            Simple.objects.bulk_create([ Simple(number=i) for i in range(5) ], batch_size=2)
+        self.assertEqual(Simple.objects.count(), 6)
+
+    def test_nested_transaction(self):
+        with registry.transaction() as outer:
+            Simple(number=1).save()
+            with registry.transaction() as inner:
+                self.assertIs(inner, outer)
+                Simple(number=2).save()
+            self.assertEqual(Simple.objects.count(), 0)
+        self.assertEqual(Simple.objects.count(), 2)
+
+    def test_session_flush(self):
+        Simple(number=1).save()
+        Simple(number=2).save()
+        self.store.writes.clear()
+
+        with Session() as session:
+            objs = list(Simple.objects.order_by('number'))
+            objs[0].number = 10
+            session.add(Simple(number=3))
+            session.flush()
+            self.assertEqual(len(self.store.writes), 1)
+            session.flush()
+            self.assertEqual(len(self.store.writes), 1)
+
+        self.assertEqual(sorted(Simple.objects.values_list('number', flat=True)), [2, 3, 10])
+
+
+if __name__ == '__main__':
+    unittest.main()
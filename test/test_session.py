@@ -0,0 +1,116 @@
+import gc
+import sys
+from tempfile import TemporaryDirectory
+import unittest
+from typing import List
+from pyoxigraph import *
+
+from cellini.odm import *
+from cellini.odm.session import current_session
+
+
+def temp_clear_registry():
+    if not sys.warnoptions:
+        import warnings
+        warnings.simplefilter("ignore")
+    registry._store = Store(path=TemporaryDirectory().name)
+    registry.clear()
+    registry.add(Bag)
+
+
+class Owner(RdfBaseModel):
+    name:str
+
+class Organization(RdfBaseModel):
+    name:str
+    owner:Owner
+
+class Group(RdfBaseModel):
+    organizations:List[Organization]
+
+
+class TestSession(unittest.TestCase):
+
+    def setUp(self):
+        temp_clear_registry()
+        registry.add(Owner)
+        registry.add(Organization)
+        registry.add(Group)
+        self.owner = Owner(name="owner")
+        self.orgs = [Organization(name=f"org-{i}", owner=self.owner) for i in range(5)]
+        for org in self.orgs:
+            org.save()
+
+    def test_context_manager(self):
+        self.assertIsNone(current_session())
+        with Session() as session:
+            self.assertIs(current_session(), session)
+            with Session() as inner:
+                self.assertIs(current_session(), inner)
+            self.assertIs(current_session(), session)
+        self.assertIsNone(current_session())
+
+    def test_get_returns_same_instance(self):
+        with Session() as session:
+            a = Organization.objects.get(self.orgs[0].identifier)
+            b = Organization.objects.get(self.orgs[0].identifier)
+            self.assertIs(a, b)
+            self.assertIn(self.orgs[0].__rdf_uri__, session)
+        self.assertIsNot(Organization.objects.get(self.orgs[0].identifier), a)
+
+    def test_shared_references(self):
+        with Session() as session:
+            orgs = [Organization.objects.get(org.identifier) for org in self.orgs]
+            self.assertTrue(all(org.owner is orgs[0].owner for org in orgs))
+            self.assertIs(Organization.objects.resolve(self.owner.__rdf_uri__), orgs[0].owner)
+            self.assertGreater(session.hits, 0)
+
+    def test_bag_elements_and_validator(self):
+        group = Group(organizations=self.orgs)
+        group.save()
+        with Session():
+            org = Organization.objects.get(self.orgs[1].identifier)
+            res = Group.objects.get(group.identifier)
+            self.assertIn(org, res.organizations)
+            self.assertTrue(any(o is org for o in res.organizations))
+            nested = Organization(name="other", owner=self.owner.__rdf_uri__)
+            self.assertIs(nested.owner, org.owner)
+
+    def test_resolve(self):
+        session = Session()
+        a = session.resolve(self.owner.__rdf_uri__)
+        self.assertIs(session.resolve(self.owner.__rdf_uri__), a)
+        self.assertIsNone(current_session())
+
+    def test_lru_eviction(self):
+        with Session(maxsize=2) as session:
+            for org in self.orgs:
+                Organization.objects.get(org.identifier)
+            self.assertEqual(len(session), 2)
+            self.assertIn(self.orgs[-1].__rdf_uri__, session)
+            self.assertNotIn(self.orgs[0].__rdf_uri__, session)
+
+    def test_weak_eviction(self):
+        with Session(weak=True) as session:
+            org = Organization.objects.get(self.orgs[0].identifier)
+            self.assertIn(org.__rdf_uri__, session)
+            uri = org.__rdf_uri__
+            del org
+            gc.collect()
+            self.assertNotIn(uri, session)
+
+    def test_expunge(self):
+        with Session() as session:
+            a = Owner.objects.get(self.owner.identifier)
+            session.expunge(a.__rdf_uri__)
+            self.assertIsNot(Owner.objects.get(self.owner.identifier), a)
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            Session(maxsize=0)
+        with self.assertRaises(ValueError):
+            Session(maxsize=10, weak=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+import sys
+from tempfile import TemporaryDirectory
+import unittest
+from typing import Optional, List
+from pyoxigraph import *
+
+from cellini.odm import *
+
+
+class Person(RdfBaseModel):
+    name:str
+    age:Optional[int] = None
+
+class Group(RdfBaseModel):
+    name:str
+    members:List[Person]
+    owner:Optional[Person] = None
+
+
+class AdapterTests(object):
+    """ runs the ODM against the store adapter returned by `adapter` """
+
+    def adapter(self)->StoreAdapter:
+        raise NotImplementedError()
+
+    def setUp(self):
+        if not sys.warnoptions:
+            import warnings
+            warnings.simplefilter("ignore")
+        self.previous = registry.triple_store
+        self.store = self.adapter()
+        registry.set_triple_store(self.store)
+        registry.clear()
+        registry.add(Bag)
+        registry.add(Person)
+        registry.add(Group)
+
+    def tearDown(self):
+        registry.set_triple_store(self.previous)
+
+    def test_save_get(self):
+        group = Group(name="group", members=[ Person(name=f"person-{i}", age=i) for i in range(5) ], owner=Person(name="owner"))
+        group.save()
+        self.assertGreater(len(self.store), 0)
+
+        loaded = Group.objects.get(group.identifier)
+        self.assertEqual(loaded.name, "group")
+        self.assertEqual(loaded.owner.name, "owner")
+        self.assertEqual(sorted(p.name for p in loaded.members), sorted(p.name for p in group.members))
+
+        loaded.name = "renamed"
+        loaded.save()
+        self.assertEqual(Group.objects.get(group.identifier).name, "renamed")
+
+        loaded.delete()
+        self.assertEqual(Group.objects.count(), 0)
+        self.assertEqual(Person.objects.count(), 6)
+
+    def test_queries(self):
+        Person.objects.bulk_create(Person(name=f"person-{i}", age=i % 3) for i in range(12))
+        self.assertEqual(Person.objects.count(), 12)
+        self.assertEqual(Person.objects.filter(age=1).count(), 4)
+        self.assertEqual(
+            [ p.name for p in Person.objects.order_by('-name').limit(2) ], ["person-9", "person-8"])
+        self.assertTrue(Person.objects.exists(Person.objects.first()))
+
+    def test_queries_follow_writes(self):
+        people = [ Person(name=f"person-{i}", age=i) for i in range(4) ]
+        for person in people:
+            person.save()
+            self.assertEqual(Person.objects.count(), person.age + 1)
+        people[0].age = 10
+        people[0].save()
+        self.assertEqual(Person.objects.filter(age=10).count(), 1)
+        people[1].delete()
+        self.assertEqual(Person.objects.count(), 3)
+        Person.objects.bulk_create([ Person(name="bulk") ])
+        self.assertEqual(Person.objects.filter(name="bulk").count(), 1)
+
+    def test_triples_for_pattern(self):
+        person = Person(name="test", age=1)
+        person.save()
+        name = NamedNode("https://cellini.io/ns/name")
+
+        self.assertEqual(len(list(self.store.quads_for_pattern(person.__rdf_uri__))), 4)
+        self.assertEqual(
+            list(self.store.quads_for_pattern(None, name, None)), 
+            [ Quad(person.__rdf_uri__, name, Literal("test")) ])
+        self.assertEqual(
+            [ q.subject for q in self.store.quads_for_pattern(None, None, Literal("test")) ], 
+            [ person.__rdf_uri__ ])
+        self.assertEqual(len(list(self.store.quads_for_pattern(person.__rdf_uri__, name, Literal("other")))), 0)
+        self.assertEqual(len(list(self.store.quads_for_pattern(None, name, None, NamedNode("cellini:Person")))), 0)
+
+        self.store.clear()
+        self.assertEqual(len(self.store), 0)
+        self.assertEqual(Person.objects.count(), 0)
+
+    def test_graphs(self):
+        graph = NamedNode("cellini:graph")
+        quad = Quad(NamedNode("http://a"), NamedNode("http://b"), Literal("c"), graph)
+        self.store.apply(inserts=[ quad, Quad(NamedNode("http://a"), NamedNode("http://b"), Literal("c")) ])
+        self.assertEqual(len(self.store), 2)
+        self.assertEqual(list(self.store.named_graphs()), [ graph ])
+        self.assertEqual(list(self.store.quads_for_pattern(graph_name=graph)), [ quad ])
+        self.assertEqual(len(list(self.store.subject_triples([ NamedNode("http://a") ]))), 1)
+
+        self.store.clear_graph(graph)
+        self.assertEqual(len(self.store), 1)
+        self.store.remove(Triple(NamedNode("http://a"), NamedNode("http://b"), Literal("c")))
+        self.assertEqual(len(self.store), 0)
+
+    def test_transaction(self):
+        person = Person(name="test")
+        person.save()
+        with self.assertRaises(RuntimeError):
+            with registry.transaction():
+                person.name = "changed"
+                person.save()
+                raise RuntimeError()
+        self.assertEqual(Person.objects.get(person.identifier).name, "test")
+
+
+class TestOxigraphStore(AdapterTests, unittest.TestCase):
+
+    def adapter(self):
+        return OxigraphStore(TemporaryDirectory().name)
+
+
+class TestMemoryStore(AdapterTests, unittest.TestCase):
+
+    def adapter(self):
+        return MemoryStore()
+
+    def test_duplicates(self):
+        quad = Quad(NamedNode("http://a"), NamedNode("http://b"), Literal("c"))
+        self.store.apply(inserts=[ quad, quad ])
+        self.assertEqual(len(self.store), 1)
+        self.store.apply(deletes=[ quad, quad ])
+        self.assertEqual(len(self.store), 0)
+        self.assertEqual(list(self.store.quads_for_pattern()), [])
+
+    def test_snapshot_updated(self):
+        Person(name="first").save()
+        self.assertEqual(Person.objects.count(), 1)
+        snapshot = self.store._snapshot
+        Person(name="second").save()
+        self.assertEqual(Person.objects.count(), 2)
+        self.assertIs(self.store._snapshot, snapshot)
+        self.assertEqual(len(snapshot), len(self.store))
+
+
+class TestShardedStore(AdapterTests, unittest.TestCase):
+
+    def adapter(self):
+        return ShardedStore([ MemoryStore(), OxigraphStore(), MemoryStore() ])
+
+    def test_routing(self):
+        Person.objects.bulk_create(Person(name=f"person-{i}") for i in range(30))
+        sizes = [ len(shard) for shard in self.store.shards ]
+        self.assertEqual(sum(sizes), len(self.store))
+        self.assertTrue(all(sizes))
+
+    def test_local_queries(self):
+        people = [ Person(name=f"person-{i}", age=i % 2) for i in range(10) ]
+        Group(name="group", members=people[:3], owner=people[0]).save()
+        Person.objects.bulk_create(people[3:])
+        self.assertEqual(Person.objects.count(), 10)
+        self.assertEqual(Person.objects.filter(age=1).count(), 5)
+        self.assertEqual(len(list(Person.objects.filter(age=0))), 5)
+        self.assertEqual(Group.objects.filter(owner__name="person-0").count(), 1)
+        self.assertEqual(Group.objects.filter(members__name="person-2").count(), 1)
+        self.assertIsNone(self.store._snapshot)
+
+        query = f"SELECT (COUNT(?s) AS ?count) WHERE {{ ?s a { Person.__rdf_type__() } }}"
+        counts = [ int(solution['count'].value) for solution in self.store.local_query(query) ]
+        self.assertEqual(len(counts), len(self.store.shards))
+        self.assertEqual(sum(counts), 10)
+
+    def test_snapshot_updated(self):
+        self.store = ShardedStore([ MemoryStore(), OxigraphStore(), MemoryStore() ], union=True)
+        registry.set_triple_store(self.store)
+        Person(name="first").save()
+        self.assertEqual(Person.objects.count(), 1)
+        self.assertIsNone(self.store._snapshot)
+        self.assertIsNotNone(Person.objects.order_by('name').first())
+        snapshot = self.store._snapshot
+        Person.objects.bulk_create(Person(name=f"person-{i}") for i in range(10))
+        Person.objects.first().delete()
+        self.assertEqual(Person.objects.count(), 10)
+        self.assertEqual(len(list(Person.objects.order_by('name'))), 10)
+        self.assertIs(self.store._snapshot, snapshot)
+        self.assertEqual(set(snapshot), set(self.store.quads_for_pattern()))
+
+        for shard_idx, shard in enumerate(self.store.shards):
+            for quad in shard.quads_for_pattern():
+                self.assertEqual(self.store.shard_of(quad.subject), shard_idx)
+
+    def test_shard_count(self):
+        self.assertEqual(len(ShardedStore(4).shards), 4)
+        with self.assertRaises(ValueError):
+            ShardedStore(0)
+
+
+if __name__ == '__main__':
+    unittest.main()